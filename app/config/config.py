@@ -28,20 +28,75 @@ class Config(metaclass=SingletonMeta):
             self._headless = self.get('HEADLESS', 'false').lower() == 'true'
             self._username = self.get('USERNAME')
             self._password = self.get('PASSWORD')
+            self._detail_fetch_concurrency = int(self.get('DETAIL_FETCH_CONCURRENCY', 4))
+            self._detail_fetch_mode = self.get('DETAIL_FETCH_MODE', 'http').lower()  # 'http' or 'browser'
+            self._browser_state_file = self.get('BROWSER_STATE_FILE', 'auchan_session.json')
+            self._browser_recycle_runs = int(self.get('BROWSER_RECYCLE_RUNS', 20))
+            self._resource_blocking = self.get('RESOURCE_BLOCKING', 'block').lower()  # 'off', 'block' or 'measure'
+            self._resource_allowed_types = self.get('RESOURCE_ALLOWED_TYPES', '')
+            self._resource_allowed_domains = self.get('RESOURCE_ALLOWED_DOMAINS', '')
+            self._resource_blocked_domains = self.get('RESOURCE_BLOCKED_DOMAINS', '')
             self._history_file = self.get('ORDER_HISTORY_FILE', 'order_history.json')
+            self._history_backend = self.get('HISTORY_BACKEND', 'json').lower()  # 'json', 'sqlite' or 'journal'
+            self._history_db_file = self.get('HISTORY_DB_FILE', 'order_history.db')
+            self._history_journal_file = self.get('HISTORY_JOURNAL_FILE', 'order_history.jsonl')
+            self._history_journal_compaction_ratio = float(self.get('HISTORY_JOURNAL_COMPACTION_RATIO', 0.5))
+            self._history_format = self.get('HISTORY_FORMAT', 'indent').lower()  # 'indent' or 'compact'
+            self._history_compression = self.get('HISTORY_COMPRESSION', 'none').lower()  # 'none', 'gzip' or 'zstd'
+            self._analytics_cache_file = self.get('ANALYTICS_CACHE_FILE', 'order_analytics.npz')
 
             # Grocy API settings
             self._grocy_api_base = self.get('GROCY_API_BASE', 'http://hicsvntpi:9192')
             self._grocy_api_key = self.get('GROCY_API_KEY')
+            self._grocy_request_timeout = float(self.get('GROCY_REQUEST_TIMEOUT', 30))
+            self._grocy_max_concurrent_requests = int(self.get('GROCY_MAX_CONCURRENT_REQUESTS', 4))
 
             # Thresholds and configurations
             self._similarity_threshold = float(self.get('SIMILARITY_THRESHOLD', 90))
             self._warning_similarity_threshold = float(self.get('WARNING_SIMILARITY_THRESHOLD', 75))
+            self._near_miss_candidates = int(self.get('NEAR_MISS_CANDIDATES', 3))
             self._live_stock_update = self.get('LIVE_STOCK_UPDATE', 'false').lower() == 'true'
+            self._stock_update_concurrency = int(self.get('STOCK_UPDATE_CONCURRENCY', 4))
+            self._stock_update_rate_limit = float(self.get('STOCK_UPDATE_RATE_LIMIT', 0))
+
+            # Routing of order lines to Grocy stock locations
+            self._default_location = self.get('DEFAULT_LOCATION', 'Parking')
+            self._location_category_routes = self.get('LOCATION_CATEGORY_ROUTES', '')
+            self._location_product_routes = self.get('LOCATION_PRODUCT_ROUTES', '')
+            self._use_product_location = self.get('USE_PRODUCT_LOCATION', 'false').lower() == 'true'
+            self._location_routing_file = self.get('LOCATION_ROUTING_FILE', '')
+
+            # Durable outbox of stock additions (disabled when no file is configured)
+            self._stock_outbox_file = self.get('STOCK_OUTBOX_FILE', '')
+            self._stock_outbox_batch_size = int(self.get('STOCK_OUTBOX_BATCH_SIZE', 50))
+            self._stock_outbox_flush_interval = float(self.get('STOCK_OUTBOX_FLUSH_INTERVAL', 60))
+            self._stock_outbox_max_attempts = int(self.get('STOCK_OUTBOX_MAX_ATTEMPTS', 10))
+            self._stock_outbox_retry_delay = float(self.get('STOCK_OUTBOX_RETRY_DELAY', 30))
+            self._stock_outbox_max_retry_delay = float(self.get('STOCK_OUTBOX_MAX_RETRY_DELAY', 3600))
+
+            # Matching backend settings ('exact' scans the whole catalog, 'lsh' uses MinHash/LSH candidates)
+            self._matching_backend = self.get('MATCHING_BACKEND', 'exact').lower()
+            self._matching_shortlist_size = int(self.get('MATCHING_SHORTLIST_SIZE', 20))
+            self._lsh_num_perm = int(self.get('LSH_NUM_PERM', 128))
+            self._lsh_bands = int(self.get('LSH_BANDS', 32))
+            self._lsh_shingle_size = int(self.get('LSH_SHINGLE_SIZE', 3))
+
+            # Learned product match cache settings
+            self._match_cache_file = self.get('MATCH_CACHE_FILE', 'match_cache.json')
+            self._match_cache_max_entries = int(self.get('MATCH_CACHE_MAX_ENTRIES', 5000))
+
+            # Order history backfill settings
+            self._backfill_workers = int(self.get('BACKFILL_WORKERS', os.cpu_count() or 1))
+            self._backfill_output_file = self.get('BACKFILL_OUTPUT_FILE', 'backfill_results.jsonl')
 
             # Caching Time-to-Live (TTL) settings
             self._products_cache_ttl = int(self.get('PRODUCTS_CACHE_TTL', 600))  # Default 600 seconds (10 minutes)
             self._locations_cache_ttl = int(self.get('LOCATIONS_CACHE_TTL', 600))  # Default 600 seconds (10 minutes)
+            # 'ttl' reloads expired entries inline, 'swr' serves them stale while refreshing in the background
+            self._grocy_cache_mode = self.get('GROCY_CACHE_MODE', 'ttl').lower()
+
+            # Local snapshot of the Grocy catalog, refreshed only when the Grocy database changed
+            self._catalog_snapshot_file = self.get('CATALOG_SNAPSHOT_FILE', 'grocy_catalog.json')
 
             self._is_initialized = True
 
@@ -82,6 +137,78 @@ class Config(metaclass=SingletonMeta):
     def headless(self, value: bool):
         self._headless = value
 
+    # Property for detail_fetch_concurrency
+    @property
+    def detail_fetch_concurrency(self) -> int:
+        return self._detail_fetch_concurrency
+
+    @detail_fetch_concurrency.setter
+    def detail_fetch_concurrency(self, value: int):
+        self._detail_fetch_concurrency = value
+
+    # Property for detail_fetch_mode
+    @property
+    def detail_fetch_mode(self) -> str:
+        return self._detail_fetch_mode
+
+    @detail_fetch_mode.setter
+    def detail_fetch_mode(self, value: str):
+        self._detail_fetch_mode = value
+
+    # Property for browser_state_file
+    @property
+    def browser_state_file(self) -> str:
+        return self._browser_state_file
+
+    @browser_state_file.setter
+    def browser_state_file(self, value: str):
+        self._browser_state_file = value
+
+    # Property for browser_recycle_runs
+    @property
+    def browser_recycle_runs(self) -> int:
+        return self._browser_recycle_runs
+
+    @browser_recycle_runs.setter
+    def browser_recycle_runs(self, value: int):
+        self._browser_recycle_runs = value
+
+    # Property for resource_blocking
+    @property
+    def resource_blocking(self) -> str:
+        return self._resource_blocking
+
+    @resource_blocking.setter
+    def resource_blocking(self, value: str):
+        self._resource_blocking = value
+
+    # Property for resource_allowed_types
+    @property
+    def resource_allowed_types(self) -> str:
+        return self._resource_allowed_types
+
+    @resource_allowed_types.setter
+    def resource_allowed_types(self, value: str):
+        self._resource_allowed_types = value
+
+    # Property for resource_allowed_domains
+    @property
+    def resource_allowed_domains(self) -> str:
+        return self._resource_allowed_domains
+
+    @resource_allowed_domains.setter
+    def resource_allowed_domains(self, value: str):
+        self._resource_allowed_domains = value
+
+    # Property for resource_blocked_domains
+    @property
+    def resource_blocked_domains(self) -> str:
+        return self._resource_blocked_domains
+
+    @resource_blocked_domains.setter
+    def resource_blocked_domains(self, value: str):
+        self._resource_blocked_domains = value
+
     # Property for username
     @property
     def username(self) -> str:
@@ -109,6 +236,69 @@ class Config(metaclass=SingletonMeta):
     def history_file(self, value: str):
         self._history_file = value
 
+    # Property for history_backend
+    @property
+    def history_backend(self) -> str:
+        return self._history_backend
+
+    @history_backend.setter
+    def history_backend(self, value: str):
+        self._history_backend = value
+
+    # Property for history_db_file
+    @property
+    def history_db_file(self) -> str:
+        return self._history_db_file
+
+    @history_db_file.setter
+    def history_db_file(self, value: str):
+        self._history_db_file = value
+
+    # Property for history_journal_file
+    @property
+    def history_journal_file(self) -> str:
+        return self._history_journal_file
+
+    @history_journal_file.setter
+    def history_journal_file(self, value: str):
+        self._history_journal_file = value
+
+    # Property for history_journal_compaction_ratio
+    @property
+    def history_journal_compaction_ratio(self) -> float:
+        return self._history_journal_compaction_ratio
+
+    @history_journal_compaction_ratio.setter
+    def history_journal_compaction_ratio(self, value: float):
+        self._history_journal_compaction_ratio = value
+
+    # Property for history_format
+    @property
+    def history_format(self) -> str:
+        return self._history_format
+
+    @history_format.setter
+    def history_format(self, value: str):
+        self._history_format = value
+
+    # Property for history_compression
+    @property
+    def history_compression(self) -> str:
+        return self._history_compression
+
+    @history_compression.setter
+    def history_compression(self, value: str):
+        self._history_compression = value
+
+    # Property for analytics_cache_file
+    @property
+    def analytics_cache_file(self) -> str:
+        return self._analytics_cache_file
+
+    @analytics_cache_file.setter
+    def analytics_cache_file(self, value: str):
+        self._analytics_cache_file = value
+
     # Property for grocy_api_base
     @property
     def grocy_api_base(self) -> str:
@@ -127,6 +317,24 @@ class Config(metaclass=SingletonMeta):
     def grocy_api_key(self, value: str):
         self._grocy_api_key = value
 
+    # Property for grocy_request_timeout
+    @property
+    def grocy_request_timeout(self) -> float:
+        return self._grocy_request_timeout
+
+    @grocy_request_timeout.setter
+    def grocy_request_timeout(self, value: float):
+        self._grocy_request_timeout = value
+
+    # Property for grocy_max_concurrent_requests
+    @property
+    def grocy_max_concurrent_requests(self) -> int:
+        return self._grocy_max_concurrent_requests
+
+    @grocy_max_concurrent_requests.setter
+    def grocy_max_concurrent_requests(self, value: int):
+        self._grocy_max_concurrent_requests = value
+
     # Property for similarity_threshold
     @property
     def similarity_threshold(self) -> float:
@@ -145,6 +353,15 @@ class Config(metaclass=SingletonMeta):
     def warning_similarity_threshold(self, value: float):
         self._warning_similarity_threshold = value
 
+    # Property for near_miss_candidates
+    @property
+    def near_miss_candidates(self) -> int:
+        return self._near_miss_candidates
+
+    @near_miss_candidates.setter
+    def near_miss_candidates(self, value: int):
+        self._near_miss_candidates = value
+
     # Property for live_stock_update
     @property
     def live_stock_update(self) -> bool:
@@ -154,6 +371,204 @@ class Config(metaclass=SingletonMeta):
     def live_stock_update(self, value: bool):
         self._live_stock_update = value
 
+    # Property for stock_update_concurrency
+    @property
+    def stock_update_concurrency(self) -> int:
+        return self._stock_update_concurrency
+
+    @stock_update_concurrency.setter
+    def stock_update_concurrency(self, value: int):
+        self._stock_update_concurrency = value
+
+    # Property for stock_update_rate_limit
+    @property
+    def stock_update_rate_limit(self) -> float:
+        return self._stock_update_rate_limit
+
+    @stock_update_rate_limit.setter
+    def stock_update_rate_limit(self, value: float):
+        self._stock_update_rate_limit = value
+
+    # Property for default_location
+    @property
+    def default_location(self) -> str:
+        return self._default_location
+
+    @default_location.setter
+    def default_location(self, value: str):
+        self._default_location = value
+
+    # Property for location_category_routes
+    @property
+    def location_category_routes(self) -> str:
+        return self._location_category_routes
+
+    @location_category_routes.setter
+    def location_category_routes(self, value: str):
+        self._location_category_routes = value
+
+    # Property for location_product_routes
+    @property
+    def location_product_routes(self) -> str:
+        return self._location_product_routes
+
+    @location_product_routes.setter
+    def location_product_routes(self, value: str):
+        self._location_product_routes = value
+
+    # Property for use_product_location
+    @property
+    def use_product_location(self) -> bool:
+        return self._use_product_location
+
+    @use_product_location.setter
+    def use_product_location(self, value: bool):
+        self._use_product_location = value
+
+    # Property for location_routing_file
+    @property
+    def location_routing_file(self) -> str:
+        return self._location_routing_file
+
+    @location_routing_file.setter
+    def location_routing_file(self, value: str):
+        self._location_routing_file = value
+
+    # Property for stock_outbox_file
+    @property
+    def stock_outbox_file(self) -> str:
+        return self._stock_outbox_file
+
+    @stock_outbox_file.setter
+    def stock_outbox_file(self, value: str):
+        self._stock_outbox_file = value
+
+    # Property for stock_outbox_batch_size
+    @property
+    def stock_outbox_batch_size(self) -> int:
+        return self._stock_outbox_batch_size
+
+    @stock_outbox_batch_size.setter
+    def stock_outbox_batch_size(self, value: int):
+        self._stock_outbox_batch_size = value
+
+    # Property for stock_outbox_flush_interval
+    @property
+    def stock_outbox_flush_interval(self) -> float:
+        return self._stock_outbox_flush_interval
+
+    @stock_outbox_flush_interval.setter
+    def stock_outbox_flush_interval(self, value: float):
+        self._stock_outbox_flush_interval = value
+
+    # Property for stock_outbox_max_attempts
+    @property
+    def stock_outbox_max_attempts(self) -> int:
+        return self._stock_outbox_max_attempts
+
+    @stock_outbox_max_attempts.setter
+    def stock_outbox_max_attempts(self, value: int):
+        self._stock_outbox_max_attempts = value
+
+    # Property for stock_outbox_retry_delay
+    @property
+    def stock_outbox_retry_delay(self) -> float:
+        return self._stock_outbox_retry_delay
+
+    @stock_outbox_retry_delay.setter
+    def stock_outbox_retry_delay(self, value: float):
+        self._stock_outbox_retry_delay = value
+
+    # Property for stock_outbox_max_retry_delay
+    @property
+    def stock_outbox_max_retry_delay(self) -> float:
+        return self._stock_outbox_max_retry_delay
+
+    @stock_outbox_max_retry_delay.setter
+    def stock_outbox_max_retry_delay(self, value: float):
+        self._stock_outbox_max_retry_delay = value
+
+    # Property for matching_backend
+    @property
+    def matching_backend(self) -> str:
+        return self._matching_backend
+
+    @matching_backend.setter
+    def matching_backend(self, value: str):
+        self._matching_backend = value
+
+    # Property for matching_shortlist_size
+    @property
+    def matching_shortlist_size(self) -> int:
+        return self._matching_shortlist_size
+
+    @matching_shortlist_size.setter
+    def matching_shortlist_size(self, value: int):
+        self._matching_shortlist_size = value
+
+    # Property for lsh_num_perm
+    @property
+    def lsh_num_perm(self) -> int:
+        return self._lsh_num_perm
+
+    @lsh_num_perm.setter
+    def lsh_num_perm(self, value: int):
+        self._lsh_num_perm = value
+
+    # Property for lsh_bands
+    @property
+    def lsh_bands(self) -> int:
+        return self._lsh_bands
+
+    @lsh_bands.setter
+    def lsh_bands(self, value: int):
+        self._lsh_bands = value
+
+    # Property for lsh_shingle_size
+    @property
+    def lsh_shingle_size(self) -> int:
+        return self._lsh_shingle_size
+
+    @lsh_shingle_size.setter
+    def lsh_shingle_size(self, value: int):
+        self._lsh_shingle_size = value
+
+    # Property for match_cache_file
+    @property
+    def match_cache_file(self) -> str:
+        return self._match_cache_file
+
+    @match_cache_file.setter
+    def match_cache_file(self, value: str):
+        self._match_cache_file = value
+
+    # Property for match_cache_max_entries
+    @property
+    def match_cache_max_entries(self) -> int:
+        return self._match_cache_max_entries
+
+    @match_cache_max_entries.setter
+    def match_cache_max_entries(self, value: int):
+        self._match_cache_max_entries = value
+
+    # Property for backfill_workers
+    @property
+    def backfill_workers(self) -> int:
+        return self._backfill_workers
+
+    @backfill_workers.setter
+    def backfill_workers(self, value: int):
+        self._backfill_workers = value
+
+    # Property for backfill_output_file
+    @property
+    def backfill_output_file(self) -> str:
+        return self._backfill_output_file
+
+    @backfill_output_file.setter
+    def backfill_output_file(self, value: str):
+        self._backfill_output_file = value
+
     # Property for products_cache_ttl
     @property
     def products_cache_ttl(self) -> int:
@@ -171,3 +586,21 @@ class Config(metaclass=SingletonMeta):
     @locations_cache_ttl.setter
     def locations_cache_ttl(self, value: int):
         self._locations_cache_ttl = value
+
+    # Property for grocy_cache_mode
+    @property
+    def grocy_cache_mode(self) -> str:
+        return self._grocy_cache_mode
+
+    @grocy_cache_mode.setter
+    def grocy_cache_mode(self, value: str):
+        self._grocy_cache_mode = value
+
+    # Property for catalog_snapshot_file
+    @property
+    def catalog_snapshot_file(self) -> str:
+        return self._catalog_snapshot_file
+
+    @catalog_snapshot_file.setter
+    def catalog_snapshot_file(self, value: str):
+        self._catalog_snapshot_file = value
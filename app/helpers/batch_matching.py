@@ -0,0 +1,159 @@
+import numpy as np
+from scipy import sparse
+from app.helpers.matching_utils import EXACT_MATCH_SCORE
+
+
+class BatchMatcher:
+    """
+    Matches many queries against a catalog in a single sparse matrix multiplication.
+
+    The catalog is kept as a row-normalized CSR matrix (products x vocabulary) built from a
+    CatalogIndex. A batch of queries is turned into a row-normalized query matrix, so that
+    one multiplication yields the cosine similarity of every query against every product.
+    """
+
+    def __init__(self, catalog_index):
+        """
+        Build the normalized catalog matrix.
+
+        Args:
+            catalog_index (CatalogIndex): The index over the product catalog.
+        """
+        self.catalog_index = catalog_index
+        self.columns = {token: column for column, token in enumerate(catalog_index.postings)}
+
+        rows, cols, values = [], [], []
+        for position, vector in enumerate(catalog_index.vectors):
+            norm = catalog_index.norms[position]
+            if norm == 0:
+                continue
+            for token, count in vector.items():
+                rows.append(position)
+                cols.append(self.columns[token])
+                values.append(count / norm)
+
+        self.catalog_matrix = sparse.csr_matrix(
+            (values, (rows, cols)),
+            shape=(len(catalog_index), len(self.columns)),
+            dtype=np.float64
+        )
+        self.catalog_matrix_t = self.catalog_matrix.T.tocsc()
+
+    def vectorize_many(self, queries):
+        """
+        Converts queries into a row-normalized sparse query matrix.
+
+        Args:
+            queries (list): The query strings.
+
+        Returns:
+            scipy.sparse.csr_matrix: A (queries x vocabulary) matrix.
+        """
+        rows, cols, values = [], [], []
+        for row, query in enumerate(queries):
+            vector = self.catalog_index.vectorize(query)
+            norm = np.sqrt(sum(count ** 2 for count in vector.values()))
+            if norm == 0:
+                continue
+            for token, count in vector.items():
+                rows.append(row)
+                cols.append(self.columns[token])
+                values.append(count / norm)
+
+        return sparse.csr_matrix(
+            (values, (rows, cols)),
+            shape=(len(queries), len(self.columns)),
+            dtype=np.float64
+        )
+
+    def similarities(self, queries):
+        """
+        Computes the cosine similarity of every query against every product.
+
+        Args:
+            queries (list): The query strings.
+
+        Returns:
+            scipy.sparse.csr_matrix: A (queries x products) similarity matrix with sorted indices.
+        """
+        similarities = (self.vectorize_many(queries) @ self.catalog_matrix_t).tocsr()
+        similarities.sort_indices()
+        return similarities
+
+    def match_many(self, queries, k=1):
+        """
+        Finds the best matching product for every query in one pass.
+
+        Ties are broken in favour of the product appearing first in the catalog, and queries
+        sharing no token with the catalog match the first product with 0%, like
+        CatalogIndex.get_best_match. The runner-ups of the queries without an exact match
+        are selected from the similarity row already computed, without scoring the catalog again.
+
+        Args:
+            queries (list): The query strings, e.g. all lines of one or several orders.
+            k (int): Number of top matches to compute per query; the k-1 next best are returned as 'runner_ups'.
+
+        Returns:
+            list: One result per query, each a dict with the 'product', its 'similarity_percentage'
+            and the 'runner_ups', or None when the catalog is empty.
+        """
+        if not queries:
+            return []
+        if len(self.catalog_index) == 0:
+            return [None] * len(queries)
+
+        similarities = self.similarities(queries)
+        best_positions = np.asarray(similarities.argmax(axis=1)).ravel()
+        best_scores = similarities.max(axis=1).toarray().ravel()
+
+        products = self.catalog_index.products
+        results = []
+        for row, (position, score) in enumerate(zip(best_positions, best_scores)):
+            runner_ups = []
+            if k > 1 and 0 < score < EXACT_MATCH_SCORE:
+                runner_ups = self.top_matches(similarities, row, k - 1, exclude=position)
+
+            results.append({
+                'product': products[position],
+                'similarity_percentage': float(score) * 100,
+                'runner_ups': runner_ups
+            })
+        return results
+
+    def top_matches(self, similarities, row, count, exclude=None):
+        """
+        Selects the best matches of one query from its row of the similarity matrix.
+
+        Only the products sharing a token with the query are stored in the row; the best
+        `count` of them are selected with a partial sort. Products scoring the same as the last
+        one selected are kept until the final sort, so that ties follow the catalog order.
+
+        Args:
+            similarities (scipy.sparse.csr_matrix): The similarity matrix, with sorted indices.
+            row (int): The row of the query.
+            count (int): The maximum number of matches to return.
+            exclude (int): Catalog position of a product to leave out, e.g. the best match.
+
+        Returns:
+            list: Up to count dicts with the 'product' and its 'similarity_percentage', best
+            first, earlier catalog position first among ties.
+        """
+        start, end = similarities.indptr[row], similarities.indptr[row + 1]
+        positions = similarities.indices[start:end]
+        scores = similarities.data[start:end]
+        if exclude is not None:
+            kept = positions != exclude
+            positions, scores = positions[kept], scores[kept]
+
+        if len(scores) > count:
+            cutoff = scores[np.argpartition(-scores, count - 1)[count - 1]]
+            candidates = np.flatnonzero(scores >= cutoff)
+            positions, scores = positions[candidates], scores[candidates]
+        # A stable sort keeps the catalog order of the sorted indices among equal scores
+        order = np.argsort(-scores, kind='stable')[:count]
+
+        products = self.catalog_index.products
+        return [
+            {'product': products[positions[i]], 'similarity_percentage': float(scores[i]) * 100}
+            for i in order
+        ]
@@ -0,0 +1,157 @@
+import contextlib
+import gzip
+import io
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library is used instead
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: only needed for HISTORY_COMPRESSION=zstd
+    zstandard = None
+
+# Magic numbers identifying a compressed file, whatever the configured compression
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class HistorySerializer:
+    """
+    Encoding of the orders in the order history files.
+
+    Orders are encoded with orjson when it is installed and with the standard library
+    otherwise. The 'indent' format writes the history like json.dump(..., indent=4); the
+    'compact' format writes one order per line without indentation, so that it can be
+    indexed line by line. Files can be compressed with gzip or zstd; compressed files are
+    recognized by their magic number when they are read.
+    """
+
+    FORMATS = ('indent', 'compact')
+    COMPRESSIONS = ('none', 'gzip', 'zstd')
+
+    def __init__(self, format='indent', compression='none'):
+        """
+        Initialize the serializer.
+
+        Args:
+            format (str): 'indent' or 'compact'.
+            compression (str): 'none', 'gzip' or 'zstd'.
+
+        Raises:
+            ValueError: If the format or compression is unknown, or zstd is not installed.
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown history format '{format}', expected one of {', '.join(self.FORMATS)}.")
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unknown history compression '{compression}', "
+                             f"expected one of {', '.join(self.COMPRESSIONS)}.")
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("HISTORY_COMPRESSION=zstd requires the zstandard package.")
+        self.format = format
+        self.compression = compression
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the serializer selected by the HISTORY_FORMAT and HISTORY_COMPRESSION settings."""
+        return cls(config.history_format, config.history_compression)
+
+    @property
+    def compact(self):
+        """Whether orders are written one per line."""
+        return self.format == 'compact'
+
+    @staticmethod
+    def loads(data):
+        """Decode a JSON document from bytes or a string."""
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    @staticmethod
+    def dumps_compact(value):
+        """Encode a value as single-line UTF-8 JSON, keys in insertion order."""
+        if orjson is not None:
+            return orjson.dumps(value)
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def encode_order(self, order):
+        """
+        Encode an order as an element of the history array.
+
+        Args:
+            order (dict): The order.
+
+        Returns:
+            bytes: The encoded order, without the separator preceding it.
+        """
+        if self.compact:
+            return self.dumps_compact(order)
+        # orjson only indents by two spaces, the indented format keeps the layout of the existing histories
+        return json.dumps(order, ensure_ascii=False, indent=4).replace("\n", "\n    ").encode('utf-8')
+
+    @staticmethod
+    def detect_compression(path):
+        """
+        Return the compression of a file from its magic number.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            str: 'none', 'gzip' or 'zstd'.
+        """
+        with open(path, 'rb') as file:
+            magic = file.read(4)
+        if magic.startswith(GZIP_MAGIC):
+            return 'gzip'
+        if magic.startswith(ZSTD_MAGIC):
+            return 'zstd'
+        return 'none'
+
+    @staticmethod
+    def open_reader(path, buffered=True):
+        """
+        Open a history file for reading, decompressing it if needed. Compressed readers only
+        seek forward efficiently: seeking decompresses the data up to the new position.
+
+        Args:
+            path (str): Path of the file.
+            buffered (bool): Whether the reader must support peek() and reading lines; zstd
+                readers only seek when they are not buffered.
+
+        Returns:
+            A binary file object.
+        """
+        compression = HistorySerializer.detect_compression(path)
+        if compression == 'gzip':
+            return gzip.open(path, 'rb')
+        if compression == 'zstd':
+            if zstandard is None:
+                raise ValueError(f"{path} is compressed with zstd, which requires the zstandard package.")
+            reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+            return io.BufferedReader(reader) if buffered else reader
+        return open(path, 'rb')
+
+    @contextlib.contextmanager
+    def open_writer(self, file):
+        """
+        Wrap a binary file opened for writing with the configured compression. The file is
+        left open, so that it can be synced once the compressed stream is complete.
+
+        Args:
+            file: The binary file object.
+
+        Yields:
+            A binary file object writing to file.
+        """
+        if self.compression == 'gzip':
+            with gzip.GzipFile(fileobj=file, mode='wb', compresslevel=6) as writer:
+                yield writer
+        elif self.compression == 'zstd':
+            with zstandard.ZstdCompressor(level=3).stream_writer(file, closefd=False) as writer:
+                yield writer
+        else:
+            yield file
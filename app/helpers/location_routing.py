@@ -0,0 +1,167 @@
+import json
+import logging
+from app.helpers.matching_utils import MatchingUtils
+
+
+class LocationRoutingTable:
+    """
+    Precomputed routing of order lines to Grocy stock locations.
+
+    Routes are configured with location names or IDs and resolved once against the Grocy
+    locations list, so that routing a line is a dictionary lookup. A line is routed, in
+    order of precedence, by its Auchan category, by the default location of the matched
+    Grocy product, and otherwise to the default location.
+    """
+
+    def __init__(self, locations, default_location="Parking", category_routes=None, product_location_routes=None,
+                 use_product_location=False):
+        """
+        Build the routing table for a Grocy locations list.
+
+        Args:
+            locations (list): The locations fetched from Grocy.
+            default_location (str): Name or ID of the location receiving lines without a route.
+            category_routes (dict): Map of Auchan category -> location name or ID.
+            product_location_routes (dict): Map of Grocy default location name or ID -> location name or ID.
+            use_product_location (bool): Whether to route lines to the default location of the matched
+                Grocy product when no other route applies.
+        """
+        self.locations = locations
+        self.logger = logging.getLogger(__name__)
+        self.ids = {str(location['id']): location['id'] for location in locations}  # Grocy may return string IDs
+        self.ids_by_name = {MatchingUtils.normalize_name(location['name']): location['id'] for location in locations}
+        self.use_product_location = use_product_location
+
+        self.default_location_id = self.resolve(default_location, fuzzy=True)
+        self.category_routes = {
+            MatchingUtils.normalize_name(category): location_id
+            for category, location_id in self.resolve_routes(category_routes).items()
+        }
+        self.product_location_routes = {}
+        for source, location_id in self.resolve_routes(product_location_routes).items():
+            source_id = self.resolve(source)
+            if source_id is not None:
+                self.product_location_routes[str(source_id)] = location_id
+
+    @staticmethod
+    def parse_routes(text):
+        """
+        Parse routes written as 'source=target' pairs separated by semicolons.
+
+        Args:
+            text (str): The routes, e.g. 'Surgelés=Congélateur;Crèmerie=Réfrigérateur'.
+
+        Returns:
+            dict: Map of source -> target.
+        """
+        routes = {}
+        for route in (text or "").split(';'):
+            source, separator, target = route.partition('=')
+            if separator and source.strip() and target.strip():
+                routes[source.strip()] = target.strip()
+        return routes
+
+    @classmethod
+    def from_config(cls, locations, config):
+        """
+        Build the routing table from the configuration. Routes from LOCATION_ROUTING_FILE
+        take precedence over the ones from the environment.
+
+        Args:
+            locations (list): The locations fetched from Grocy.
+            config (Config): The application configuration.
+
+        Returns:
+            LocationRoutingTable: The routing table.
+        """
+        settings = {
+            "default": config.default_location,
+            "categories": cls.parse_routes(config.location_category_routes),
+            "product_locations": cls.parse_routes(config.location_product_routes),
+            "use_product_location": config.use_product_location
+        }
+
+        if config.location_routing_file:
+            try:
+                with open(config.location_routing_file, 'r', encoding='utf-8') as file:
+                    routing = json.load(file)
+                settings["default"] = routing.get("default", settings["default"])
+                settings["categories"].update(routing.get("categories", {}))
+                settings["product_locations"].update(routing.get("product_locations", {}))
+                settings["use_product_location"] = routing.get("use_product_location", settings["use_product_location"])
+            except (OSError, ValueError) as e:
+                logging.getLogger(__name__).error(
+                    f"Failed to load location routing file {config.location_routing_file}: {e}"
+                )
+
+        return cls(
+            locations,
+            default_location=settings["default"],
+            category_routes=settings["categories"],
+            product_location_routes=settings["product_locations"],
+            use_product_location=settings["use_product_location"]
+        )
+
+    def resolve(self, location, fuzzy=False):
+        """
+        Resolve a location name or ID to the ID of a Grocy location.
+
+        Args:
+            location (str | int): The location name or ID.
+            fuzzy (bool): Whether to fall back to the most similar location name.
+
+        Returns:
+            int: The location ID, or None if it cannot be resolved.
+        """
+        location_id = self.ids_by_name.get(MatchingUtils.normalize_name(str(location)))
+        if location_id is not None:
+            return location_id
+
+        location_id = self.ids.get(str(location).strip())
+        if location_id is not None:
+            return location_id
+
+        if fuzzy:
+            best_match = MatchingUtils.get_best_match(str(location), self.locations)
+            if best_match:
+                self.logger.info(f"Location '{location}' resolved to '{best_match['product']['name']}' "
+                                 f"({best_match['similarity_percentage']:.2f}% similarity).")
+                return best_match['product']['id']
+
+        self.logger.warning(f"No Grocy location found for '{location}'.")
+        return None
+
+    def resolve_routes(self, routes):
+        """Resolve the targets of routes, dropping the ones that cannot be resolved."""
+        resolved = {}
+        for source, target in (routes or {}).items():
+            location_id = self.resolve(target)
+            if location_id is not None:
+                resolved[source] = location_id
+        return resolved
+
+    def route(self, category, grocy_product):
+        """
+        Return the stock location of an order line.
+
+        Args:
+            category (str): The Auchan category of the line, or None.
+            grocy_product (dict): The Grocy product matched to the line.
+
+        Returns:
+            int: The location ID, or None if there is no route and no default location.
+        """
+        if category:
+            location_id = self.category_routes.get(MatchingUtils.normalize_name(category))
+            if location_id is not None:
+                return location_id
+
+        product_location_id = grocy_product.get('location_id') if grocy_product else None
+        if product_location_id is not None:
+            location_id = self.product_location_routes.get(str(product_location_id))
+            if location_id is None and self.use_product_location:
+                location_id = self.ids.get(str(product_location_id))
+            if location_id is not None:
+                return location_id
+
+        return self.default_location_id
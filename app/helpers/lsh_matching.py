@@ -0,0 +1,174 @@
+import heapq
+import zlib
+import numpy as np
+from app.helpers.matching_utils import MatchingUtils
+
+# Mersenne prime used by the universal hash family of the MinHash permutations
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+class MinHashLSHIndex:
+    """
+    Approximate matcher for very large catalogs based on MinHash and locality-sensitive hashing.
+
+    Product names are turned into character shingles and summarized by a MinHash signature.
+    Signatures are split into bands; products sharing at least one identical band with the
+    query become candidates, which are then re-ranked with the exact cosine score of the
+    CatalogIndex. More bands (fewer rows per band) raise recall at the cost of more
+    candidates to re-rank.
+    """
+
+    def __init__(self, catalog_index, num_perm=128, bands=32, shingle_size=3, seed=1):
+        """
+        Build the LSH buckets for a catalog.
+
+        Args:
+            catalog_index (CatalogIndex): The index over the product catalog, used for re-ranking.
+            num_perm (int): Number of hash permutations in a MinHash signature.
+            bands (int): Number of LSH bands, must divide num_perm.
+            shingle_size (int): Length of the character shingles.
+            seed (int): Seed of the hash permutations.
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"LSH bands ({bands}) must divide the number of permutations ({num_perm}).")
+
+        self.catalog_index = catalog_index
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+
+        generator = np.random.default_rng(seed)
+        self.hash_a = generator.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.hash_b = generator.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self.buckets = [{} for _ in range(bands)]  # per band: band signature -> product positions
+        for position, product in enumerate(catalog_index.products):
+            signature = self.signature(product['name'])
+            if signature is None:
+                continue
+            for band, key in enumerate(self.band_keys(signature)):
+                self.buckets[band].setdefault(key, []).append(position)
+
+    def shingles(self, text):
+        """
+        Splits a text into hashed character shingles.
+
+        Args:
+            text (str): The text to shingle.
+
+        Returns:
+            numpy.ndarray: The distinct shingle hashes.
+        """
+        normalized = " ".join(MatchingUtils.tokenize(text))
+        if not normalized:
+            return np.empty(0, dtype=np.uint64)
+        if len(normalized) <= self.shingle_size:
+            grams = {normalized}
+        else:
+            grams = {normalized[i:i + self.shingle_size] for i in range(len(normalized) - self.shingle_size + 1)}
+        return np.fromiter(
+            (zlib.crc32(gram.encode('utf-8')) % _MERSENNE_PRIME for gram in grams),
+            dtype=np.uint64, count=len(grams)
+        )
+
+    def signature(self, text):
+        """
+        Computes the MinHash signature of a text.
+
+        Args:
+            text (str): The text to summarize.
+
+        Returns:
+            numpy.ndarray: The signature, or None if the text has no shingles.
+        """
+        shingles = self.shingles(text)
+        if shingles.size == 0:
+            return None
+        hashes = (self.hash_a[:, None] * shingles[None, :] + self.hash_b[:, None]) % _MERSENNE_PRIME
+        return hashes.min(axis=1)
+
+    def band_keys(self, signature):
+        """
+        Splits a signature into its hashable band keys.
+
+        Args:
+            signature (numpy.ndarray): The MinHash signature.
+
+        Returns:
+            list: One bytes key per band.
+        """
+        return [
+            signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def candidates(self, query):
+        """
+        Collects the catalog positions sharing at least one LSH band with the query.
+
+        Args:
+            query (str): The product name to search for.
+
+        Returns:
+            list: Sorted product positions.
+        """
+        signature = self.signature(query)
+        if signature is None:
+            return []
+
+        positions = set()
+        for band, key in enumerate(self.band_keys(signature)):
+            positions.update(self.buckets[band].get(key, ()))
+        return sorted(positions)
+
+    def get_best_match(self, query, k=1):
+        """
+        Finds the best matching product among the LSH candidates, re-ranked by exact cosine similarity.
+
+        Falls back to the exact CatalogIndex lookup when no candidate shares a band with the query.
+
+        Args:
+            query (str): The product name to search for.
+            k (int): Number of top matches to compute; the k-1 next best are returned as 'runner_ups'.
+
+        Returns:
+            dict: The product with the highest similarity to the query, its percentage similarity and
+            the runner-up matches, or None if the catalog is empty.
+        """
+        candidates = self.candidates(query)
+        if not candidates:
+            return self.catalog_index.get_best_match(query, k)
+
+        query_vector = self.catalog_index.vectorize(query)
+        query_norm = np.sqrt(sum(count ** 2 for count in query_vector.values()))
+
+        scored = [
+            (self.catalog_index.score(query_vector, query_norm, position), position)
+            for position in candidates
+        ]
+        top_matches = heapq.nsmallest(k, scored, key=lambda item: (-item[0], item[1]))
+        matches = [
+            {
+                'product': self.catalog_index.products[position],
+                'similarity_percentage': float(similarity) * 100
+            }
+            for similarity, position in top_matches
+        ]
+
+        best_match = matches[0]
+        best_match['runner_ups'] = [match for match in matches[1:] if match['similarity_percentage'] > 0]
+        return best_match
+
+    def match_many(self, queries, k=1):
+        """
+        Finds the best matching product for every query.
+
+        Args:
+            queries (list): The query strings.
+            k (int): Number of top matches to compute per query.
+
+        Returns:
+            list: One result per query, as returned by get_best_match.
+        """
+        return [self.get_best_match(query, k) for query in queries]
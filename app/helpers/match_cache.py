@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from app.helpers.utils import Utils
+
+
+class MatchCache:
+    """
+    Persistent mapping of Auchan product names to accepted Grocy products.
+
+    Entries are keyed by the normalized Auchan name and remember the fingerprint of the
+    catalog they were matched against, so that a catalog change turns them into misses.
+    The cache is bounded: the least recently used entries are evicted first.
+    """
+
+    def __init__(self, cache_file, max_entries=5000):
+        """
+        Initialize the cache and load it from disk if the file exists.
+
+        Args:
+            cache_file (str): Path of the JSON file backing the cache.
+            max_entries (int): Maximum number of entries kept before evicting.
+        """
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        self.entries = OrderedDict()  # normalized name -> entry, least recently used first
+        self.dirty = False
+        self.load()
+
+    @staticmethod
+    def normalize(product_name):
+        """
+        Normalize an Auchan product name into a cache key.
+
+        Args:
+            product_name (str): The product name from the order.
+
+        Returns:
+            str: The lowercase name with collapsed whitespace.
+        """
+        return (Utils.clean_string(product_name) or "").lower()
+
+    def load(self):
+        """Loads the cache entries from the JSON file."""
+        if not os.path.exists(self.cache_file):
+            return
+
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as file:
+                self.entries = OrderedDict(json.load(file).get('entries', {}))
+            self.logger.info(f"Loaded {len(self.entries)} cached product matches from {self.cache_file}.")
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Failed to load match cache {self.cache_file}: {e}")
+            self.entries = OrderedDict()
+
+    def save(self):
+        """Writes the cache entries to the JSON file if they changed."""
+        if not self.dirty:
+            return
+
+        temp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                json.dump({'entries': self.entries}, file, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+            self.dirty = False
+        except OSError as e:
+            self.logger.error(f"Failed to save match cache {self.cache_file}: {e}")
+
+    def get(self, product_name, fingerprint):
+        """
+        Look up the accepted match for a product name.
+
+        Args:
+            product_name (str): The product name from the order.
+            fingerprint (str): The fingerprint of the current catalog.
+
+        Returns:
+            dict: The cached entry, or None on a miss or when it was matched against another catalog.
+        """
+        key = self.normalize(product_name)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        if entry['fingerprint'] != fingerprint:
+            # Matched against an older catalog, the product may have been renamed or removed
+            del self.entries[key]
+            self.dirty = True
+            return None
+
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, product_name, fingerprint, product, similarity_percentage):
+        """
+        Record an accepted match, evicting the least recently used entries if the cache is full.
+
+        Args:
+            product_name (str): The product name from the order.
+            fingerprint (str): The fingerprint of the catalog the match was made against.
+            product (dict): The matched Grocy product.
+            similarity_percentage (float): The similarity of the match.
+        """
+        key = self.normalize(product_name)
+        self.entries[key] = {
+            'fingerprint': fingerprint,
+            'product_id': product['id'],
+            'product_name': product['name'],
+            'similarity_percentage': similarity_percentage,
+            'updated_at': int(time.time())
+        }
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.dirty = True
+
+    def invalidate(self, product_name):
+        """
+        Remove the cached match for a single product name.
+
+        Args:
+            product_name (str): The product name from the order.
+
+        Returns:
+            bool: True if an entry was removed.
+        """
+        if self.entries.pop(self.normalize(product_name), None) is None:
+            return False
+        self.dirty = True
+        return True
+
+    def __len__(self):
+        return len(self.entries)
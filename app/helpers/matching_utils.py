@@ -1,7 +1,22 @@
+import hashlib
+import heapq
 import math
+import unicodedata
+from abc import ABC, abstractmethod
 from collections import Counter
 import re
 
+# Floating point rounding allowed when comparing cosine scores and their upper bounds
+SCORE_TOLERANCE = 1e-9
+# Cosine score from which a match counts as exact
+EXACT_MATCH_SCORE = 1 - SCORE_TOLERANCE
+
+# Quantity and packaging suffixes such as "500g", "1,5 L", "6x33cl" or "x6"
+_UNIT_SUFFIX_PATTERN = re.compile(
+    r'\b(?:\d+\s*x\s*)?\d+(?:[.,]\d+)?\s*(?:kg|g|mg|l|dl|cl|ml|pcs)\b'
+    r'|\b(?:x\s*\d+|\d+\s*x)\b'
+)
+
 class MatchingUtils:
     @staticmethod
     def tokenize(text):
@@ -16,6 +31,41 @@ class MatchingUtils:
         """
         return re.findall(r'\b\w+\b', text.lower())
 
+    @staticmethod
+    def normalize_name(text):
+        """
+        Normalizes a product name for exact lookups: lowercase, without accents, quantity and
+        packaging suffixes, punctuation or redundant whitespace.
+
+        Args:
+            text (str): The product name to normalize.
+
+        Returns:
+            str: The normalized name.
+        """
+        decomposed = unicodedata.normalize('NFKD', text.lower())
+        without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+        without_units = _UNIT_SUFFIX_PATTERN.sub(' ', without_accents)
+        return " ".join(re.findall(r'\b\w+\b', without_units))
+
+    @staticmethod
+    def unit_suffixes(text):
+        """
+        Extracts the quantity and packaging suffixes of a product name in a canonical form,
+        e.g. "1,5 L" -> "1.5l" and "6 x 33cl" -> "6x33cl".
+
+        Args:
+            text (str): The product name.
+
+        Returns:
+            tuple: The sorted suffixes, empty if the name has none.
+        """
+        decomposed = unicodedata.normalize('NFKD', text.lower())
+        without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+        return tuple(sorted(
+            re.sub(r'\s+', '', suffix).replace(',', '.') for suffix in _UNIT_SUFFIX_PATTERN.findall(without_accents)
+        ))
+
     @staticmethod
     def vectorize(text, vocabulary):
         """
@@ -57,6 +107,9 @@ class MatchingUtils:
         """
         Finds the product with the highest cosine similarity to the query and returns the percentage similarity.
 
+        This builds a throwaway CatalogIndex; callers matching many queries against the same
+        catalog should build a CatalogIndex once and reuse it.
+
         Args:
             query (str): The product name to search for.
             products (list): The list of products from Grocy, each with a 'name' field.
@@ -64,29 +117,426 @@ class MatchingUtils:
         Returns:
             dict: The product with the highest similarity to the query and its percentage similarity.
         """
-        all_product_names = [product['name'] for product in products]
-        all_words = set(word for name in all_product_names for word in MatchingUtils.tokenize(name))
-        vocabulary = list(all_words)
+        return CatalogIndex(products).get_best_match(query)
 
-        query_vector = MatchingUtils.vectorize(query, vocabulary)
 
-        best_match = None
-        highest_similarity = -1
-        for product in products:
-            product_vector = MatchingUtils.vectorize(product['name'], vocabulary)
-            similarity = MatchingUtils.cosine_similarity(query_vector, product_vector)
+class CatalogIndex:
+    """
+    Precomputed bag-of-words index over a product catalog.
 
-            if similarity > highest_similarity:
-                highest_similarity = similarity
-                best_match = product
+    Product names are tokenized once into sparse vectors (token -> count) with their norms,
+    and an inverted token -> product posting list is kept so that a query only scores the
+    products sharing at least one token with it.
+    """
+
+    def __init__(self, products):
+        """
+        Build the index for a catalog.
+
+        Args:
+            products (list): The list of products from Grocy, each with a 'name' field.
+        """
+        self.products = products
+        self.vectors = []  # Sparse vector (token -> count) per product
+        self.norms = []  # Euclidean norm of each product vector
+        self.max_counts = []  # Highest token count of each product vector, used for score bounds
+        self.postings = {}  # token -> list of product positions containing it
+        self.positions_by_id = {}  # Grocy product ID -> position in the catalog
+        self._fingerprint = None
+
+        for position, product in enumerate(products):
+            vector = Counter(MatchingUtils.tokenize(product['name']))
+            self.vectors.append(vector)
+            self.norms.append(math.sqrt(sum(count ** 2 for count in vector.values())))
+            self.max_counts.append(max(vector.values(), default=0))
+            for token in vector:
+                self.postings.setdefault(token, []).append(position)
+            self.positions_by_id[product.get('id')] = position
+
+    def __len__(self):
+        return len(self.products)
+
+    @property
+    def fingerprint(self):
+        """
+        A stable hash of the product IDs and names in the catalog, used to detect catalog changes.
+
+        Returns:
+            str: The hexadecimal SHA-1 digest of the catalog.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for product in self.products:
+                digest.update(f"{product.get('id')}\x1f{product['name']}\x1e".encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def get_product(self, product_id):
+        """
+        Look up a product of the catalog by its Grocy ID.
+
+        Args:
+            product_id (int): The Grocy product ID.
+
+        Returns:
+            dict: The product, or None if it is not in the catalog.
+        """
+        position = self.positions_by_id.get(product_id)
+        return self.products[position] if position is not None else None
+
+    def vectorize(self, text):
+        """
+        Converts a text into a sparse vector restricted to the catalog vocabulary.
+
+        Args:
+            text (str): The text to vectorize.
+
+        Returns:
+            Counter: Token counts for the tokens of the text that appear in the catalog.
+        """
+        return Counter(token for token in MatchingUtils.tokenize(text) if token in self.postings)
+
+    def overlaps(self, query_vector):
+        """
+        Counts, for every product sharing at least one token with the query, how many distinct
+        query tokens it contains.
+
+        Args:
+            query_vector (Counter): The sparse query vector.
+
+        Returns:
+            Counter: Map of product position -> number of shared tokens.
+        """
+        overlaps = Counter()
+        for token in query_vector:
+            overlaps.update(self.postings[token])
+        return overlaps
+
+    def score(self, query_vector, query_norm, position):
+        """
+        Computes the cosine similarity between a query vector and an indexed product.
+
+        Args:
+            query_vector (Counter): The sparse query vector.
+            query_norm (float): The norm of the query vector.
+            position (int): The position of the product in the catalog.
+
+        Returns:
+            float: The cosine similarity between the query and the product.
+        """
+        product_vector = self.vectors[position]
+        product_norm = self.norms[position]
+        if query_norm == 0 or product_norm == 0:
+            return 0.0
+
+        dot_product = sum(count * product_vector[token] for token, count in query_vector.items() if token in product_vector)
+        return dot_product / (query_norm * product_norm)
+
+    def bounded_candidates(self, query_vector, query_norm):
+        """
+        Computes an upper bound of the cosine similarity of every product sharing a token with
+        the query, from the number of shared tokens, the largest token counts and the vector norms.
+
+        Args:
+            query_vector (Counter): The sparse query vector.
+            query_norm (float): The norm of the query vector.
+
+        Returns:
+            list: (-bound, position) pairs sorted by decreasing bound, then catalog position.
+        """
+        query_counts = sorted(query_vector.values(), reverse=True)
+        query_prefix_sums = [0]
+        for count in query_counts:
+            query_prefix_sums.append(query_prefix_sums[-1] + count)
+
+        candidates = []
+        for position, shared_tokens in self.overlaps(query_vector).items():
+            product_norm = self.norms[position]
+            # The dot product is at most the m largest query counts times the largest product count
+            dot_bound = query_prefix_sums[shared_tokens] * self.max_counts[position]
+            bound = min(1.0, dot_bound / (query_norm * product_norm)) if product_norm else 0.0
+            candidates.append((-bound, position))
+        candidates.sort()
+        return candidates
+
+    def top_k_matches(self, query, k):
+        """
+        Finds the k products with the highest cosine similarity to the query.
+
+        Candidates are visited by decreasing upper bound of their achievable cosine, derived
+        from the number of shared tokens, the largest token counts and the vector norms. A
+        bounded min-heap keeps the k best scores, and the scan stops as soon as the next bound
+        cannot beat the k-th score. It also stops at the first exact (100%) match: nothing can
+        beat it, so the runner-ups found so far are returned without looking for k-1 others.
+
+        Args:
+            query (str): The product name to search for.
+            k (int): The maximum number of matches to return.
+
+        Returns:
+            list: Up to k dicts with the 'product' and its 'similarity_percentage', best first.
+            Products sharing no token with the query are never returned.
+        """
+        query_vector = self.vectorize(query)
+        if not query_vector or k <= 0:
+            return []
 
-        # Convert similarity to percentage
-        similarity_percentage = highest_similarity * 100
+        query_norm = math.sqrt(sum(count ** 2 for count in query_vector.values()))
+        heap = []  # (score, -position): the weakest match, and the later product among ties, is on top
+        best_similarity = 0.0
+        for negative_bound, position in self.bounded_candidates(query_vector, query_norm):
+            if best_similarity >= EXACT_MATCH_SCORE or (len(heap) == k and -negative_bound < heap[0][0]):
+                break
+            similarity = self.score(query_vector, query_norm, position)
+            best_similarity = max(best_similarity, similarity)
+            if len(heap) < k:
+                heapq.heappush(heap, (similarity, -position))
+            elif (similarity, -position) > heap[0]:
+                heapq.heapreplace(heap, (similarity, -position))
 
-        if best_match:
-            return {
-                'product': best_match,
-                'similarity_percentage': similarity_percentage
+        return [
+            {
+                'product': self.products[-negative_position],
+                'similarity_percentage': similarity * 100
             }
+            for similarity, negative_position in sorted(heap, key=lambda item: (-item[0], -item[1]))
+        ]
+
+    def get_best_match(self, query, k=1):
+        """
+        Finds the product with the highest cosine similarity to the query.
+
+        Scores are identical to a brute-force scan over the whole catalog: products that share
+        no token with the query score 0, so when nothing overlaps the first product is returned
+        with a similarity of 0%, as before.
+
+        Args:
+            query (str): The product name to search for.
+            k (int): Number of top matches to compute; the k-1 next best are returned as 'runner_ups'.
+
+        Returns:
+            dict: The product with the highest similarity to the query, its percentage similarity and
+            the runner-up matches, or None if the catalog is empty.
+        """
+        if not self.products:
+            return None
+
+        matches = self.top_k_matches(query, k)
+        if not matches:
+            return {'product': self.products[0], 'similarity_percentage': 0.0, 'runner_ups': []}
+
+        best_match = matches[0]
+        best_match['runner_ups'] = matches[1:]
+        return best_match
+
+
+class MatcherStage(ABC):
+    """
+    Base class of a stage of the MatcherPipeline.
+
+    A stage either resolves a query to a match or returns None to hand it over to the next,
+    more expensive stage. Each stage counts how many queries it saw and resolved.
+    """
+
+    name = "stage"
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+
+    @abstractmethod
+    def match(self, query):
+        """
+        Try to resolve a single query.
+
+        Args:
+            query (str): The product name to search for.
+
+        Returns:
+            dict: The match ('product' and 'similarity_percentage'), or None if the stage cannot resolve it.
+        """
+
+    def match_many(self, queries, k=1):
+        """
+        Try to resolve a batch of queries, updating the hit counters.
+
+        Args:
+            queries (list): The product names to search for.
+            k (int): Number of top matches to compute per query, for stages able to report runner-ups.
+
+        Returns:
+            list: One match or None per query.
+        """
+        results = self.resolve_many(queries, k)
+        self.attempts += len(queries)
+        self.hits += sum(1 for result in results if result is not None)
+        return results
+
+    def resolve_many(self, queries, k):
+        """Resolve a batch of queries, one at a time unless a stage overrides it."""
+        return [self.match(query) for query in queries]
+
+    @property
+    def hit_rate(self):
+        """The fraction of the queries seen by this stage that it resolved."""
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    def stats(self):
+        """
+        Returns:
+            dict: The attempts, hits and hit rate of the stage.
+        """
+        return {'attempts': self.attempts, 'hits': self.hits, 'hit_rate': self.hit_rate}
+
+    def reset_stats(self):
+        """Reset the hit counters."""
+        self.attempts = 0
+        self.hits = 0
+
+
+class NormalizedNameStage(MatcherStage):
+    """
+    O(1) hash lookup of the normalized query name (case, accents, whitespace and the spelling
+    of unit suffixes ignored) among the normalized catalog names. The unit suffixes must be
+    the same, so that "Lait 1L" never resolves to "Lait 500ml". A hit is reported as a 100% match.
+    """
+
+    name = "normalized_name"
+
+    def __init__(self, catalog_index):
+        super().__init__()
+        self.names = {}  # (normalized name, unit suffixes) -> first product with that name
+        for product in catalog_index.products:
+            normalized = MatchingUtils.normalize_name(product['name'])
+            if normalized:
+                self.names.setdefault((normalized, MatchingUtils.unit_suffixes(product['name'])), product)
+
+    def match(self, query):
+        product = self.names.get((MatchingUtils.normalize_name(query), MatchingUtils.unit_suffixes(query)))
+        if product is None:
+            return None
+        return {'product': product, 'similarity_percentage': 100.0}
+
+
+class TokenOverlapStage(MatcherStage):
+    """
+    Scores only a shortlist of the products with the highest cosine upper bound, and accepts
+    the best of them if it reaches the acceptance threshold and no product left out of the
+    shortlist could score as high, so that it resolves a query like a full scan would.
+    """
+
+    name = "token_overlap"
+
+    def __init__(self, catalog_index, shortlist_size, accept_threshold):
+        """
+        Args:
+            catalog_index (CatalogIndex): The index over the product catalog.
+            shortlist_size (int): Number of products with the highest cosine upper bound to score.
+            accept_threshold (float): Minimum similarity percentage for the stage to resolve a query.
+        """
+        super().__init__()
+        self.catalog_index = catalog_index
+        self.shortlist_size = shortlist_size
+        self.accept_threshold = accept_threshold
+
+    def match(self, query):
+        query_vector = self.catalog_index.vectorize(query)
+        if not query_vector:
+            return None
+        query_norm = math.sqrt(sum(count ** 2 for count in query_vector.values()))
+
+        candidates = self.catalog_index.bounded_candidates(query_vector, query_norm)
+        best_position = None
+        highest_similarity = 0.0
+        for _, position in candidates[:self.shortlist_size]:
+            similarity = self.catalog_index.score(query_vector, query_norm, position)
+            # Among equal scores the first product of the catalog wins, like a full scan
+            if best_position is None or (similarity, -position) > (highest_similarity, -best_position):
+                highest_similarity = similarity
+                best_position = position
+
+        if best_position is None or highest_similarity * 100 < self.accept_threshold:
+            return None
+        if len(candidates) > self.shortlist_size and \
+                -candidates[self.shortlist_size][0] >= highest_similarity - SCORE_TOLERANCE:
+            return None  # A product left out of the shortlist may score as high, leave it to the full scan
+        return {
+            'product': self.catalog_index.products[best_position],
+            'similarity_percentage': highest_similarity * 100
+        }
+
+
+class ScorerStage(MatcherStage):
+    """Final stage delegating to a full matcher (BatchMatcher or MinHashLSHIndex) over the remaining queries."""
+
+    name = "cosine"
+
+    def __init__(self, matcher):
+        super().__init__()
+        self.matcher = matcher
+
+    def match(self, query):
+        return self.matcher.match_many([query])[0]
+
+    def resolve_many(self, queries, k):
+        return self.matcher.match_many(queries, k) if queries else []
+
+
+class MatcherPipeline:
+    """
+    Tiered matcher running each query through cheaper stages first and falling back to the
+    next stage only for the queries a stage could not resolve.
+    """
+
+    def __init__(self, catalog_index, stages):
+        """
+        Args:
+            catalog_index (CatalogIndex): The index over the product catalog.
+            stages (list): The MatcherStage instances, from cheapest to most expensive.
+        """
+        self.catalog_index = catalog_index
+        self.stages = stages
+
+    def match_many(self, queries, k=1):
+        """
+        Resolve a batch of queries through the stages.
+
+        Args:
+            queries (list): The product names to search for.
+            k (int): Number of top matches to compute per query, for stages able to report runner-ups.
+
+        Returns:
+            list: One match or None per query, in the order of the queries.
+        """
+        results = [None] * len(queries)
+        pending = list(range(len(queries)))
+
+        for stage in self.stages:
+            if not pending:
+                break
+            stage_results = stage.match_many([queries[i] for i in pending], k)
+            unresolved = []
+            for i, result in zip(pending, stage_results):
+                if result is None:
+                    unresolved.append(i)
+                else:
+                    results[i] = result
+            pending = unresolved
+
+        return results
+
+    def get_best_match(self, query, k=1):
+        """Resolve a single query through the stages."""
+        return self.match_many([query], k)[0]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Map of stage name -> attempts, hits and hit rate.
+        """
+        return {stage.name: stage.stats() for stage in self.stages}
 
-        return None
+    def reset_stats(self):
+        """Reset the hit counters of the stages, e.g. to report them per order."""
+        for stage in self.stages:
+            stage.reset_stats()
@@ -0,0 +1,317 @@
+import logging
+from html.parser import HTMLParser
+from app.helpers.utils import Utils
+
+# Extract the cells of every order history row in the browser, in a single round trip
+ORDER_ROWS_SCRIPT = """
+rows => rows.map(row => {
+    const text = selector => {
+        const element = row.querySelector(selector);
+        return element ? element.textContent : null;
+    };
+    const link = row.querySelector("a[data-link-action='view-order-details']");
+    return {
+        order_number: text("td:nth-child(1)"),
+        reference: text("th[scope='row']"),
+        date: text("td:nth-child(3)"),
+        total_price: text("td:nth-child(4)"),
+        pickup_point: text("td:nth-child(5)"),
+        payment_method: text("td:nth-child(6)"),
+        status: text("td:nth-child(7) span"),
+        details_link: link ? link.getAttribute("href") : null
+    };
+})
+"""
+
+# Extract the category and product rows of an order details table in the browser, in a single round trip
+ORDER_PRODUCTS_SCRIPT = """
+rows => rows.map(row => {
+    const category = row.querySelector("td > span");
+    if (category) {
+        return {category: category.textContent};
+    }
+    const text = selector => {
+        const element = row.querySelector(selector);
+        return element ? element.textContent : "";
+    };
+    return {
+        name: text(".manufacturer-name"),
+        description: text("strong > a"),
+        quantity: text("td:nth-child(2)"),
+        unit_price: text("td:nth-child(3)"),
+        total_price: text("td:nth-child(4)"),
+        discount: text(".ri-block.product-line-discount span"),
+        cagnotte: text(".cagnotte-block.product-line-discount span")
+    };
+})
+"""
+
+ORDER_ROWS_SELECTOR = "table.table tbody tr"
+ORDER_PRODUCTS_SELECTOR = "#order-products tbody tr"
+
+# Product fields read from the cells of a product row: td:nth-child(n) -> field
+PRODUCT_CELL_FIELDS = {2: "quantity", 3: "unit_price", 4: "total_price"}
+PRODUCT_FIELDS = ("name", "description", "quantity", "unit_price", "total_price", "discount", "cagnotte")
+# Elements without an end tag
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"
+))
+
+logger = logging.getLogger(__name__)
+
+
+class OrderProductsParser(HTMLParser):
+    """
+    Parser of the #order-products table of a static order details page, producing the same
+    raw rows as ORDER_PRODUCTS_SCRIPT without a browser.
+
+    The selectors of the script are matched while the document is streamed: every open
+    element records the fields whose text it holds, and text is added to the fields held
+    by any open element. Like querySelector, only the first match of a field in a row is kept.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []  # Open elements: [tag, classes, fields captured, element children count]
+        self.table_depth = None  # Depth of the #order-products table in the stack
+        self.found_table = False
+        self.row = None  # Fields of the current row: field -> list of text parts
+        self.rows = []
+
+    @classmethod
+    def parse(cls, html):
+        """
+        Parse the product rows of an order details page.
+
+        Args:
+            html (str): The page.
+
+        Returns:
+            list: The raw rows, as returned by ORDER_PRODUCTS_SCRIPT.
+
+        Raises:
+            ValueError: If the page has no #order-products table.
+        """
+        parser = cls()
+        parser.feed(html)
+        parser.close()
+        if not parser.found_table:
+            raise ValueError("The page has no #order-products table.")
+        return parser.rows
+
+    def in_body_rows(self):
+        """Return whether the parser is in the table, outside of its header and footer."""
+        return self.table_depth is not None and not any(
+            element[0] in ("thead", "tfoot") for element in self.stack[self.table_depth + 1:]
+        )
+
+    def fields_of(self, tag, classes, parent):
+        """Return the row fields held by a new element, following the selectors of ORDER_PRODUCTS_SCRIPT."""
+        fields = []
+        if tag == "span" and parent[0] == "td":
+            fields.append("category")
+        if "manufacturer-name" in classes:
+            fields.append("name")
+        if tag == "a" and parent[0] == "strong":
+            fields.append("description")
+        if tag == "td" and parent[0] == "tr" and parent[3] in PRODUCT_CELL_FIELDS:
+            fields.append(PRODUCT_CELL_FIELDS[parent[3]])
+        if tag == "span":
+            for ancestor_classes in (element[1] for element in self.stack):
+                if "product-line-discount" in ancestor_classes:
+                    if "ri-block" in ancestor_classes:
+                        fields.append("discount")
+                    if "cagnotte-block" in ancestor_classes:
+                        fields.append("cagnotte")
+        return [field for field in fields if field not in self.row]
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        classes = set((attributes.get("class") or "").split())
+
+        if tag in ("tr", "td", "th"):
+            self.close_implied(tag)
+        if self.stack:
+            self.stack[-1][3] += 1  # Count the element children, for :nth-child()
+
+        fields = []
+        if tag == "tr" and self.in_body_rows() and self.row is None:
+            self.row = {}
+        elif self.row is not None and self.stack:
+            fields = self.fields_of(tag, classes, self.stack[-1])
+            for field in fields:
+                self.row[field] = []
+
+        if tag in VOID_ELEMENTS:
+            return
+        self.stack.append([tag, classes, fields, 0])
+        if tag == "table" and attributes.get("id") == "order-products" and self.table_depth is None:
+            self.table_depth = len(self.stack) - 1
+            self.found_table = True
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def close_implied(self, tag):
+        """Close the cells and rows a new cell or row implicitly ends, like an HTML browser."""
+        closed = ("td", "th") if tag in ("td", "th") else ("td", "th", "tr")
+        while self.stack and self.stack[-1][0] in closed:
+            self.handle_endtag(self.stack[-1][0])
+
+    def handle_endtag(self, tag):
+        if not any(element[0] == tag for element in self.stack):
+            return  # Stray end tag
+        while self.stack:
+            element = self.stack.pop()
+            if element[0] == "tr" and self.row is not None and not any(e[0] == "tr" for e in self.stack):
+                self.finish_row()
+            if self.table_depth is not None and len(self.stack) <= self.table_depth:
+                self.table_depth = None
+            if element[0] == tag:
+                break
+
+    def handle_data(self, data):
+        if self.row is None:
+            return
+        for element in self.stack:
+            for field in element[2]:
+                self.row[field].append(data)
+
+    def finish_row(self):
+        """Store the current row like ORDER_PRODUCTS_SCRIPT: a category row, or a product row."""
+        row = {field: "".join(parts) for field, parts in self.row.items()}
+        if "category" in row:
+            self.rows.append({"category": row["category"]})
+        else:
+            self.rows.append({field: row.get(field, "") for field in PRODUCT_FIELDS})
+        self.row = None
+
+
+class OrderPageExtraction:
+    """
+    Extraction of the order history and order details tables.
+
+    Each table is read with one $$eval call returning its rows as plain JSON, instead of one
+    browser round trip per cell. The rows are then cleaned in Python into the structures
+    stored in the order history.
+    """
+
+    @staticmethod
+    async def extract_orders(page):
+        """
+        Extract the orders listed in the order history table of a page.
+
+        Args:
+            page: Playwright page showing the order history.
+
+        Returns:
+            list: The orders, without their details.
+        """
+        rows = await page.eval_on_selector_all(ORDER_ROWS_SELECTOR, ORDER_ROWS_SCRIPT)
+        return OrderPageExtraction.build_orders(rows)
+
+    @staticmethod
+    async def extract_order_details(page):
+        """
+        Extract the lines of the order details table of a page.
+
+        Args:
+            page: Playwright page showing an order.
+
+        Returns:
+            dict: Map of product full name -> order line.
+        """
+        rows = await page.eval_on_selector_all(ORDER_PRODUCTS_SELECTOR, ORDER_PRODUCTS_SCRIPT)
+        return OrderPageExtraction.build_order_details(rows)
+
+    @staticmethod
+    def parse_order_details_html(html):
+        """
+        Extract the lines of the order details table from a static page, without a browser.
+
+        Args:
+            html (str): The order details page.
+
+        Returns:
+            dict: Map of product full name -> order line.
+
+        Raises:
+            ValueError: If the page has no #order-products table.
+        """
+        return OrderPageExtraction.build_order_details(OrderProductsParser.parse(html))
+
+    @staticmethod
+    def build_orders(rows):
+        """
+        Clean raw order history rows into orders. Rows without a numeric order number or a
+        status are skipped.
+
+        Args:
+            rows (list): Dictionaries of the raw cell texts, as returned by ORDER_ROWS_SCRIPT.
+
+        Returns:
+            list: The orders.
+        """
+        orders = []
+        for row in rows:
+            try:
+                order_number = row.get("order_number")
+                status = row.get("status")
+                if order_number and order_number.isnumeric() and status:
+                    orders.append({
+                        "order_number": order_number,
+                        "reference": row.get("reference"),
+                        "date": Utils.clean_dates(row.get("date")),
+                        "total_price": Utils.clean_price(row.get("total_price")),
+                        "pickup_point": row.get("pickup_point"),
+                        "payment_method": row.get("payment_method"),
+                        "status": Utils.clean_string(status),
+                        "details_link": row.get("details_link")
+                    })
+            except Exception as e:
+                logger.error(f"Failed to extract order details for row: {e}")
+                continue  # Skip to the next row in case of an error
+        return orders
+
+    @staticmethod
+    def build_order_details(rows):
+        """
+        Clean raw order details rows into order lines. A category row sets the category of
+        the product rows following it.
+
+        Args:
+            rows (list): Dictionaries of the raw cell texts, as returned by ORDER_PRODUCTS_SCRIPT.
+
+        Returns:
+            dict: Map of product full name -> order line.
+        """
+        details = {}
+        current_category = None
+        for row in rows:
+            if "category" in row:
+                current_category = row["category"].strip()
+                continue
+
+            product_name = Utils.clean_string(row["name"])
+            product_description = Utils.clean_string(row["description"])
+
+            # Ensure the description doesn't duplicate the name
+            if product_description.startswith(product_name):
+                product_full_name = product_description  # Use only the description if it already includes the name
+            else:
+                product_full_name = f"{product_name} {product_description}".strip()  # Concatenate if they're different
+
+            if product_full_name:
+                details[product_full_name] = {
+                    "name": product_name,
+                    "description": product_description,
+                    "category": current_category,
+                    "quantity": row["quantity"].strip(),
+                    "unit_price": Utils.clean_price(row["unit_price"].strip()),
+                    "total_price": Utils.clean_price(row["total_price"].strip()),
+                    "discount": Utils.extract_numeric_value(row["discount"]).strip(),
+                    "cagnotte": Utils.extract_numeric_value(row["cagnotte"]).strip()
+                }
+        return details
@@ -0,0 +1,235 @@
+import math
+import numpy as np
+
+# Numeric fields of the order lines, stored as float64 columns (NaN when missing or unparsable)
+NUMERIC_COLUMNS = ('quantity', 'unit_price', 'total_price', 'discount', 'cagnotte')
+# Text fields of the order lines, stored as integer codes into a label array
+CATEGORICAL_COLUMNS = ('category', 'name', 'status')
+# Grouping keys derived from the order date
+DATE_KEYS = ('day', 'month', 'year')
+
+AGGREGATIONS = ('sum', 'mean', 'count', 'min', 'max')
+
+
+def to_float(value):
+    """
+    Convert a scraped amount to a float.
+
+    Args:
+        value (str | float | None): The amount, e.g. '3.45'.
+
+    Returns:
+        float: The amount, or NaN if it is missing or cannot be parsed.
+    """
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def to_date(value):
+    """
+    Convert an order date to a NumPy date.
+
+    Args:
+        value (str | None): The date, in ISO format (YYYY-MM-DD).
+
+    Returns:
+        numpy.datetime64: The date, or NaT if it is missing or invalid.
+    """
+    try:
+        return np.datetime64(value, 'D') if value else np.datetime64('NaT', 'D')
+    except ValueError:
+        return np.datetime64('NaT', 'D')
+
+
+class PurchaseColumns:
+    """
+    Order lines of the purchase history flattened into column arrays, one row per line.
+
+    Text fields are dictionary-encoded (integer codes plus labels) and amounts are float64,
+    so that group-by queries are a few vectorized NumPy operations over the whole history.
+    """
+
+    def __init__(self, columns, labels, version=None):
+        """
+        Wrap prebuilt columns.
+
+        Args:
+            columns (dict): Column name -> array of the same length; the categorical columns
+                hold codes into labels, 'date' holds datetime64[D] values.
+            labels (dict): Categorical column name -> array of labels.
+            version (str): Version of the history the columns were built from.
+        """
+        self.columns = columns
+        self.labels = labels
+        self.version = version
+
+    def __len__(self):
+        return len(self.columns['date'])
+
+    @classmethod
+    def from_orders(cls, orders, version=None):
+        """
+        Flatten the lines of the orders into columns.
+
+        Args:
+            orders (iterable): The orders, with their 'details'.
+            version (str): Version of the history the orders come from.
+
+        Returns:
+            PurchaseColumns: The columns.
+        """
+        codes = {column: [] for column in CATEGORICAL_COLUMNS}
+        label_codes = {column: {} for column in CATEGORICAL_COLUMNS}
+        numbers = {column: [] for column in NUMERIC_COLUMNS}
+        dates = []
+        order_numbers = []
+
+        for order in orders:
+            details = order.get('details')
+            if not details:
+                continue
+            date = to_date(order.get('date'))  # Invalid dates are NaT, they form their own group
+            status_code = label_codes['status'].setdefault(order.get('status') or "", len(label_codes['status']))
+            for line in details.values():
+                order_numbers.append(order['order_number'])
+                dates.append(date)
+                codes['status'].append(status_code)
+                for column in ('category', 'name'):
+                    labels = label_codes[column]
+                    codes[column].append(labels.setdefault(line.get(column) or "", len(labels)))
+                for column in NUMERIC_COLUMNS:
+                    numbers[column].append(to_float(line.get(column)))
+
+        # Labels are sorted, so that groups come out in alphabetical order
+        columns, labels = {}, {}
+        for column, values in label_codes.items():
+            column_labels = np.array(list(values), dtype=str)
+            order = np.argsort(column_labels, kind='stable')
+            ranks = np.empty(len(order), dtype=np.int32)
+            ranks[order] = np.arange(len(order), dtype=np.int32)
+            labels[column] = column_labels[order]
+            columns[column] = ranks[np.array(codes[column], dtype=np.intp)] if len(order) else np.array([], np.int32)
+        columns.update({column: np.array(values, dtype=np.float64) for column, values in numbers.items()})
+        columns['date'] = np.array(dates, dtype='datetime64[D]')
+        columns['order_number'] = np.array(order_numbers, dtype=str)
+        return cls(columns, labels, version)
+
+    def save(self, path):
+        """Save the columns to a .npz file."""
+        arrays = {f"column_{name}": values for name, values in self.columns.items()}
+        arrays.update({f"labels_{name}": values for name, values in self.labels.items()})
+        with open(path, 'wb') as file:
+            np.savez(file, version=np.array(self.version or ""), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load columns saved with save().
+
+        Returns:
+            PurchaseColumns: The columns.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            columns = {key[len("column_"):]: data[key] for key in data.files if key.startswith("column_")}
+            labels = {key[len("labels_"):]: data[key] for key in data.files if key.startswith("labels_")}
+            return cls(columns, labels, str(data['version']) or None)
+
+    def mask(self, statuses=None, start=None, end=None):
+        """
+        Select rows by order status and date range.
+
+        Args:
+            statuses (list): Order statuses to keep, case-insensitively, or None for all.
+            start (str): First date to keep (YYYY-MM-DD), or None.
+            end (str): Last date to keep (YYYY-MM-DD), or None.
+
+        Returns:
+            numpy.ndarray: Boolean mask of the selected rows.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if statuses:
+            status_codes = np.flatnonzero(np.isin(np.char.lower(self.labels['status']), [s.lower() for s in statuses]))
+            mask &= np.isin(self.columns['status'], status_codes)
+        if start:
+            mask &= self.columns['date'] >= np.datetime64(start, 'D')
+        if end:
+            mask &= self.columns['date'] <= np.datetime64(end, 'D')
+        return mask
+
+    def key(self, name, mask):
+        """
+        Return the integer codes and labels of a grouping key over the selected rows.
+
+        Args:
+            name (str): A categorical column or a date key ('day', 'month', 'year').
+            mask (numpy.ndarray): The selected rows.
+
+        Returns:
+            tuple: The codes of the rows and the array of labels.
+        """
+        if name in self.labels:
+            return self.columns[name][mask], self.labels[name]
+        if name not in DATE_KEYS:
+            raise ValueError(f"Unknown grouping key '{name}'.")
+        unit = {'day': 'D', 'month': 'M', 'year': 'Y'}[name]
+        values, codes = np.unique(self.columns['date'][mask].astype(f'datetime64[{unit}]'), return_inverse=True)
+        return codes, values.astype(str)
+
+    def aggregate(self, by, metric='total_price', agg='sum', statuses=None, start=None, end=None):
+        """
+        Aggregate a metric over groups of order lines.
+
+        Args:
+            by (list): Grouping keys, e.g. ['category', 'month'].
+            metric (str): A numeric column, or 'lines' to count the lines.
+            agg (str): 'sum', 'mean', 'count', 'min' or 'max'; missing amounts are ignored.
+            statuses (list): Order statuses to keep, or None for all.
+            start (str): First date to keep (YYYY-MM-DD), or None.
+            end (str): Last date to keep (YYYY-MM-DD), or None.
+
+        Returns:
+            tuple: The group labels (one array per key) and the aggregated values, ordered by key.
+        """
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{agg}', expected one of {', '.join(AGGREGATIONS)}.")
+        mask = self.mask(statuses, start, end)
+        if metric == 'lines':
+            values = np.ones(int(mask.sum()))
+        elif metric in NUMERIC_COLUMNS:
+            values = self.columns[metric][mask]
+        else:
+            raise ValueError(f"Unknown metric '{metric}'.")
+
+        if by and not len(values):
+            return [np.array([], dtype=str) for _ in by], np.array([])
+
+        keys = [self.key(name, mask) for name in by]
+        if keys:
+            # Combine the keys into one code per row, then number the groups that actually occur
+            combined = np.ravel_multi_index([codes for codes, _ in keys], [len(labels) for _, labels in keys])
+            groups, group_codes = np.unique(combined, return_inverse=True)
+            key_codes = np.unravel_index(groups, [len(labels) for _, labels in keys])
+            group_labels = [labels[codes] for (_, labels), codes in zip(keys, key_codes)]
+        else:
+            group_codes = np.zeros(len(values), dtype=np.intp)
+            group_labels = []
+        group_count = len(group_labels[0]) if group_labels else 1
+
+        valid = ~np.isnan(values)
+        counts = np.bincount(group_codes, weights=valid, minlength=group_count)
+        if agg == 'count':
+            result = counts
+        elif agg in ('sum', 'mean'):
+            result = np.bincount(group_codes, weights=np.where(valid, values, 0.0), minlength=group_count)
+            if agg == 'mean':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result = result / counts
+        else:
+            ufunc = np.fmin if agg == 'min' else np.fmax  # Ignore missing amounts
+            result = np.full(group_count, np.nan)
+            ufunc.at(result, group_codes, values)
+        return group_labels, result
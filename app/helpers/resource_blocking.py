@@ -0,0 +1,171 @@
+import logging
+from collections import Counter
+from urllib.parse import urlparse
+
+# Resource types loaded by default: the pages, their scripts and their API calls
+DEFAULT_ALLOWED_TYPES = ('document', 'script', 'xhr', 'fetch', 'websocket', 'eventsource', 'manifest', 'other')
+
+
+class ResourceBlockingPolicy:
+    """
+    Policy aborting the browser requests the scraper does not need, installed on a browser
+    context with context.route.
+
+    A request is blocked when its domain is in the blocked domains, or, unless it is a page
+    navigation, when its resource type is not allowed or its domain is not an allowed domain
+    (third-party assets and trackers). Allowed domains include their subdomains.
+
+    In 'measure' mode nothing is blocked: the requests that would be blocked are counted
+    with their size, to measure the bandwidth a blocking policy saves.
+    """
+
+    MODES = ('off', 'block', 'measure')
+
+    def __init__(self, mode='block', allowed_types=DEFAULT_ALLOWED_TYPES, allowed_domains=(), blocked_domains=()):
+        """
+        Initialize the policy.
+
+        Args:
+            mode (str): 'off', 'block' or 'measure'.
+            allowed_types (iterable): Playwright resource types that are loaded.
+            allowed_domains (iterable): Domains assets are loaded from; all domains if empty.
+            blocked_domains (iterable): Domains that are always blocked.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown resource blocking mode '{mode}', expected one of {', '.join(self.MODES)}.")
+        self.mode = mode
+        self.allowed_types = frozenset(allowed_types)
+        self.allowed_domains = tuple(domain.lower().lstrip('.') for domain in allowed_domains)
+        self.blocked_domains = tuple(domain.lower().lstrip('.') for domain in blocked_domains)
+        self.logger = logging.getLogger(__name__)
+        self.measured_requests = set()  # Requests let through in 'measure' mode that would have been blocked
+        self.reset_stats()
+
+    @staticmethod
+    def parse_list(text):
+        """Parse a comma-separated setting into a list of non-empty values."""
+        return [value.strip() for value in (text or "").split(',') if value.strip()]
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build the policy from the RESOURCE_BLOCKING settings. Without allowed domains, assets
+        are only loaded from the domain of TARGET_URL.
+
+        Args:
+            config (Config): The application configuration.
+
+        Returns:
+            ResourceBlockingPolicy: The policy.
+        """
+        allowed_domains = cls.parse_list(config.resource_allowed_domains)
+        if not allowed_domains:
+            host = urlparse(config.target_url).hostname or ""
+            allowed_domains = [host[len("www."):] if host.startswith("www.") else host] if host else []
+        return cls(
+            mode=config.resource_blocking,
+            allowed_types=cls.parse_list(config.resource_allowed_types) or DEFAULT_ALLOWED_TYPES,
+            allowed_domains=allowed_domains,
+            blocked_domains=cls.parse_list(config.resource_blocked_domains)
+        )
+
+    @staticmethod
+    def matches(host, domains):
+        """Return whether a host is one of the domains or one of their subdomains."""
+        return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+    def block_reason(self, request):
+        """
+        Return why a request is blocked.
+
+        Args:
+            request: The Playwright request.
+
+        Returns:
+            str: 'domain' or 'type', or None if the request is allowed.
+        """
+        host = (urlparse(request.url).hostname or "").lower()
+        if self.matches(host, self.blocked_domains):
+            return 'domain'
+        if request.resource_type == 'document':
+            return None  # Navigations are never blocked, e.g. a login on another domain
+        if request.resource_type not in self.allowed_types:
+            return 'type'
+        if self.allowed_domains and host and not self.matches(host, self.allowed_domains):
+            return 'domain'
+        return None
+
+    async def install(self, context):
+        """
+        Install the policy on a browser context.
+
+        Args:
+            context: The Playwright browser context.
+        """
+        if self.mode == 'off':
+            return
+        await context.route("**/*", self.handle)
+        context.on("requestfinished", self.on_request_finished)
+        context.on("requestfailed", self.on_request_failed)
+
+    async def handle(self, route):
+        """Abort or continue an intercepted request."""
+        request = route.request
+        reason = self.block_reason(request)
+        if reason is None:
+            await route.continue_()
+            return
+
+        self.blocked_requests += 1
+        self.blocked_by_type[request.resource_type] += 1
+        self.blocked_by_domain[urlparse(request.url).hostname or ""] += 1
+        if self.mode == 'block':
+            await route.abort('blockedbyclient')
+        else:
+            self.measured_requests.add(request)
+            await route.continue_()
+
+    async def on_request_finished(self, request):
+        """Count the bytes transferred for a request, or saved by blocking it in 'measure' mode."""
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return  # The page or context was closed meanwhile
+        size = sizes.get('responseBodySize', 0) + sizes.get('responseHeadersSize', 0)
+        if request in self.measured_requests:
+            self.measured_requests.discard(request)
+            self.bytes_saved += size
+        else:
+            self.loaded_requests += 1
+            self.bytes_loaded += size
+
+    def on_request_failed(self, request):
+        """Forget a failed request."""
+        self.measured_requests.discard(request)
+
+    def reset_stats(self):
+        """Reset the counters, at the start of a scraping run."""
+        self.blocked_requests = 0
+        self.blocked_by_type = Counter()
+        self.blocked_by_domain = Counter()
+        self.loaded_requests = 0
+        self.bytes_loaded = 0
+        self.bytes_saved = 0  # Only measured in 'measure' mode, blocked requests are never downloaded
+        self.measured_requests.clear()
+
+    def stats(self):
+        """
+        Return the counters since the last reset.
+
+        Returns:
+            dict: The counters; bytes_saved is only known in 'measure' mode.
+        """
+        return {
+            "mode": self.mode,
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "blocked_by_domain": dict(self.blocked_by_domain.most_common(10)),
+            "loaded_requests": self.loaded_requests,
+            "bytes_loaded": self.bytes_loaded,
+            "bytes_saved": self.bytes_saved if self.mode == 'measure' else None
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+
+
+class StaleWhileRevalidateCache:
+    """
+    Asynchronous cache that keeps serving the last good value once its TTL expired, while
+    a background task refreshes it.
+
+    Only a cold miss waits for the loader. Concurrent refreshes of the same key are
+    coalesced into a single in-flight request (single-flight), and a failed refresh
+    leaves the last good value in place.
+    """
+
+    def __init__(self, ttl, name="cache"):
+        """
+        Initialize an empty cache.
+
+        Args:
+            ttl (float): Number of seconds a value is considered fresh.
+            name (str): Name of the cache, used in log messages.
+        """
+        self.ttl = ttl
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self.entries = {}  # key -> (value, monotonic time it was loaded)
+        self.refreshes = {}  # key -> in-flight refresh task
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.refresh_count = 0
+        self.refresh_failures = 0
+        self.refresh_latency_total = 0.0
+        self.refresh_latency_max = 0.0
+
+    async def get(self, key, loader):
+        """
+        Return the cached value of a key, loading it on a cold miss and refreshing it in the
+        background when it is stale.
+
+        Args:
+            key (str): The cache key.
+            loader (callable): Coroutine function returning the fresh value, or None on failure.
+
+        Returns:
+            The cached value, or None if it was never loaded successfully.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return await asyncio.shield(self.start_refresh(key, loader))
+
+        value, loaded_at = entry
+        if time.monotonic() - loaded_at < self.ttl:
+            self.hits += 1
+            return value
+
+        self.stale_served += 1
+        self.start_refresh(key, loader)
+        return value
+
+    def start_refresh(self, key, loader):
+        """
+        Start refreshing a key unless a refresh of it is already in flight.
+
+        Returns:
+            asyncio.Task: The refresh task of the key.
+        """
+        task = self.refreshes.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.refresh(key, loader))
+            self.refreshes[key] = task
+            task.add_done_callback(lambda _: self.refreshes.pop(key, None))
+        return task
+
+    async def refresh(self, key, loader):
+        """Load a key and store it if the load succeeded, recording the refresh latency."""
+        start = time.monotonic()
+        try:
+            value = await loader()
+        except Exception as e:
+            self.logger.error(f"Failed to refresh {self.name} entry '{key}': {e}")
+            value = None
+
+        latency = time.monotonic() - start
+        self.refresh_count += 1
+        self.refresh_latency_total += latency
+        self.refresh_latency_max = max(self.refresh_latency_max, latency)
+
+        if value is None:
+            self.refresh_failures += 1
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.logger.warning(f"Refresh of {self.name} entry '{key}' failed, keeping the stale value.")
+                return entry[0]
+            return None
+
+        self.entries[key] = (value, time.monotonic())
+        return value
+
+    async def close(self):
+        """Cancel the refreshes still in flight."""
+        tasks = list(self.refreshes.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: Hits, misses, stale values served, refreshes, failed refreshes and the
+            mean and max refresh latency in seconds.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+            "refreshes": self.refresh_count,
+            "refresh_failures": self.refresh_failures,
+            "refresh_latency_mean": self.refresh_latency_total / self.refresh_count if self.refresh_count else 0.0,
+            "refresh_latency_max": self.refresh_latency_max
+        }
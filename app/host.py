@@ -1,8 +1,12 @@
 import asyncio
+import json
 import logging
 from app.config.config import Config
 from app.models import CommandLineArgs
+from app.services.analytics_service import AnalyticsService
 from app.services.auchan_order_service import AuchanOrderService
+from app.services.backfill_service import BackfillService
+from app.services.history_store import JsonHistoryStore, create_history_store, export_history_json, migrate_json_history
 from app.runtime.command_line import CommandLine
 
 class Host:
@@ -29,7 +33,7 @@ class Host:
         if args.password:
             self.config.password = args.password
 
-        self.auchan_order_service = AuchanOrderService()
+        self.auchan_order_service = None  # Only built by the scraping command, with its browser and Grocy client
         self.scraping_interval = self.config.scraping_interval 
         
     def run(self):
@@ -42,19 +46,111 @@ class Host:
         """
         Asynchronous method to perform the main logic.
         """
+        if self.args.command == 'backfill':
+            self.logger.info("Starting order history backfill.")
+            backfill_service = BackfillService()
+            try:
+                await backfill_service.run(
+                    workers=self.args.backfill_workers,
+                    output_file=self.args.backfill_output,
+                    update_stock=self.args.backfill_update_stock
+                )
+            finally:
+                await backfill_service.inventory_service.close()
+                backfill_service.history_store.close()
+            return
+
+        if self.args.command == 'migrate-history':
+            self.migrate_history()
+            return
+
+        if self.args.command == 'export-history':
+            self.export_history()
+            return
+
+        if self.args.command == 'analytics':
+            self.analytics()
+            return
+
         self.logger.info("Starting host process with a scraping interval of %d minutes.", self.scraping_interval)
+        self.auchan_order_service = AuchanOrderService()
+
+        # Stock additions recorded in the outbox are sent independently of the scraping runs
+        self.auchan_order_service.inventory_service.start_stock_outbox_flusher()
+
+        try:
+            while True:
+                try:
+                    self.logger.info("Starting scraping process.")
+                    await self.auchan_order_service.scrape_auchan_order_history()
+                except Exception as e:
+                    self.logger.error(f"An error occurred during scraping: {e}")
+
+                # Wait for the specified scraping interval (convert to seconds)
+                self.logger.info(f"Waiting for {self.scraping_interval} minutes until next scraping run.")
+                await asyncio.sleep(self.scraping_interval * 60)
+        finally:
+            # Release the pooled Grocy connections kept alive between runs
+            await self.auchan_order_service.inventory_service.close()
+            await self.auchan_order_service.browser_manager.close()
+            self.auchan_order_service.history_store.close()
+
+    def migrate_history(self):
+        """
+        Import the JSON order history into the configured history backend (SQLite or journal).
+        """
+        if self.config.history_backend not in ('sqlite', 'journal'):
+            self.logger.error("Set HISTORY_BACKEND to 'sqlite' or 'journal' to migrate the order history.")
+            return
+
+        json_store = JsonHistoryStore(self.args.history_input or self.config.history_file)
+        if not json_store.exists():
+            self.logger.error(f"Order history {json_store.history_file} not found. Nothing to migrate.")
+            return
+
+        history_store = create_history_store(self.config)
+        try:
+            imported = migrate_json_history(json_store, history_store)
+        finally:
+            history_store.close()
+        self.logger.info(f"Imported {imported} orders from {json_store.history_file} "
+                         f"into the {self.config.history_backend} history.")
+
+    def export_history(self):
+        """
+        Export the order history of the configured backend to a JSON file.
+        """
+        history_store = create_history_store(self.config)
+        try:
+            exported = export_history_json(history_store, self.args.history_output)
+        finally:
+            history_store.close()
+        self.logger.info(f"Exported {exported} orders to {self.args.history_output}.")
+
+    def analytics(self):
+        """
+        Print the aggregates of the order lines of the history requested on the command line.
+        """
+        analytics_service = AnalyticsService(create_history_store(self.config))
+        try:
+            rows = analytics_service.query(
+                self.args.analytics_by or [],
+                metric=self.args.analytics_metric,
+                agg=self.args.analytics_agg,
+                statuses=self.args.analytics_statuses,
+                start=self.args.analytics_since,
+                end=self.args.analytics_until,
+                sort=self.args.analytics_sort,
+                limit=self.args.analytics_limit
+            )
+        finally:
+            analytics_service.history_store.close()
+
+        if self.args.analytics_format == 'json':
+            print(json.dumps(rows, ensure_ascii=False, indent=4))
+        else:
+            print(AnalyticsService.format_table(rows))
 
-        while True:
-            try:
-                self.logger.info("Starting scraping process.")
-                await self.auchan_order_service.scrape_auchan_order_history()
-            except Exception as e:
-                self.logger.error(f"An error occurred during scraping: {e}")
-
-            # Wait for the specified scraping interval (convert to seconds)
-            self.logger.info(f"Waiting for {self.scraping_interval} minutes until next scraping run.")
-            await asyncio.sleep(self.scraping_interval * 60)
-            
 if __name__ == '__main__':
     # Setup logging configuration
     logging.basicConfig(
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import List, Optional
 
 @dataclass
 class CommandLineArgs:
@@ -6,4 +7,19 @@ class CommandLineArgs:
     target_url: str  # URL to scrape
     headless: bool  # Whether to run the browser in headless mode
     username: str  # Username for login
-    password: str  # Password for login
\ No newline at end of file
+    password: str  # Password for login
+    command: str = 'scrape'  # Subcommand to run ('scrape', 'backfill', 'migrate-history', 'export-history' or 'analytics')
+    backfill_workers: Optional[int] = None  # Number of matching processes for the backfill
+    backfill_output: Optional[str] = None  # JSON-lines file receiving the backfill match results
+    backfill_update_stock: bool = False  # Whether the backfill also adds matched products to Grocy stock
+    history_input: Optional[str] = None  # JSON order history imported by migrate-history
+    history_output: Optional[str] = None  # JSON file written by export-history
+    analytics_by: Optional[List[str]] = None  # Grouping keys of the analytics query
+    analytics_metric: str = 'total_price'  # Order line field aggregated by the analytics query
+    analytics_agg: str = 'sum'  # Aggregation of the analytics query
+    analytics_statuses: Optional[List[str]] = None  # Order statuses kept by the analytics query, None for all
+    analytics_since: Optional[str] = None  # First order date kept by the analytics query
+    analytics_until: Optional[str] = None  # Last order date kept by the analytics query
+    analytics_sort: str = 'key'  # Order of the analytics groups ('key' or 'value')
+    analytics_limit: Optional[int] = None  # Maximum number of analytics groups printed
+    analytics_format: str = 'table'  # Output format of the analytics query ('table' or 'json')
@@ -57,6 +57,76 @@ class CommandLine:
             help='Password for logging into the Auchan Drive account.'
         )
 
+        # Add subcommands; without one, the scraper runs as a daemon
+        subparsers = parser.add_subparsers(dest='command')
+        subparsers.add_parser('scrape', help='Scrape the order history periodically (default).')
+
+        # The backfill subcommand replays the saved order history through the Grocy matching
+        backfill_parser = subparsers.add_parser(
+            'backfill', help='Re-run the Grocy matching over the whole saved order history.'
+        )
+        backfill_parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of matching processes (defaults to BACKFILL_WORKERS or the CPU count).'
+        )
+        backfill_parser.add_argument(
+            '--output', type=str, default=None,
+            help='JSON-lines file receiving the match results (defaults to BACKFILL_OUTPUT_FILE).'
+        )
+        backfill_parser.add_argument(
+            '--update-stock', action='store_true',
+            help='Also add the matched products to the Grocy stock.'
+        )
+
+        # The history subcommands move the order history between the JSON file and the other backends
+        migrate_parser = subparsers.add_parser(
+            'migrate-history', help='Import the JSON order history into the SQLite or journal history backend.'
+        )
+        migrate_parser.add_argument(
+            '--input', type=str, default=None,
+            help='JSON order history to import (defaults to ORDER_HISTORY_FILE).'
+        )
+        export_parser = subparsers.add_parser(
+            'export-history', help='Export the order history from the configured backend to a JSON file.'
+        )
+        export_parser.add_argument(
+            '--output', type=str, required=True,
+            help='JSON file receiving the order history.'
+        )
+
+        # The analytics subcommand aggregates the order lines of the history
+        analytics_parser = subparsers.add_parser(
+            'analytics', help='Aggregate the order lines of the history, e.g. the spending per category per month.'
+        )
+        analytics_parser.add_argument(
+            '--by', type=str, nargs='*', default=['category', 'month'],
+            choices=['category', 'name', 'status', 'day', 'month', 'year'],
+            help='Grouping keys (default: category month).'
+        )
+        analytics_parser.add_argument(
+            '--metric', type=str, default='total_price',
+            choices=['total_price', 'quantity', 'unit_price', 'discount', 'cagnotte', 'lines'],
+            help='Order line field to aggregate (default: total_price).'
+        )
+        analytics_parser.add_argument(
+            '--agg', type=str, default='sum', choices=['sum', 'mean', 'count', 'min', 'max'],
+            help='Aggregation (default: sum).'
+        )
+        analytics_parser.add_argument(
+            '--status', type=str, nargs='+', default=['livré'],
+            help="Order statuses to include, or 'all' (default: livré)."
+        )
+        analytics_parser.add_argument('--since', type=str, default=None, help='First order date (YYYY-MM-DD).')
+        analytics_parser.add_argument('--until', type=str, default=None, help='Last order date (YYYY-MM-DD).')
+        analytics_parser.add_argument(
+            '--sort', type=str, default='key', choices=['key', 'value'],
+            help='Order the groups by key or by decreasing value (default: key).'
+        )
+        analytics_parser.add_argument('--limit', type=int, default=None, help='Maximum number of groups printed.')
+        analytics_parser.add_argument(
+            '--format', type=str, default='table', choices=['table', 'json'], help='Output format (default: table).'
+        )
+
         # Parse the command line arguments
         args = parser.parse_args()
 
@@ -66,7 +136,22 @@ class CommandLine:
             target_url=args.target_url,  # The URL to scrape from
             headless=args.headless,  # Whether to run the browser in headless mode
             username=args.username,  # Username for authentication
-            password=args.password  # Password for authentication
+            password=args.password,  # Password for authentication
+            command=args.command or 'scrape',  # Subcommand to run
+            backfill_workers=getattr(args, 'workers', None),  # Number of backfill matching processes
+            backfill_output=getattr(args, 'output', None) if args.command == 'backfill' else None,  # Backfill results file
+            backfill_update_stock=getattr(args, 'update_stock', False),  # Whether the backfill updates the stock
+            history_input=getattr(args, 'input', None),  # JSON order history to import
+            history_output=getattr(args, 'output', None) if args.command == 'export-history' else None,  # JSON export file
+            analytics_by=getattr(args, 'by', None),  # Grouping keys of the analytics query
+            analytics_metric=getattr(args, 'metric', 'total_price'),  # Aggregated order line field
+            analytics_agg=getattr(args, 'agg', 'sum'),  # Aggregation
+            analytics_statuses=None if 'all' in getattr(args, 'status', ['all']) else args.status,  # Order statuses
+            analytics_since=getattr(args, 'since', None),  # First order date
+            analytics_until=getattr(args, 'until', None),  # Last order date
+            analytics_sort=getattr(args, 'sort', 'key'),  # Order of the groups
+            analytics_limit=getattr(args, 'limit', None),  # Maximum number of groups
+            analytics_format=getattr(args, 'format', 'table')  # Output format
         )
 
 if __name__ == "__main__":
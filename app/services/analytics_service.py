@@ -0,0 +1,115 @@
+import logging
+import math
+import os
+import time
+from app.config.config import Config
+from app.helpers.purchase_columns import PurchaseColumns
+from app.services.history_store import create_history_store
+
+
+class AnalyticsService:
+    def __init__(self, history_store=None):
+        """
+        Initialize the AnalyticsService, which answers spending queries over the order lines
+        of the history from a columnar copy of the history.
+
+        Parameters:
+            history_store: The history store to analyze; the configured one by default.
+        """
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+        self.history_store = history_store or create_history_store(self.config)
+        self.cache_file = self.config.analytics_cache_file
+        self.columns = None
+
+    def get_columns(self):
+        """
+        Return the columns of the current history. They are rebuilt only when the history
+        version changed, and kept in memory and in ANALYTICS_CACHE_FILE between runs.
+
+        Returns:
+            PurchaseColumns: The order lines as columns.
+        """
+        version = self.history_store.version()
+        if self.columns is not None and self.columns.version == version:
+            return self.columns
+
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                columns = PurchaseColumns.load(self.cache_file)
+                if columns.version == version:
+                    self.columns = columns
+                    return columns
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.warning(f"Ignoring the analytics cache {self.cache_file}: {e}")
+
+        start = time.perf_counter()
+        self.columns = PurchaseColumns.from_orders(self.history_store.iter_orders(), version)
+        self.logger.info(f"Built the analytics columns of {len(self.columns)} order lines "
+                         f"in {time.perf_counter() - start:.2f}s.")
+
+        if self.cache_file:
+            try:
+                temp_file = f"{self.cache_file}.tmp"
+                self.columns.save(temp_file)
+                os.replace(temp_file, self.cache_file)
+            except OSError as e:
+                self.logger.error(f"Failed to save the analytics cache {self.cache_file}: {e}")
+        return self.columns
+
+    def query(self, by, metric='total_price', agg='sum', statuses=None, start=None, end=None, sort='key', limit=None):
+        """
+        Aggregate a metric of the order lines by group, e.g. the spending per category per month.
+
+        Parameters:
+            by (list): Grouping keys among category, name, status, day, month and year.
+            metric (str): quantity, unit_price, total_price, discount, cagnotte, or lines.
+            agg (str): sum, mean, count, min or max.
+            statuses (list): Order statuses to keep, or None for all.
+            start (str): First order date to keep (YYYY-MM-DD), or None.
+            end (str): Last order date to keep (YYYY-MM-DD), or None.
+            sort (str): 'key' to order the groups by key, 'value' by decreasing value.
+            limit (int): Maximum number of groups returned, or None.
+
+        Returns:
+            list: One dictionary per group, with the keys and the value.
+        """
+        group_labels, values = self.get_columns().aggregate(by, metric, agg, statuses, start, end)
+        positions = range(len(values))
+        if sort == 'value':
+            positions = sorted(positions, key=lambda i: -values[i] if not math.isnan(values[i]) else math.inf)
+        if limit:
+            positions = list(positions)[:limit]
+
+        value_name = f"{agg}_{metric}"
+        convert = int if agg == 'count' else lambda value: round(float(value), 2)
+        return [
+            {**{key: str(labels[i]) for key, labels in zip(by, group_labels)},
+             value_name: None if math.isnan(values[i]) else convert(values[i])}
+            for i in positions
+        ]
+
+    @staticmethod
+    def format_table(rows):
+        """
+        Format query results as a text table.
+
+        Parameters:
+            rows (list): The rows returned by query().
+
+        Returns:
+            str: The table.
+        """
+        if not rows:
+            return "No order lines match the query."
+        headers = list(rows[0])
+        cells = [[("" if row[header] is None else str(row[header])) for header in headers] for row in rows]
+        widths = [max(len(header), *(len(line[i]) for line in cells)) for i, header in enumerate(headers)]
+        lines = ["  ".join(header.ljust(width) for header, width in zip(headers, widths))]
+        lines.append("  ".join("-" * width for width in widths))
+        for line in cells:
+            lines.append("  ".join(
+                cell.rjust(width) if i == len(line) - 1 else cell.ljust(width)
+                for i, (cell, width) in enumerate(zip(line, widths))
+            ))
+        return "\n".join(lines)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from app.config.config import Config
+from app.services.history_store import create_history_store
+from app.services.inventory_service import InventoryService
+
+# Worker processes are spawned rather than forked: the parent runs an asyncio loop with open
+# Grocy connections, which a forked child would inherit in an unusable state
+BACKFILL_START_METHOD = 'spawn'
+
+# Matcher pipeline of a worker process, received from the parent by _init_worker
+_worker_matcher = None
+
+
+def _init_worker(matcher):
+    """Keep the matcher pipeline built by the parent, received once per worker process."""
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _match_order_lines(product_names):
+    """
+    Match the lines of one order in a worker process.
+
+    Parameters:
+        product_names (list): The product names of the order lines.
+
+    Returns:
+        list: One (matched product, similarity percentage) tuple per line, (None, 0) when unmatched.
+    """
+    results = _worker_matcher.match_many(product_names)
+    return [
+        (result['product'], result['similarity_percentage']) if result else (None, 0)
+        for result in results
+    ]
+
+
+class BackfillService:
+    def __init__(self):
+        """
+        Initialize the BackfillService, which replays the saved order history through the
+        Grocy product matching.
+        """
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+        self.inventory_service = InventoryService()
+        self.history_store = create_history_store(self.config)
+
+    def iter_delivered_orders(self):
+        """Yield the delivered orders of the history that have line details."""
+        for order in self.history_store.iter_orders():
+            if order.get('status', '').lower() == 'livré' and order.get('details'):
+                yield order
+
+    async def run(self, workers=None, output_file=None, update_stock=False):
+        """
+        Replay every delivered order of the history through the matching, fanned out over a
+        process pool, and write one result line per order, in history order.
+
+        Parameters:
+            workers (int): Number of matching processes (defaults to BACKFILL_WORKERS).
+            output_file (str): JSON-lines file receiving the results (defaults to BACKFILL_OUTPUT_FILE).
+            update_stock (bool): Whether to add the matched products to the Grocy stock.
+
+        Returns:
+            int: The number of orders replayed.
+        """
+        workers = workers or self.config.backfill_workers
+        output_file = output_file or self.config.backfill_output_file
+
+        if not self.history_store.exists():
+            self.logger.error("No order history found. Nothing to backfill.")
+            return 0
+
+        products = await self.inventory_service.fetch_products()
+        if not products:
+            return 0
+
+        location_routing = None
+        if update_stock:
+            location_routing = await self.inventory_service.get_location_routing()
+            if not location_routing:
+                return 0
+
+        # Build the matcher once; each worker receives a copy instead of rebuilding the index
+        matcher = self.inventory_service.get_matcher(products)
+
+        self.logger.info(f"Starting backfill of the order history with {workers} worker processes into {output_file}.")
+        processed = 0
+        window = workers * 4  # Orders in flight, bounding memory while keeping the workers busy
+        pending = deque()
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(BACKFILL_START_METHOD),
+                                 initializer=_init_worker, initargs=(matcher,)) as executor, \
+                open(output_file, 'w', encoding='utf-8') as output:
+            for order in self.iter_delivered_orders():
+                product_names = list(order['details'].keys())
+                pending.append((order, product_names, executor.submit(_match_order_lines, product_names)))
+                if len(pending) >= window:
+                    await self.write_result(output, *pending.popleft(), location_routing)
+                    processed += 1
+
+            while pending:
+                await self.write_result(output, *pending.popleft(), location_routing)
+                processed += 1
+
+        stock_outbox = self.inventory_service.stock_outbox
+        if location_routing and stock_outbox is not None:
+            # Send what was queued; additions that keep failing stay in the outbox for the daemon
+            await stock_outbox.flush()
+
+        self.logger.info(f"Backfill completed: {processed} orders replayed.")
+        return processed
+
+    async def write_result(self, output, order, product_names, future, location_routing):
+        """
+        Wait for the matches of an order, optionally update the stock and write the result line.
+
+        Parameters:
+            output: The open results file.
+            order (dict): The replayed order.
+            product_names (list): The product names of the order lines.
+            future (Future): The pending matching of the order lines.
+            location_routing (LocationRoutingTable): The routing of stock updates, or None to skip them.
+        """
+        matched_products = {}
+        unmatched_products = {}
+        stock_outbox = self.inventory_service.stock_outbox
+        outbox_additions = []
+
+        for product_name, (best_match, similarity_percentage) in zip(product_names, await asyncio.wrap_future(future)):
+            product_info = order['details'][product_name]
+            if best_match and similarity_percentage >= self.inventory_service.similarity_threshold:
+                unit_price = self.inventory_service.convert_unit_price(product_info.get('unit_price', '0.0'))
+                order_quantity = product_info.get('quantity', 1)
+                location_id = location_routing.route(product_info.get('category'), best_match) if location_routing else None
+
+                if location_id and stock_outbox is not None:
+                    # Keyed like live updates, so that lines already added to the stock are skipped
+                    key = stock_outbox.idempotency_key(order['order_number'], product_name)
+                    outbox_additions.append((key, best_match['id'], order_quantity, location_id, unit_price))
+                elif location_id:
+                    await self.inventory_service.update_stock(best_match['id'], order_quantity, location_id, unit_price)
+
+                matched_products[product_name] = self.inventory_service.build_matched_product_info(
+                    best_match, order_quantity, unit_price, similarity_percentage, location_id
+                )
+            else:
+                unmatched_products[product_name] = {
+                    "grocy_product_name": best_match['name'] if best_match else None,
+                    "similarity_percentage": similarity_percentage
+                }
+
+        if outbox_additions:
+            stock_outbox.enqueue(outbox_additions)
+
+        output.write(json.dumps({
+            "order_number": order['order_number'],
+            "date": order.get('date'),
+            "matched_products": matched_products,
+            "unmatched_products": unmatched_products
+        }, ensure_ascii=False) + "\n")
+        self.logger.debug(f"Backfilled order {order['order_number']}: {len(matched_products)} matched, "
+                          f"{len(unmatched_products)} unmatched.")
@@ -0,0 +1,94 @@
+import logging
+import os
+from playwright.async_api import async_playwright
+from app.config.config import Config
+from app.helpers.resource_blocking import ResourceBlockingPolicy
+
+
+class BrowserManager:
+    def __init__(self):
+        """
+        Initialize the BrowserManager, which keeps one Chromium process and one browser
+        context alive between scraping runs.
+
+        The cookies of the context are saved to BROWSER_STATE_FILE, so that a new context, or
+        a new process, resumes the logged-in session. The browser process is recycled after
+        BROWSER_RECYCLE_RUNS runs to cap its memory growth.
+        """
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+        self.state_file = self.config.browser_state_file
+        self.recycle_runs = self.config.browser_recycle_runs
+        self.resource_policy = ResourceBlockingPolicy.from_config(self.config)  # Installed on every new context
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.runs = 0  # Runs served by the current browser process
+
+    async def get_context(self):
+        """
+        Return the browser context for a new scraping run, launching or recycling the
+        browser and restoring the saved session as needed.
+
+        Returns:
+            BrowserContext: The browser context.
+        """
+        if self.browser is not None and self.recycle_runs and self.runs >= self.recycle_runs:
+            self.logger.info(f"Recycling the browser after {self.runs} runs.")
+            await self.save_session()
+            await self.close_browser()
+
+        if self.browser is None or not self.browser.is_connected():
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(headless=self.config.headless)
+            self.context = None
+            self.runs = 0
+            self.logger.info("Launched the browser.")
+
+        if self.context is None:
+            storage_state = self.state_file if self.state_file and os.path.exists(self.state_file) else None
+            self.context = await self.browser.new_context(storage_state=storage_state)
+            await self.resource_policy.install(self.context)
+            if storage_state:
+                self.logger.info(f"Restored the browser session from {self.state_file}.")
+
+        self.runs += 1
+        return self.context
+
+    async def save_session(self):
+        """Save the cookies and local storage of the context, readable only by the current user."""
+        if self.context is None or not self.state_file:
+            return
+        try:
+            await self.context.storage_state(path=self.state_file)
+            os.chmod(self.state_file, 0o600)
+        except Exception as e:
+            self.logger.error(f"Failed to save the browser session to {self.state_file}: {e}")
+
+    async def reset_session(self):
+        """Discard the context and the saved session, so that the next run logs in again."""
+        if self.context is not None:
+            await self.context.close()
+            self.context = None
+        if self.state_file and os.path.exists(self.state_file):
+            os.remove(self.state_file)
+
+    async def close_browser(self):
+        """Close the context and the browser process."""
+        if self.context is not None:
+            await self.context.close()
+            self.context = None
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+
+    async def close(self):
+        """Close the browser and stop Playwright."""
+        try:
+            await self.close_browser()
+        except Exception as e:
+            self.logger.error(f"Failed to close the browser: {e}")
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+
+
+class CatalogSync:
+    def __init__(self, grocy_service, snapshot_file):
+        """
+        Initialize the catalog sync layer, which keeps a local snapshot of Grocy objects
+        (products, locations) and only re-downloads them when the Grocy database changed.
+
+        Parameters:
+            grocy_service (GrocyService): The Grocy client used to check for changes and fetch objects.
+            snapshot_file (str): Path of the JSON file persisting the snapshot between runs.
+        """
+        self.grocy_service = grocy_service
+        self.snapshot_file = snapshot_file
+        self.logger = logging.getLogger(__name__)
+        self.snapshot = None  # entity -> {'changed_time': str, 'objects': list}, loaded on first use
+
+    def load_snapshot(self):
+        """Loads the snapshot from disk, so that a cold start does not need to download the catalog."""
+        self.snapshot = {}
+        if not os.path.exists(self.snapshot_file):
+            return
+
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as file:
+                self.snapshot = json.load(file)
+            self.logger.info(f"Loaded Grocy catalog snapshot from {self.snapshot_file}.")
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Failed to load Grocy catalog snapshot {self.snapshot_file}: {e}")
+
+    def save_snapshot(self):
+        """Writes the snapshot to disk atomically."""
+        temp_file = f"{self.snapshot_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                json.dump(self.snapshot, file, ensure_ascii=False)
+            os.replace(temp_file, self.snapshot_file)
+        except OSError as e:
+            self.logger.error(f"Failed to save Grocy catalog snapshot {self.snapshot_file}: {e}")
+
+    async def fetch(self, entity):
+        """
+        Return the objects of an entity, re-downloading them only if the Grocy database
+        changed since they were last fetched.
+
+        While the objects are unchanged the very same list is returned, so that derived
+        structures keyed on it (such as the catalog index) are not rebuilt. Grocy updates its
+        database time on every change, stock additions included, so re-downloaded objects are
+        compared with the snapshot as well.
+
+        Parameters:
+            entity (str): The Grocy object entity, e.g. 'products' or 'locations'.
+
+        Returns:
+            list: The objects, or None if they could not be fetched and no snapshot exists.
+        """
+        if self.snapshot is None:
+            self.load_snapshot()
+
+        cached = self.snapshot.get(entity)
+        changed_time = await self.grocy_service.fetch_db_changed_time()
+
+        if cached and changed_time is None:
+            self.logger.warning(f"Could not check Grocy for changes, serving {entity} from the local snapshot.")
+            return cached['objects']
+
+        if cached and cached['changed_time'] == changed_time:
+            self.logger.info(f"Grocy database unchanged since {changed_time}, reusing the {entity} snapshot.")
+            return cached['objects']
+
+        objects = await self.grocy_service.fetch_objects(entity)
+        if objects is None:
+            if cached:
+                self.logger.warning(f"Failed to refresh {entity}, serving them from the local snapshot.")
+                return cached['objects']
+            return None
+
+        if cached and cached['objects'] == objects:
+            self.logger.info(f"Grocy database changed at {changed_time}, but the {entity} did not.")
+            objects = cached['objects']
+
+        self.snapshot[entity] = {'changed_time': changed_time, 'objects': objects}
+        self.save_snapshot()
+        return objects
@@ -1,6 +1,9 @@
-import requests
+import asyncio
 import logging
+import aiohttp
 from app.config.config import Config
+from app.helpers.swr_cache import StaleWhileRevalidateCache
+from app.services.catalog_sync import CatalogSync
 from cachetools import TTLCache
 
 class GrocyService:
@@ -9,6 +12,9 @@ class GrocyService:
         Initialize the GrocyService class by loading the necessary configuration
         settings for interacting with the Grocy API, including the base API URL
         and the API key. Also, set up TTL caching for products and locations.
+
+        Requests go through a single pooled keep-alive aiohttp session, created lazily
+        inside the running event loop, and at most GROCY_MAX_CONCURRENT_REQUESTS are in flight.
         """
         self.config = Config()  # Load configuration settings from the global config
         self.api_base = self.config.grocy_api_base  # Base URL for the Grocy API
@@ -20,71 +26,163 @@ class GrocyService:
             "GROCY-API-KEY": self.api_key
         }
 
-        # Set up TTL cache for products and locations (TTL values from config)
-        self.products_cache = TTLCache(maxsize=100, ttl=self.config.products_cache_ttl)  # Cache for products
-        self.locations_cache = TTLCache(maxsize=50, ttl=self.config.locations_cache_ttl)  # Cache for locations
+        # Set up the cache for products and locations (TTL values from config). In 'swr' mode
+        # expired entries keep being served while they are refreshed in the background.
+        self.cache_mode = self.config.grocy_cache_mode
+        if self.cache_mode == 'swr':
+            self.products_cache = StaleWhileRevalidateCache(self.config.products_cache_ttl, name="products")
+            self.locations_cache = StaleWhileRevalidateCache(self.config.locations_cache_ttl, name="locations")
+        else:
+            self.products_cache = TTLCache(maxsize=100, ttl=self.config.products_cache_ttl)  # Cache for products
+            self.locations_cache = TTLCache(maxsize=50, ttl=self.config.locations_cache_ttl)  # Cache for locations
+
+        # Local catalog snapshot, only refreshed when the Grocy database changed
+        self.catalog_sync = CatalogSync(self, self.config.catalog_snapshot_file) if self.config.catalog_snapshot_file else None
+
+        # Connection pool and concurrency limit, created on first use inside the event loop
+        self.session = None
+        self.semaphore = None
 
-    def fetch_products(self):
+    async def get_session(self):
         """
-        Fetch a list of products from the Grocy API using a GET request.
-        Cached for the duration specified by the PRODUCTS_CACHE_TTL setting.
-        
+        Return the pooled HTTP session, creating it on first use.
+
         Returns:
-            dict: The JSON response from the API if successful, or None if failed.
+            aiohttp.ClientSession: The keep-alive session used for all Grocy requests.
+        """
+        if self.session is None or self.session.closed:
+            max_requests = self.config.grocy_max_concurrent_requests
+            self.session = aiohttp.ClientSession(
+                headers={name: value for name, value in self.headers.items() if value is not None},
+                connector=aiohttp.TCPConnector(limit=max_requests),
+                timeout=aiohttp.ClientTimeout(total=self.config.grocy_request_timeout)
+            )
+            self.semaphore = asyncio.Semaphore(max_requests)
+        return self.session
+
+    async def close(self):
+        """Cancel the background cache refreshes and close the pooled HTTP session."""
+        if self.cache_mode == 'swr':
+            await self.products_cache.close()
+            await self.locations_cache.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def fetch_db_changed_time(self):
         """
-        if 'products' in self.products_cache:
-            self.logger.info("Fetching products from cache.")
-            return self.products_cache['products']
+        Fetch the time of the last change to the Grocy database. This is a cheap request,
+        used to decide whether the catalog has to be downloaded again.
 
-        url = f"{self.api_base}/api/objects/products"
+        Returns:
+            str: The last change time reported by Grocy, or None if failed.
+        """
+        url = f"{self.api_base}/api/system/db-changed-time"
         try:
-            self.logger.info(f"Fetching products from Grocy API: {url}")
-            response = requests.get(url, headers=self.headers)
-
-            if response.status_code == 200:
-                self.logger.info("Successfully fetched products from Grocy API.")
-                products = response.json()
-                self.products_cache['products'] = products  # Cache the result
-                return products
-            else:
-                self.logger.error(f"Failed to fetch products: {response.status_code}")
-                return None
-
-        except requests.RequestException as e:
-            self.logger.error(f"An error occurred while fetching products: {e}")
+            session = await self.get_session()
+            async with self.semaphore, session.get(url) as response:
+                if response.status == 200:
+                    return (await response.json()).get('changed_time')
+                else:
+                    self.logger.error(f"Failed to fetch the database change time: {response.status}")
+                    return None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error(f"An error occurred while fetching the database change time: {e}")
             return None
 
-    def fetch_locations(self):
+    async def fetch_objects(self, entity):
         """
-        Fetch a list of locations from the Grocy API using a GET request.
-        Cached for the duration specified by the LOCATIONS_CACHE_TTL setting.
-        
+        Fetch all objects of an entity from the Grocy API using a GET request.
+
+        Parameters:
+            entity (str): The Grocy object entity, e.g. 'products' or 'locations'.
+
         Returns:
-            dict: The JSON response from the API if successful, or None if failed.
+            list: The JSON response from the API if successful, or None if failed.
         """
-        if 'locations' in self.locations_cache:
-            self.logger.info("Fetching locations from cache.")
-            return self.locations_cache['locations']
-
-        url = f"{self.api_base}/api/objects/locations"
+        url = f"{self.api_base}/api/objects/{entity}"
         try:
-            self.logger.info(f"Fetching locations from Grocy API: {url}")
-            response = requests.get(url, headers=self.headers)
-
-            if response.status_code == 200:
-                self.logger.info("Successfully fetched locations from Grocy API.")
-                locations = response.json()
-                self.locations_cache['locations'] = locations  # Cache the result
-                return locations
-            else:
-                self.logger.error(f"Failed to fetch locations: {response.status_code}")
-                return None
-
-        except requests.RequestException as e:
-            self.logger.error(f"An error occurred while fetching locations: {e}")
+            self.logger.info(f"Fetching {entity} from Grocy API: {url}")
+            session = await self.get_session()
+            async with self.semaphore, session.get(url) as response:
+                if response.status == 200:
+                    self.logger.info(f"Successfully fetched {entity} from Grocy API.")
+                    return await response.json()
+                else:
+                    self.logger.error(f"Failed to fetch {entity}: {response.status}")
+                    return None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error(f"An error occurred while fetching {entity}: {e}")
             return None
 
-    def add_to_stock(self, product_id, amount, location_id, total_price):
+    async def fetch_catalog(self, entity):
+        """
+        Fetch the objects of an entity through the catalog snapshot if one is configured,
+        or straight from the Grocy API otherwise.
+        """
+        if self.catalog_sync is not None:
+            return await self.catalog_sync.fetch(entity)
+        return await self.fetch_objects(entity)
+
+    async def fetch_cached(self, cache, entity):
+        """
+        Fetch the objects of an entity through the given cache.
+
+        Parameters:
+            cache (TTLCache | StaleWhileRevalidateCache): The cache of the entity.
+            entity (str): The Grocy object entity, e.g. 'products' or 'locations'.
+
+        Returns:
+            list: The objects if successful, or None if failed.
+        """
+        if self.cache_mode == 'swr':
+            return await cache.get(entity, lambda: self.fetch_catalog(entity))
+
+        if entity in cache:
+            self.logger.info(f"Fetching {entity} from cache.")
+            return cache[entity]
+
+        objects = await self.fetch_catalog(entity)
+        if objects is not None:
+            cache[entity] = objects  # Cache the result
+        return objects
+
+    async def fetch_products(self):
+        """
+        Fetch the list of products from Grocy.
+        Cached for the duration specified by the PRODUCTS_CACHE_TTL setting; once expired the
+        local catalog snapshot is reused unless the Grocy database changed.
+
+        Returns:
+            list: The products if successful, or None if failed.
+        """
+        return await self.fetch_cached(self.products_cache, 'products')
+
+    async def fetch_locations(self):
+        """
+        Fetch the list of locations from Grocy.
+        Cached for the duration specified by the LOCATIONS_CACHE_TTL setting; once expired the
+        local catalog snapshot is reused unless the Grocy database changed.
+
+        Returns:
+            list: The locations if successful, or None if failed.
+        """
+        return await self.fetch_cached(self.locations_cache, 'locations')
+
+    def cache_stats(self):
+        """
+        Return the counters of the stale-while-revalidate caches.
+
+        Returns:
+            dict: Map of entity -> counters, empty when the cache mode is 'ttl'.
+        """
+        if self.cache_mode != 'swr':
+            return {}
+        return {'products': self.products_cache.stats(), 'locations': self.locations_cache.stats()}
+
+    async def add_to_stock(self, product_id, amount, location_id, total_price):
         """
         Add a product to Grocy stock by sending a POST request to the Grocy stock API,
         including the total price of the product.
@@ -107,15 +205,15 @@ class GrocyService:
 
         try:
             self.logger.info(f"Adding product ID {product_id} to stock at location ID {location_id} with total price: {total_price}.")
-            response = requests.post(url, headers=self.headers, json=payload)
-
-            if response.status_code == 200:
-                self.logger.info(f"Successfully added product ID {product_id} to stock with price {total_price}.")
-                return response.json()
-            else:
-                self.logger.error(f"Failed to add product to stock: {response.status_code}, Response: {response.text}")
-                return None
-
-        except requests.RequestException as e:
+            session = await self.get_session()
+            async with self.semaphore, session.post(url, json=payload) as response:
+                if response.status == 200:
+                    self.logger.info(f"Successfully added product ID {product_id} to stock with price {total_price}.")
+                    return await response.json()
+                else:
+                    self.logger.error(f"Failed to add product to stock: {response.status}, Response: {await response.text()}")
+                    return None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             self.logger.error(f"An error occurred while adding product to stock: {e}")
             return None
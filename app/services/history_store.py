@@ -0,0 +1,299 @@
+import contextlib
+import io
+import json
+import logging
+import os
+from app.helpers.history_serializer import HistorySerializer
+from app.services.journal_history_store import JournalHistoryStore
+from app.services.lazy_history import LazyOrderHistory, file_version, index_entry
+from app.services.sqlite_history_store import SqliteHistoryStore
+
+
+class JsonHistoryStore:
+    """
+    Order history stored as a single JSON array, newest orders first.
+
+    Offsets of the orders are offsets in the uncompressed array: reading an order from a
+    compressed history decompresses the file up to that order.
+    """
+
+    def __init__(self, history_file, serializer=None):
+        """
+        Initialize the store.
+
+        Parameters:
+            history_file (str): Path of the JSON order history.
+            serializer (HistorySerializer): Format and compression of the file; indented and uncompressed by default.
+        """
+        self.history_file = history_file
+        self.serializer = serializer or HistorySerializer()
+        self.logger = logging.getLogger(__name__)
+        self.index = None  # order_number -> HistoryIndexEntry, with the (offset, length) of the order in bytes
+        self.compact_file = None  # Whether the indexed file stores one order per line
+
+    def exists(self):
+        """Return whether an order history has been saved."""
+        return os.path.exists(self.history_file)
+
+    def version(self):
+        """Return a version of the history, changing whenever it is saved."""
+        return f"json:{file_version(self.history_file)}"
+
+    def load_index(self):
+        """
+        Index the history: the orders are streamed and only their status and location are kept.
+
+        Returns:
+            dict: Map of order_number -> HistoryIndexEntry, newest orders first.
+        """
+        self.index = {
+            order['order_number']: index_entry(order.get('status'), order.get('processing_status'), (offset, length))
+            for order, offset, length in self.iter_records()
+        }
+        return self.index
+
+    def load(self):
+        """
+        Load the order history index.
+
+        Returns:
+            LazyOrderHistory: Map of order_number -> order, reading an order when it is accessed.
+        """
+        self.load_index()
+        return LazyOrderHistory(self)
+
+    def order_numbers(self):
+        """Iterate over the indexed order numbers, newest first."""
+        return iter(self.index)
+
+    def get_order(self, order_number):
+        """
+        Read a single indexed order.
+
+        Parameters:
+            order_number (str): The order number.
+
+        Returns:
+            dict: The order.
+        """
+        offset, length = self.index[order_number].offset
+        with self.serializer.open_reader(self.history_file, buffered=False) as file:
+            file.seek(offset)
+            return self.serializer.loads(file.read(length))
+
+    def iter_orders(self):
+        """
+        Stream the orders of the history without loading the whole file.
+
+        Yields:
+            dict: The orders, newest first.
+        """
+        for order, _, _ in self.iter_records():
+            yield order
+
+    def iter_records(self, chunk_size=1 << 16):
+        """
+        Stream the orders of the history with their location in the file.
+
+        Parameters:
+            chunk_size (int): Number of characters read at a time.
+
+        Yields:
+            tuple: The order and its offset and length in bytes, newest first.
+        """
+        if not self.exists():
+            return
+
+        with self.serializer.open_reader(self.history_file) as file:
+            self.compact_file = file.peek(3)[:3] in (b"[\n{", b"[]")
+            if self.compact_file:
+                yield from self.iter_compact_records(file)
+                return
+
+        decoder = json.JSONDecoder()
+        with io.TextIOWrapper(self.serializer.open_reader(self.history_file), encoding='utf-8', newline='') as file:
+            buffer = ""
+            position = 0
+            cursor, cursor_offset = 0, 0  # A position in the buffer and its byte offset in the file
+            started = False
+            while True:
+                chunk = file.read(chunk_size)
+                cursor_offset += len(buffer[cursor:position].encode('utf-8'))
+                buffer = buffer[position:] + chunk
+                position = cursor = 0
+                while True:
+                    # Skip whitespace, the opening bracket and the separators between orders
+                    while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+                        started = started or buffer[position] == '['
+                        position += 1
+                    if position >= len(buffer) or not started:
+                        break
+                    try:
+                        order, end = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        if not chunk:
+                            raise
+                        break  # The order continues in the next chunk
+                    offset = cursor_offset + len(buffer[cursor:position].encode('utf-8'))
+                    length = len(buffer[position:end].encode('utf-8'))
+                    cursor, cursor_offset = end, offset + length
+                    position = end
+                    yield order, offset, length
+                if not chunk:
+                    break
+
+    def iter_compact_records(self, file):
+        """
+        Stream the orders of a compact history, one order per line.
+
+        Parameters:
+            file: The history, opened in binary mode.
+
+        Yields:
+            tuple: The order and its offset and length in bytes, newest first.
+        """
+        offset = 0
+        for line in file:
+            if line.startswith(b"{"):
+                record = line.rstrip(b",\r\n")
+                yield self.serializer.loads(record), offset, len(record)
+            offset += len(line)
+
+    def save(self, orders):
+        """
+        Saves the updated order history to the JSON file with updated orders in place and new orders pre-appended.
+
+        Only the given orders are serialized: the other orders are copied from the current
+        file as they are, using the index. The file is replaced atomically.
+
+        Parameters:
+            orders (list): The new and updated orders, newest first, as complete records replacing the saved ones.
+        """
+        if self.index is None:
+            self.load_index()
+
+        changed = {}
+        new_orders = []
+        for order in orders:
+            if order['order_number'] in self.index:
+                changed[order['order_number']] = order
+            else:
+                new_orders.append(order)
+
+        index = {}
+        indent = b"" if self.serializer.compact else b"    "
+        temp_file = f"{self.history_file}.tmp"
+        with open(temp_file, 'wb') as file, \
+                self.serializer.open_reader(self.history_file, buffered=False) if self.exists() \
+                else contextlib.nullcontext() as source:
+            with self.serializer.open_writer(file) as target:
+                target.write(b"[")
+                position = 1
+                for count, (order_number, entry, record) in enumerate(self.iter_saved_records(source, new_orders, changed)):
+                    separator = (b",\n" if count else b"\n") + indent
+                    target.write(separator)
+                    position += len(separator)
+                    index[order_number] = entry._replace(offset=(position, len(record)))
+                    target.write(record)
+                    position += len(record)
+                target.write(b"\n]" if index else b"]")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.history_file)
+        self.index = index
+        self.compact_file = self.serializer.compact
+
+    def iter_saved_records(self, source, new_orders, changed):
+        """
+        Yield the elements of the history array to save: the new orders first, then the saved
+        orders in place, re-encoded if they changed and copied from the current file otherwise.
+        Unchanged orders are re-encoded as well when the file is in another format.
+
+        Yields:
+            tuple: The order number, its index entry and the encoded order.
+        """
+        encode = self.serializer.encode_order
+        for order in new_orders:
+            yield order['order_number'], index_entry(order.get('status'), order.get('processing_status'), None), \
+                encode(order)
+
+        # Orders are read in file order, so that a compressed source is decompressed once
+        same_format = self.compact_file == self.serializer.compact
+        for order_number, entry in self.index.items():
+            order = changed.get(order_number)
+            if order is not None:
+                yield order_number, index_entry(order.get('status'), order.get('processing_status'), None), \
+                    encode(order)
+            else:
+                offset, length = entry.offset
+                source.seek(offset)
+                record = source.read(length)
+                yield order_number, entry, record if same_format else encode(self.serializer.loads(record))
+
+    def close(self):
+        """Nothing to release for the JSON store."""
+
+
+def export_history_json(history_store, output_file):
+    """
+    Export an order history to a JSON file in the format of the JSON store.
+
+    Parameters:
+        history_store: The history store to export.
+        output_file (str): Path of the JSON file to write.
+
+    Returns:
+        int: The number of orders exported.
+    """
+    exported = 0
+    with open(output_file, 'w', encoding='utf-8') as file:
+        file.write("[")
+        for order in history_store.iter_orders():
+            file.write(",\n" if exported else "\n")
+            file.write(json.dumps(order, ensure_ascii=False, indent=4))
+            exported += 1
+        file.write("\n]" if exported else "]")
+    return exported
+
+
+def migrate_json_history(json_store, history_store):
+    """
+    Import a JSON order history into another history store in one transaction.
+
+    Parameters:
+        json_store (JsonHistoryStore): The JSON history to import.
+        history_store: The store receiving the orders.
+
+    Returns:
+        int: The number of orders imported.
+    """
+    # Saved in a single call, so that the newest-first order of the JSON history is kept
+    orders = list(json_store.iter_orders())
+    history_store.save(orders)
+    return len(orders)
+
+
+def create_history_store(config):
+    """
+    Create the order history store selected by the HISTORY_BACKEND setting.
+
+    Parameters:
+        config (Config): The application configuration.
+
+    Returns:
+        The history store.
+    """
+    json_store = JsonHistoryStore(config.history_file, HistorySerializer.from_config(config))
+    if config.history_backend == 'sqlite':
+        history_store = SqliteHistoryStore(config.history_db_file)
+    elif config.history_backend == 'journal':
+        history_store = JournalHistoryStore(config.history_journal_file, config.history_journal_compaction_ratio)
+    else:
+        return json_store
+
+    if not history_store.exists() and json_store.exists():
+        # Import the JSON history on first use, so that known orders are not processed again
+        imported = migrate_json_history(json_store, history_store)
+        logging.getLogger(__name__).info(f"Imported {imported} orders from {config.history_file} "
+                                         f"into the {config.history_backend} history.")
+    return history_store
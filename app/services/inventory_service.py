@@ -1,7 +1,16 @@
+import asyncio
 import logging
 from app.helpers.utils import Utils
 from app.services.grocy_service import GrocyService
-from app.helpers.matching_utils import MatchingUtils  
+from app.services.stock_update_pipeline import StockUpdatePipeline
+from app.services.stock_outbox import StockOutbox
+from app.helpers.matching_utils import (
+    CatalogIndex, MatcherPipeline, NormalizedNameStage, TokenOverlapStage, ScorerStage
+)
+from app.helpers.batch_matching import BatchMatcher
+from app.helpers.lsh_matching import MinHashLSHIndex
+from app.helpers.match_cache import MatchCache
+from app.helpers.location_routing import LocationRoutingTable
 from app.config.config import Config
 
 class InventoryService:
@@ -13,8 +22,31 @@ class InventoryService:
         self.config = Config()
         self.logger = logging.getLogger(__name__)
         self.similarity_threshold = self.config.similarity_threshold  # Use the threshold from the config
+        self.catalog_index = None  # CatalogIndex built for the last fetched product list
+        self.matcher = None  # MatcherPipeline built over the current catalog index
+        self.location_routing = None  # LocationRoutingTable built for the last fetched locations list
 
-    def process_order(self, order):
+        # Persistent cache of accepted matches (disabled when no file is configured)
+        self.match_cache = None
+        if self.config.match_cache_file:
+            self.match_cache = MatchCache(self.config.match_cache_file, self.config.match_cache_max_entries)
+
+        # Durable outbox of stock additions (disabled when no file is configured)
+        self.stock_outbox = None
+        self.stock_outbox_task = None
+        if self.config.stock_outbox_file:
+            self.stock_outbox = StockOutbox(
+                self.grocy_service,
+                self.config.stock_outbox_file,
+                batch_size=self.config.stock_outbox_batch_size,
+                max_attempts=self.config.stock_outbox_max_attempts,
+                retry_delay=self.config.stock_outbox_retry_delay,
+                max_retry_delay=self.config.stock_outbox_max_retry_delay,
+                concurrency=self.config.stock_update_concurrency,
+                rate_limit=self.config.stock_update_rate_limit
+            )
+
+    async def process_order(self, order):
         """
         Main function to process an order by matching products and updating stock if necessary.
 
@@ -26,76 +58,264 @@ class InventoryService:
         """
         self.logger.info("Processing order with order number: %s", order.get("order_number"))
         
-        products = self.fetch_products()
+        products = await self.fetch_products()
         if not products:
             return None
         
-        parking_location_id = self.find_parking_location()
-        if not parking_location_id:
+        location_routing = await self.get_location_routing()
+        if not location_routing:
             return None
 
         order_details = order.get("details", {})
         matched_products = {}
 
-        for product_name, product_info in order_details.items():
-            self.logger.info(f"Looking for product: {product_name} in Grocy inventory")
-            
-            best_match, similarity_percentage = self.match_product(product_name, products)
-            if not best_match:
-                continue
+        # Match every line of the order against the catalog in a single pass, counting the stage hits of this order
+        self.get_matcher(products).reset_stats()
+        matches = self.match_products(list(order_details.keys()), products)
 
-            if similarity_percentage >= self.similarity_threshold:
-                self.logger.info(f"Product {best_match['name']} found with similarity {similarity_percentage:.2f}%")
-                unit_price = self.convert_unit_price(product_info.get('unit_price', '0.0'))
-                order_quantity = product_info.get('quantity', 1)
+        # Matched lines are recorded in the outbox and sent by its flusher, or, without an outbox,
+        # queued and pushed to Grocy concurrently while the order is processed
+        stock_updates = None
+        outbox_additions = []
+        if self.config.live_stock_update and self.stock_outbox is None:
+            stock_updates = StockUpdatePipeline(
+                self.grocy_service, self.config.stock_update_concurrency, self.config.stock_update_rate_limit
+            )
+            stock_updates.start()
 
-                if self.config.live_stock_update:
-                    self.update_stock(best_match['id'], order_quantity, parking_location_id, unit_price)
+        try:
+            for product_name, product_info in order_details.items():
+                self.logger.info(f"Looking for product: {product_name} in Grocy inventory")
 
-                matched_products[product_name] = self.build_matched_product_info(
-                    best_match, order_quantity, unit_price, similarity_percentage, parking_location_id
-                )
-            else:
-                self.log_warning_for_low_similarity(product_name, best_match, similarity_percentage)
+                best_match, similarity_percentage, runner_ups = matches[product_name]
+                if not best_match:
+                    continue
+
+                if similarity_percentage >= self.similarity_threshold:
+                    self.logger.info(f"Product {best_match['name']} found with similarity {similarity_percentage:.2f}%")
+                    unit_price = self.convert_unit_price(product_info.get('unit_price', '0.0'))
+                    order_quantity = product_info.get('quantity', 1)
+                    location_id = location_routing.route(product_info.get('category'), best_match)
+
+                    if stock_updates:
+                        stock_updates.submit(product_name, best_match['id'], order_quantity, location_id, unit_price)
+
+                    matched_products[product_name] = self.build_matched_product_info(
+                        best_match, order_quantity, unit_price, similarity_percentage, location_id
+                    )
+
+                    if self.config.live_stock_update and self.stock_outbox is not None:
+                        key = StockOutbox.idempotency_key(order.get("order_number"), product_name)
+                        outbox_additions.append((key, best_match['id'], order_quantity, location_id, unit_price))
+                        matched_products[product_name]['stock_update'] = {'status': 'queued', 'idempotency_key': key}
+                    self.remember_match(product_name, best_match, similarity_percentage, products)
+                else:
+                    self.log_warning_for_low_similarity(product_name, best_match, similarity_percentage, runner_ups)
+
+            if stock_updates:
+                for product_name, result in (await stock_updates.finish()).items():
+                    matched_products[product_name]['stock_update'] = result
+        finally:
+            if stock_updates:
+                # Stop the workers if processing failed before finish(), so that no task outlives the order
+                await stock_updates.stop()
+
+        if outbox_additions:
+            self.stock_outbox.enqueue(outbox_additions)
+            self.stock_outbox.notify()
+            self.logger.info(f"Stock outbox depth: {self.stock_outbox.depth()} additions pending.")
+
+        if self.match_cache is not None:
+            self.match_cache.save()
+
+        for stage_name, stats in self.matcher.stats().items():
+            self.logger.info(f"Matching stage {stage_name}: {stats['hits']}/{stats['attempts']} lines of the order resolved "
+                             f"({stats['hit_rate']:.0%} hit rate).")
+        for entity, stats in self.grocy_service.cache_stats().items():
+            self.logger.info(f"Grocy {entity} cache: {stats['hits']} hits, {stats['misses']} misses, "
+                             f"{stats['stale_served']} stale served, {stats['refreshes']} refreshes "
+                             f"({stats['refresh_failures']} failed, mean {stats['refresh_latency_mean']:.3f}s, "
+                             f"max {stats['refresh_latency_max']:.3f}s).")
 
         return matched_products if matched_products else None
 
-    def fetch_products(self):
+    async def fetch_products(self):
         """Fetch product list from Grocy."""
-        products = self.grocy_service.fetch_products()
+        products = await self.grocy_service.fetch_products()
         if not products:
             self.logger.error("Failed to fetch products from Grocy API")
         return products
 
-    def find_parking_location(self):
-        """Find and return the ID of the 'Parking' location."""
-        locations = self.grocy_service.fetch_locations()
+    def get_catalog_index(self, products):
+        """
+        Return the CatalogIndex for the given product list, rebuilding it only when the
+        catalog changed (i.e. a new list was returned by GrocyService.fetch_products).
+
+        Parameters:
+            products (list): The product list fetched from Grocy.
+
+        Returns:
+            CatalogIndex: The index over the product list.
+        """
+        if self.catalog_index is None or self.catalog_index.products is not products:
+            self.logger.info(f"Building catalog index for {len(products)} products.")
+            self.catalog_index = CatalogIndex(products)
+        return self.catalog_index
+
+    def get_matcher(self, products):
+        """
+        Return the matcher pipeline for the given product list, rebuilding it only when the
+        catalog index was rebuilt.
+
+        The pipeline tries a normalized-name lookup, then a token-overlap shortlist, and only
+        falls back to the configured cosine backend for the lines those stages cannot resolve.
+
+        Parameters:
+            products (list): The product list fetched from Grocy.
+
+        Returns:
+            MatcherPipeline: The matcher over the product list.
+        """
+        catalog_index = self.get_catalog_index(products)
+        if self.matcher is None or self.matcher.catalog_index is not catalog_index:
+            if self.config.matching_backend == 'lsh':
+                self.logger.info("Building MinHash/LSH matcher.")
+                backend = MinHashLSHIndex(
+                    catalog_index,
+                    num_perm=self.config.lsh_num_perm,
+                    bands=self.config.lsh_bands,
+                    shingle_size=self.config.lsh_shingle_size
+                )
+            else:
+                backend = BatchMatcher(catalog_index)
+
+            self.matcher = MatcherPipeline(catalog_index, [
+                NormalizedNameStage(catalog_index),
+                TokenOverlapStage(catalog_index, self.config.matching_shortlist_size, self.similarity_threshold),
+                ScorerStage(backend)
+            ])
+        return self.matcher
+
+    async def get_location_routing(self):
+        """
+        Return the location routing table, rebuilding it only when the locations list changed
+        (i.e. a new list was returned by GrocyService.fetch_locations).
+
+        Returns:
+            LocationRoutingTable: The routing table, or None if the locations could not be
+            fetched or no default location was found.
+        """
+        locations = await self.grocy_service.fetch_locations()
         if not locations:
             self.logger.error("Failed to fetch locations from Grocy API")
             return None
 
-        parking_location_match = MatchingUtils.get_best_match("Parking", locations)
-        if not parking_location_match:
-            self.logger.warning("No matching location found for 'Parking'")
+        if self.location_routing is None or self.location_routing.locations is not locations:
+            self.logger.info(f"Building location routing table for {len(locations)} locations.")
+            self.location_routing = LocationRoutingTable.from_config(locations, self.config)
+            if self.location_routing.default_location_id is None:
+                self.logger.warning(f"No matching location found for '{self.config.default_location}'")
+            else:
+                self.logger.info(f"Location '{self.config.default_location}' found with location ID: "
+                                 f"{self.location_routing.default_location_id}")
+
+        if self.location_routing.default_location_id is None:
             return None
-        
-        parking_location_id = parking_location_match['product']['id']
-        self.logger.info(f"Location 'Parking' found with location ID: {parking_location_id}")
-        return parking_location_id
+        return self.location_routing
 
     def match_product(self, product_name, products):
         """
-        Match a product name from the order to a product in Grocy.
+        Match a product name from the order to a product in Grocy, through match_products.
 
         Returns:
-            tuple: Matched product and similarity percentage, or None if not found.
+            tuple: Matched product and similarity percentage, or (None, 0) if not found.
         """
-        best_match = MatchingUtils.get_best_match(product_name, products)
-        if best_match:
-            return best_match['product'], best_match['similarity_percentage']
-        else:
-            self.logger.warning(f"Product {product_name} not found in Grocy.")
-            return None, 0
+        return self.match_products([product_name], products)[product_name][:2]
+
+    def match_products(self, product_names, products):
+        """
+        Match many product names (e.g. all lines of one or several orders) to Grocy products
+        with the configured matching backend.
+
+        Parameters:
+            product_names (list): The product names to match.
+            products (list): The product list fetched from Grocy.
+
+        Returns:
+            dict: Map of product name -> (matched product, similarity percentage, runner-up matches),
+            with (None, 0, []) for names that could not be matched.
+        """
+        matches = {}
+        uncached_names = []
+        for product_name in product_names:
+            cached_match = self.lookup_cached_match(product_name, products)
+            if cached_match:
+                matches[product_name] = (*cached_match, [])
+            else:
+                uncached_names.append(product_name)
+
+        # Compute the next best candidates too, so that near misses can be reported without another scan
+        results = self.get_matcher(products).match_many(uncached_names, 1 + self.config.near_miss_candidates)
+
+        for product_name, best_match in zip(uncached_names, results):
+            if best_match:
+                matches[product_name] = (
+                    best_match['product'], best_match['similarity_percentage'], best_match.get('runner_ups', [])
+                )
+            else:
+                self.logger.warning(f"Product {product_name} not found in Grocy.")
+                matches[product_name] = (None, 0, [])
+        return matches
+
+    def lookup_cached_match(self, product_name, products):
+        """
+        Look up a previously accepted match for the product name in the match cache.
+
+        Parameters:
+            product_name (str): The product name from the order.
+            products (list): The product list fetched from Grocy.
+
+        Returns:
+            tuple: Cached product and similarity percentage, or None on a miss.
+        """
+        if self.match_cache is None:
+            return None
+
+        catalog_index = self.get_catalog_index(products)
+        entry = self.match_cache.get(product_name, catalog_index.fingerprint)
+        if not entry:
+            return None
+
+        product = catalog_index.get_product(entry['product_id'])
+        if not product:
+            self.match_cache.invalidate(product_name)
+            return None
+
+        self.logger.debug(f"Match cache hit for {product_name}: {product['name']}")
+        return product, entry['similarity_percentage']
+
+    def remember_match(self, product_name, grocy_product, similarity_percentage, products):
+        """Record an accepted match in the match cache."""
+        if self.match_cache is not None:
+            fingerprint = self.get_catalog_index(products).fingerprint
+            self.match_cache.put(product_name, fingerprint, grocy_product, similarity_percentage)
+
+    def start_stock_outbox_flusher(self):
+        """Start flushing the stock outbox in the background, if live stock updates go through it."""
+        if self.config.live_stock_update and self.stock_outbox is not None and self.stock_outbox_task is None:
+            self.stock_outbox_task = asyncio.create_task(
+                self.stock_outbox.run(self.config.stock_outbox_flush_interval)
+            )
+
+    async def close(self):
+        """Stop the stock outbox flusher and release the connections held by the Grocy client."""
+        if self.stock_outbox_task is not None:
+            self.stock_outbox_task.cancel()
+            await asyncio.gather(self.stock_outbox_task, return_exceptions=True)
+            self.stock_outbox_task = None
+        if self.stock_outbox is not None:
+            self.stock_outbox.close()
+        await self.grocy_service.close()
 
     def convert_unit_price(self, unit_price_str):
         """
@@ -110,7 +330,7 @@ class InventoryService:
             self.logger.error(f"Failed to convert unit price {unit_price_str}: {e}")
             return 0.0
 
-    def update_stock(self, product_id, order_quantity, location_id, unit_price):
+    async def update_stock(self, product_id, order_quantity, location_id, unit_price):
         """
         Update stock in Grocy by adding the product to the inventory.
         
@@ -120,7 +340,7 @@ class InventoryService:
             location_id (int): The location ID where the product is stored.
             unit_price (float): The unit price of the product.
         """
-        response = self.grocy_service.add_to_stock(product_id, order_quantity, location_id, unit_price)
+        response = await self.grocy_service.add_to_stock(product_id, order_quantity, location_id, unit_price)
         if response is None:
             self.logger.error(f"Failed to add product {product_id} to stock.")
 
@@ -144,8 +364,13 @@ class InventoryService:
             }
         }
 
-    def log_warning_for_low_similarity(self, product_name, grocy_product, similarity_percentage):
-        """Log a warning for low similarity between the order product and the Grocy product."""
+    def log_warning_for_low_similarity(self, product_name, grocy_product, similarity_percentage, runner_ups=None):
+        """Log a warning for low similarity between the order product and the Grocy product, with the runner-up candidates."""
         if similarity_percentage >= self.config.warning_similarity_threshold:
             self.logger.warning(f"Order Product {product_name} skipped due to low similarity ({similarity_percentage:.2f}%) "
                                 f"with Grocy Product {grocy_product['name']}.")
+            if runner_ups:
+                candidates = ", ".join(
+                    f"{match['product']['name']} ({match['similarity_percentage']:.2f}%)" for match in runner_ups
+                )
+                self.logger.warning(f"Other candidates for {product_name}: {candidates}")
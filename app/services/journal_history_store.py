@@ -0,0 +1,256 @@
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+from app.helpers.history_serializer import HistorySerializer
+from app.services.lazy_history import LazyOrderHistory, file_version, index_entry
+
+# Records are written with the order number, status and processing status first, so that they can
+# be indexed without decoding the whole order
+_RECORD_HEADER_PATTERN = re.compile(
+    rb'\{"order_number":("(?:[^"\\]|\\.)*")'
+    rb'(?:,"status":(null|"(?:[^"\\]|\\.)*"))?'
+    rb'(?:,"processing_status":(null|"(?:[^"\\]|\\.)*"))?'
+)
+
+
+class JournalHistoryStore:
+    """
+    Order history stored as an append-only JSON-lines journal: every new or updated order is
+    appended as one record, so that the cost of a save is proportional to the changes.
+
+    The journal is indexed by a memory-mapped scan mapping every order number to the status
+    and offset of its latest record. Superseded records are merged away by a compaction running in a
+    background thread once they outnumber the live records by the configured ratio.
+    """
+
+    def __init__(self, journal_file, compaction_ratio=0.5):
+        """
+        Initialize the store. The journal is indexed on first use.
+
+        Parameters:
+            journal_file (str): Path of the JSON-lines journal.
+            compaction_ratio (float): Ratio of superseded to live records triggering a compaction.
+        """
+        self.journal_file = journal_file
+        self.compaction_ratio = compaction_ratio
+        self.logger = logging.getLogger(__name__)
+
+        self.index = None  # order_number -> HistoryIndexEntry with the (offset, length) of its latest record, oldest first
+        self.superseded = 0  # Records replaced by a later record of the same order
+        self.size = 0  # Size of the indexed journal
+        self.lock = threading.Lock()  # Serializes appends, reads and the end of a compaction
+        self.compaction_thread = None
+
+    @staticmethod
+    def encode(order):
+        """Encode an order as one journal record, order number, status and processing status first."""
+        record = {'order_number': order['order_number']}
+        for key in ('status', 'processing_status'):
+            if key in order:
+                record[key] = order[key]
+        record.update(order)
+        return HistorySerializer.dumps_compact(record) + b"\n"
+
+    @staticmethod
+    def record_header(record):
+        """
+        Return the order number, status and processing status of a record, decoding the
+        whole record only if they are not at its start.
+        """
+        match = _RECORD_HEADER_PATTERN.match(record)
+        if match and match.group(2) is not None:
+            return tuple(json.loads(value) if value is not None else None for value in match.groups())
+        order = HistorySerializer.loads(record)
+        return order['order_number'], order.get('status'), order.get('processing_status')
+
+    def scan(self, data, start, end, index):
+        """
+        Index the records of data[start:end] into index.
+
+        Returns:
+            tuple: The end of the last complete record and the number of records superseded.
+        """
+        superseded = 0
+        position = start
+        while position < end:
+            line_end = data.find(b"\n", position, end)
+            if line_end == -1:
+                break  # Record interrupted by a crash, it is truncated on the next append
+            if line_end > position:
+                order_number, status, processing_status = self.record_header(data[position:line_end])
+                if order_number in index:
+                    superseded += 1
+                index[order_number] = index_entry(status, processing_status, (position, line_end + 1 - position))
+            position = line_end + 1
+        return position, superseded
+
+    def load_index(self):
+        """
+        Index the journal with a memory-mapped scan, without decoding the order details.
+
+        Returns:
+            dict: Map of order_number -> HistoryIndexEntry, oldest orders first.
+        """
+        self.index = {}
+        self.superseded = 0
+        self.size = 0
+        if not os.path.exists(self.journal_file) or os.path.getsize(self.journal_file) == 0:
+            return self.index
+
+        with open(self.journal_file, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            self.size, self.superseded = self.scan(data, 0, len(data), self.index)
+            if self.size < len(data):
+                self.logger.warning(f"Ignoring an incomplete record at the end of {self.journal_file}.")
+        self.logger.info(f"Indexed {len(self.index)} orders from {self.journal_file} "
+                         f"({self.superseded} superseded records).")
+        return self.index
+
+    def ensure_index(self):
+        """Index the journal on first use."""
+        if self.index is None:
+            self.load_index()
+
+    def exists(self):
+        """Return whether an order history has been saved."""
+        self.ensure_index()
+        return bool(self.index)
+
+    def version(self):
+        """Return a version of the history, changing whenever it is saved or compacted."""
+        return f"journal:{file_version(self.journal_file)}"
+
+    def get_order(self, order_number):
+        """
+        Decode the latest record of an order.
+
+        Parameters:
+            order_number (str): The order number.
+
+        Returns:
+            dict: The order.
+        """
+        self.ensure_index()
+        with self.lock:
+            offset, length = self.index[order_number].offset
+            with open(self.journal_file, 'rb') as file:
+                file.seek(offset)
+                return HistorySerializer.loads(file.read(length))
+
+    def load(self):
+        """
+        Index the journal, once: the index is kept up to date by the appends.
+
+        Returns:
+            LazyOrderHistory: Map of order_number -> order, decoding an order when it is accessed.
+        """
+        self.ensure_index()
+        return LazyOrderHistory(self)
+
+    def order_numbers(self):
+        """Iterate over the indexed order numbers, newest first."""
+        return reversed(list(self.index))
+
+    def iter_orders(self):
+        """
+        Stream the orders of the history.
+
+        Yields:
+            dict: The orders, newest first.
+        """
+        self.ensure_index()
+        for order_number in self.order_numbers():
+            yield self.get_order(order_number)
+
+    def save(self, orders):
+        """
+        Append the new and updated orders to the journal. An updated order supersedes its
+        previous record as a whole.
+
+        Parameters:
+            orders (list): The new and updated orders, newest first, as complete records.
+        """
+        self.ensure_index()
+        records = [(order, self.encode(order)) for order in reversed(orders)]
+
+        with self.lock:
+            with open(self.journal_file, 'ab') as file:
+                file.truncate(self.size)  # Drop an incomplete record left by a crash
+                position = self.size
+                for order, record in records:
+                    if order['order_number'] in self.index:
+                        self.superseded += 1
+                    self.index[order['order_number']] = index_entry(
+                        order.get('status'), order.get('processing_status'), (position, len(record))
+                    )
+                    file.write(record)
+                    position += len(record)
+                file.flush()
+                os.fsync(file.fileno())
+            self.size = position
+
+        if self.superseded > max(1, len(self.index)) * self.compaction_ratio:
+            self.start_compaction()
+
+    def start_compaction(self):
+        """Compact the journal in a background thread, unless a compaction is already running."""
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return
+        self.compaction_thread = threading.Thread(target=self.compact, name="history-compaction", daemon=True)
+        self.compaction_thread.start()
+
+    def compact(self):
+        """
+        Rewrite the journal with only the latest record of every order.
+
+        The live records are copied without holding the lock, since the indexed part of the
+        journal never changes; records appended meanwhile are copied at the end, under the lock.
+        """
+        try:
+            with self.lock:
+                index = dict(self.index)
+                size = self.size
+
+            temp_file = f"{self.journal_file}.tmp"
+            compacted = {}
+            position = 0
+            with open(self.journal_file, 'rb') as source, open(temp_file, 'wb') as target:
+                for order_number, entry in index.items():
+                    offset, length = entry.offset
+                    source.seek(offset)
+                    target.write(source.read(length))
+                    compacted[order_number] = entry._replace(offset=(position, length))
+                    position += length
+
+                with self.lock:
+                    # Copy and index the records appended since the compaction started
+                    source.seek(size)
+                    tail = source.read(self.size - size)
+                    target.write(tail)
+                    tail_index = {}
+                    tail_end, superseded = self.scan(tail, 0, len(tail), tail_index)
+                    for order_number, entry in tail_index.items():
+                        if order_number in compacted:
+                            superseded += 1
+                        offset, length = entry.offset
+                        compacted[order_number] = entry._replace(offset=(position + offset, length))
+
+                    target.flush()
+                    os.fsync(target.fileno())
+                    os.replace(temp_file, self.journal_file)
+
+                    self.index = compacted
+                    self.size = position + tail_end
+                    self.superseded = superseded
+            self.logger.info(f"Compacted {self.journal_file} to {len(compacted)} orders.")
+        except OSError as e:
+            self.logger.error(f"Failed to compact {self.journal_file}: {e}")
+
+    def close(self):
+        """Wait for a running compaction to finish."""
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+            self.compaction_thread = None
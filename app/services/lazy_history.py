@@ -0,0 +1,130 @@
+import itertools
+import os
+import sys
+from collections import namedtuple
+from collections.abc import Mapping
+
+# Compact index entry of an order: what process_orders needs, plus where the store finds the order
+HistoryIndexEntry = namedtuple('HistoryIndexEntry', ['status', 'processing_status', 'offset'])
+
+
+def index_entry(status, processing_status, offset):
+    """Build an index entry, sharing the status strings between all orders."""
+    return HistoryIndexEntry(
+        sys.intern(status) if isinstance(status, str) else status,
+        sys.intern(processing_status) if isinstance(processing_status, str) else processing_status,
+        offset
+    )
+
+
+def file_version(*paths):
+    """
+    Identify the state of the files of a history store by their size and modification time.
+
+    Returns:
+        str: The version, which changes whenever one of the files is written.
+    """
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append("-")
+    return "/".join(parts)
+
+
+class LazyOrderHistory(Mapping):
+    """
+    Map of order_number -> order over a history store, holding only the compact index of the
+    orders. An order is read from the store when it is accessed and then kept, so that it
+    can be updated in place.
+
+    The map is the source of truth of the history: new and updated orders are flagged as
+    dirty and saved together, without the store re-reading the history.
+    """
+
+    def __init__(self, store):
+        """
+        Initialize the map over the index of a store.
+
+        Args:
+            store: The history store; its index must have been loaded.
+        """
+        self.store = store
+        self.orders = {}  # Orders read or added so far
+        self.new_orders = []  # Orders added since the last save, newest first
+        self.dirty = {}  # order_number -> order updated since the last save
+
+    def __getitem__(self, order_number):
+        order = self.orders.get(order_number)
+        if order is None:
+            if order_number not in self.store.index:
+                raise KeyError(order_number)
+            order = self.store.get_order(order_number)
+            self.orders[order_number] = order
+        return order
+
+    def __contains__(self, order_number):
+        return order_number in self.store.index or order_number in self.orders
+
+    def __iter__(self):
+        return itertools.chain((order['order_number'] for order in self.new_orders), self.store.order_numbers())
+
+    def __len__(self):
+        return len(self.new_orders) + len(self.store.index)
+
+    def add(self, order):
+        """
+        Add a new order, listed before the existing ones once saved.
+
+        Args:
+            order (dict): The new order.
+        """
+        self.new_orders.append(order)
+        self.orders[order['order_number']] = order
+
+    def mark_dirty(self, order_number):
+        """
+        Flag an order as updated, so that it is saved with the next save().
+
+        Args:
+            order_number (str): The order number.
+        """
+        self.dirty[order_number] = self[order_number]
+
+    def has_changes(self):
+        """Return whether orders were added or updated since the last save."""
+        return bool(self.new_orders or self.dirty)
+
+    def save(self):
+        """
+        Save the new and updated orders to the store and clear their dirty flags.
+
+        Returns:
+            int: The number of orders saved.
+        """
+        new_order_numbers = {order['order_number'] for order in self.new_orders}
+        changes = self.new_orders + [
+            order for order_number, order in self.dirty.items() if order_number not in new_order_numbers
+        ]
+        if changes:
+            self.store.save(changes)
+        self.new_orders = []
+        self.dirty = {}
+        return len(changes)
+
+    def status(self, order_number):
+        """
+        Return the status of an order without reading it from the store.
+
+        Args:
+            order_number (str): The order number.
+
+        Returns:
+            str: The status of the order.
+        """
+        order = self.orders.get(order_number)
+        if order is not None:
+            return order.get('status')
+        return self.store.index[order_number].status
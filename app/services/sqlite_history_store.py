@@ -0,0 +1,304 @@
+import itertools
+import json
+import logging
+import os
+import sqlite3
+from app.services.lazy_history import LazyOrderHistory, file_version, index_entry
+
+# Order and order line fields stored in their own columns; other fields are kept as JSON in 'extra'.
+# The 'fields' column is a bit mask of the columns present in the order or line, bit i for
+# column i, so that a field stored as NULL is told apart from a field the order never had.
+ORDER_COLUMNS = (
+    'reference', 'date', 'total_price', 'pickup_point', 'payment_method', 'status', 'details_link',
+    'previous_status', 'processing_status'
+)
+LINE_COLUMNS = ('name', 'description', 'category', 'quantity', 'unit_price', 'total_price', 'discount', 'cagnotte')
+
+
+class SqliteHistoryStore:
+    """
+    Order history stored in a SQLite database, with one table for the orders and one for
+    their lines. Saving upserts only the given orders, in a single transaction.
+
+    The value columns are declared without a type, so that SQLite keeps the scraped values
+    exactly as they were (e.g. prices stay strings), and orders read back have the same keys
+    as the orders saved.
+    """
+
+    def __init__(self, db_file):
+        """
+        Initialize the store. The database is opened on first use.
+
+        Parameters:
+            db_file (str): Path of the SQLite database.
+        """
+        self.db_file = db_file
+        self.logger = logging.getLogger(__name__)
+        self.connection = None
+        self.index = None  # order_number -> HistoryIndexEntry, with the position of the order
+
+    def connect(self):
+        """
+        Return the database connection, creating the tables and indexes on first use.
+
+        Returns:
+            sqlite3.Connection: The open connection.
+        """
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_file)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(f"""
+                CREATE TABLE IF NOT EXISTS orders (
+                    order_number TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL,
+                    {', '.join(ORDER_COLUMNS)},
+                    fields INTEGER,
+                    has_details INTEGER NOT NULL DEFAULT 0,
+                    extra TEXT
+                );
+                CREATE TABLE IF NOT EXISTS order_lines (
+                    order_number TEXT NOT NULL REFERENCES orders (order_number),
+                    line_number INTEGER NOT NULL,
+                    product_name TEXT NOT NULL,
+                    {', '.join(LINE_COLUMNS)},
+                    fields INTEGER,
+                    extra TEXT,
+                    PRIMARY KEY (order_number, line_number)
+                );
+                -- order_number is indexed by the primary keys
+                CREATE INDEX IF NOT EXISTS orders_status ON orders (status);
+                CREATE INDEX IF NOT EXISTS orders_date ON orders (date);
+                CREATE INDEX IF NOT EXISTS orders_position ON orders (position);
+            """)
+            for table in ('orders', 'order_lines'):
+                # Databases created before the presence masks; their rows keep every column
+                if 'fields' not in {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN fields INTEGER")
+        return self.connection
+
+    def exists(self):
+        """Return whether an order history has been saved."""
+        if not os.path.exists(self.db_file):
+            return False
+        return self.connect().execute("SELECT EXISTS (SELECT 1 FROM orders)").fetchone()[0] == 1
+
+    def version(self):
+        """Return a version of the history, changing whenever it is saved (including to the WAL)."""
+        return f"sqlite:{file_version(self.db_file, f'{self.db_file}-wal')}"
+
+    @staticmethod
+    def fields_mask(columns, record):
+        """Return the presence mask of the columns in an order or line."""
+        return sum(1 << bit for bit, column in enumerate(columns) if column in record)
+
+    @staticmethod
+    def present_columns(columns, values, fields):
+        """Yield the (column, value) pairs present according to a presence mask; all of them without a mask."""
+        for bit, (column, value) in enumerate(zip(columns, values)):
+            if fields is None or fields >> bit & 1:
+                yield column, value
+
+    @staticmethod
+    def build_order(row):
+        """Build an order dictionary from an orders row (order_number, columns, fields, has_details, extra)."""
+        order = {'order_number': row[0]}
+        order.update(SqliteHistoryStore.present_columns(ORDER_COLUMNS, row[1:1 + len(ORDER_COLUMNS)], row[-3]))
+        if row[-1]:
+            order.update(json.loads(row[-1]))
+        if row[-2]:
+            order['details'] = {}
+        return order
+
+    @staticmethod
+    def build_line(row):
+        """Build an order line dictionary from an order_lines row (columns, fields, extra)."""
+        line = dict(SqliteHistoryStore.present_columns(LINE_COLUMNS, row[:len(LINE_COLUMNS)], row[-2]))
+        if row[-1]:
+            line.update(json.loads(row[-1]))
+        return line
+
+    def iter_orders(self):
+        """
+        Stream the orders of the history with their lines.
+
+        Yields:
+            dict: The orders, newest first.
+        """
+        if not os.path.exists(self.db_file):
+            return
+
+        connection = self.connect()
+        orders = connection.execute(
+            f"SELECT order_number, {', '.join(ORDER_COLUMNS)}, fields, has_details, extra FROM orders ORDER BY position DESC"
+        )
+        # Lines are read in the same order as the orders, so both cursors are merged in one pass
+        lines = connection.execute(
+            f"SELECT l.order_number, l.product_name, {', '.join('l.' + column for column in LINE_COLUMNS)}, l.fields, l.extra "
+            "FROM order_lines l JOIN orders o ON o.order_number = l.order_number "
+            "ORDER BY o.position DESC, l.line_number"
+        )
+        line_groups = itertools.groupby(lines, key=lambda row: row[0])
+        next_group = next(line_groups, None)
+
+        for row in orders:
+            order = self.build_order(row)
+            if next_group is not None and next_group[0] == order['order_number']:
+                order['details'] = {line[1]: self.build_line(line[2:]) for line in next_group[1]}
+                next_group = next(line_groups, None)
+            yield order
+
+    def load_index(self):
+        """
+        Load the status of every order, without their lines.
+
+        Returns:
+            dict: Map of order_number -> HistoryIndexEntry, newest orders first.
+        """
+        self.index = {}
+        if not os.path.exists(self.db_file):
+            return self.index
+
+        rows = self.connect().execute(
+            "SELECT order_number, status, processing_status, position FROM orders ORDER BY position DESC"
+        )
+        for order_number, status, processing_status, position in rows:
+            self.index[order_number] = index_entry(status, processing_status, position)
+        return self.index
+
+    def load(self):
+        """
+        Load the order history index.
+
+        Returns:
+            LazyOrderHistory: Map of order_number -> order, reading an order when it is accessed.
+        """
+        self.load_index()
+        return LazyOrderHistory(self)
+
+    def order_numbers(self):
+        """Iterate over the indexed order numbers, newest first."""
+        return iter(self.index)
+
+    def get_order(self, order_number):
+        """
+        Load a single order with its lines.
+
+        Parameters:
+            order_number (str): The order number.
+
+        Returns:
+            dict: The order, or None if it is not in the history.
+        """
+        connection = self.connect()
+        row = connection.execute(
+            f"SELECT order_number, {', '.join(ORDER_COLUMNS)}, fields, has_details, extra FROM orders WHERE order_number = ?",
+            (order_number,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        order = self.build_order(row)
+        lines = connection.execute(
+            f"SELECT product_name, {', '.join(LINE_COLUMNS)}, fields, extra FROM order_lines "
+            "WHERE order_number = ? ORDER BY line_number",
+            (order_number,)
+        ).fetchall()
+        if lines:
+            order['details'] = {line[0]: self.build_line(line[1:]) for line in lines}
+        return order
+
+    def save(self, orders):
+        """
+        Upsert new and updated orders in a single transaction. Fields missing from an order,
+        including its extra fields, keep their stored value, and its lines are only replaced
+        when it has details.
+
+        Parameters:
+            orders (list): The new and updated orders, newest first.
+        """
+        connection = self.connect()
+        with connection:
+            next_position = connection.execute("SELECT COALESCE(MAX(position), 0) + 1 FROM orders").fetchone()[0]
+
+            # Positions grow with age reversed, so that new orders are listed first like in the JSON history
+            for offset, order in enumerate(reversed(orders)):
+                columns = [column for column in ORDER_COLUMNS if column in order]
+                values = [order[column] for column in columns]
+                extra = {
+                    key: value for key, value in order.items()
+                    if key not in ORDER_COLUMNS and key not in ('order_number', 'details')
+                }
+                if extra:
+                    stored = connection.execute(
+                        "SELECT extra FROM orders WHERE order_number = ?", (order['order_number'],)
+                    ).fetchone()
+                    if stored and stored[0]:
+                        extra = {**json.loads(stored[0]), **extra}
+                    columns.append('extra')
+                    values.append(json.dumps(extra, ensure_ascii=False))
+
+                has_details = 'details' in order
+                assignments = [f"{column} = excluded.{column}" for column in columns]
+                # A stored order without a mask has every column, which the union keeps (NULL)
+                assignments.append("fields = orders.fields | excluded.fields")
+                if has_details:
+                    assignments.append("has_details = 1")
+                connection.execute(
+                    f"INSERT INTO orders (order_number, position, fields, has_details"
+                    f"{''.join(', ' + c for c in columns)}) "
+                    f"VALUES (?, ?, ?, ?{', ?' * len(columns)}) "
+                    f"ON CONFLICT (order_number) DO UPDATE SET {', '.join(assignments)}",
+                    [order['order_number'], next_position + offset, self.fields_mask(ORDER_COLUMNS, order),
+                     int(has_details), *values]
+                )
+
+                if has_details:
+                    connection.execute("DELETE FROM order_lines WHERE order_number = ?", (order['order_number'],))
+                    connection.executemany(
+                        f"INSERT INTO order_lines (order_number, line_number, product_name, "
+                        f"{', '.join(LINE_COLUMNS)}, fields, extra) VALUES (?, ?, ?{', ?' * len(LINE_COLUMNS)}, ?, ?)",
+                        [
+                            (
+                                order['order_number'], line_number, product_name,
+                                *(line.get(column) for column in LINE_COLUMNS),
+                                self.fields_mask(LINE_COLUMNS, line),
+                                json.dumps({k: v for k, v in line.items() if k not in LINE_COLUMNS}, ensure_ascii=False)
+                                if set(line) - set(LINE_COLUMNS) else None
+                            )
+                            for line_number, (product_name, line) in enumerate(order['details'].items())
+                        ]
+                    )
+
+        if self.index is not None:
+            self.update_index(orders, next_position)
+
+    def update_index(self, orders, next_position):
+        """
+        Update the loaded index after a save, so that the history does not have to be re-read.
+
+        Parameters:
+            orders (list): The saved orders, newest first.
+            next_position (int): The position given to the oldest new order.
+        """
+        new_entries = {}
+        for offset, order in enumerate(reversed(orders)):
+            order_number = order['order_number']
+            entry = self.index.get(order_number)
+            if entry is not None:
+                self.index[order_number] = index_entry(
+                    order.get('status', entry.status), order.get('processing_status', entry.processing_status),
+                    entry.offset
+                )
+            else:
+                new_entries[order_number] = index_entry(
+                    order.get('status'), order.get('processing_status'), next_position + offset
+                )
+        if new_entries:
+            # New orders are listed first, newest first
+            self.index = {**dict(reversed(new_entries.items())), **self.index}
+
+    def close(self):
+        """Close the database connection."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from app.services.stock_update_pipeline import StockUpdatePipeline
+
+
+class StockOutbox:
+    """
+    Durable outbox of Grocy stock additions, backed by a SQLite table.
+
+    Every intended stock addition is recorded under an idempotency key (order number and
+    order line) before it is sent, so that additions survive Grocy outages and restarts,
+    and replaying an order never queues the same line twice. A flusher drains the due
+    additions in batches and retries failed ones with exponential backoff. Delivery is
+    at least once: an addition whose response was lost is sent again.
+    """
+
+    def __init__(self, grocy_service, db_file, batch_size=50, max_attempts=10, retry_delay=30.0,
+                 max_retry_delay=3600.0, concurrency=4, rate_limit=0):
+        """
+        Initialize the outbox. The database is opened on first use.
+
+        Parameters:
+            grocy_service (GrocyService): The Grocy client used to add products to the stock.
+            db_file (str): Path of the SQLite database holding the outbox.
+            batch_size (int): Maximum number of additions sent per batch.
+            max_attempts (int): Number of attempts after which an addition is marked as failed.
+            retry_delay (float): Delay in seconds before the first retry, doubled on every attempt.
+            max_retry_delay (float): Upper bound of the retry delay in seconds.
+            concurrency (int): Maximum number of stock additions in flight.
+            rate_limit (float): Maximum number of stock additions started per second (0 for no limit).
+        """
+        self.grocy_service = grocy_service
+        self.db_file = db_file
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.logger = logging.getLogger(__name__)
+
+        self.connection = None
+        self.flush_lock = None  # Created inside the event loop, serializes flushes
+        self.wake_event = None  # Set to flush before the next interval elapses
+
+    def connect(self):
+        """
+        Return the database connection, creating the outbox table on first use.
+
+        Returns:
+            sqlite3.Connection: The open connection.
+        """
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_file)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS stock_outbox (
+                    idempotency_key TEXT PRIMARY KEY,
+                    product_id INTEGER NOT NULL,
+                    amount REAL NOT NULL,
+                    location_id INTEGER NOT NULL,
+                    price REAL NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    completed_at REAL
+                )
+            """)
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS stock_outbox_due ON stock_outbox (status, next_attempt_at)"
+            )
+            self.connection.commit()
+        return self.connection
+
+    def close(self):
+        """Close the database connection."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    @staticmethod
+    def idempotency_key(order_number, line):
+        """
+        Build the idempotency key of an order line.
+
+        Parameters:
+            order_number (str): The order number.
+            line (str): The order line, i.e. the product name from the order.
+
+        Returns:
+            str: The key identifying the stock addition of that line.
+        """
+        return f"{order_number}:{line}"
+
+    def enqueue(self, additions):
+        """
+        Record stock additions in a single transaction. Additions whose key is already known,
+        whatever their status, are ignored.
+
+        Parameters:
+            additions (list): (idempotency key, product ID, amount, location ID, price) tuples.
+
+        Returns:
+            int: The number of additions newly recorded.
+        """
+        now = time.time()
+        connection = self.connect()
+        with connection:
+            cursor = connection.executemany(
+                "INSERT OR IGNORE INTO stock_outbox "
+                "(idempotency_key, product_id, amount, location_id, price, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(key, product_id, amount, location_id, price, now, now)
+                 for key, product_id, amount, location_id, price in additions]
+            )
+        recorded = cursor.rowcount
+        if recorded < len(additions):
+            self.logger.info(f"Skipped {len(additions) - recorded} stock additions already in the outbox.")
+        return recorded
+
+    def depth(self):
+        """Return the number of stock additions waiting to be sent, including those waiting for a retry."""
+        return self.connect().execute("SELECT COUNT(*) FROM stock_outbox WHERE status = 'pending'").fetchone()[0]
+
+    def due(self, limit):
+        """Return up to limit pending additions whose next attempt is due, oldest first."""
+        return self.connect().execute(
+            "SELECT idempotency_key, product_id, amount, location_id, price, attempts FROM stock_outbox "
+            "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY created_at LIMIT ?",
+            (time.time(), limit)
+        ).fetchall()
+
+    def record_results(self, batch, results):
+        """
+        Mark the sent additions as done, or schedule their retry with exponential backoff.
+
+        Parameters:
+            batch (list): The rows returned by due().
+            results (dict): Map of idempotency key -> result from StockUpdatePipeline.finish().
+
+        Returns:
+            int: The number of additions that failed.
+        """
+        now = time.time()
+        failed = 0
+        connection = self.connect()
+        with connection:
+            for key, product_id, _, _, _, attempts in batch:
+                result = results.get(key, {'status': 'failed', 'error': 'No result'})
+                if result['status'] == 'success':
+                    connection.execute(
+                        "UPDATE stock_outbox SET status = 'done', attempts = ?, completed_at = ?, last_error = NULL "
+                        "WHERE idempotency_key = ?",
+                        (attempts + 1, now, key)
+                    )
+                    continue
+
+                failed += 1
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    self.logger.error(f"Giving up adding product {product_id} to stock ({key}) "
+                                      f"after {attempts} attempts: {result.get('error')}")
+                    status, next_attempt_at = 'failed', now
+                else:
+                    status = 'pending'
+                    next_attempt_at = now + min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+                connection.execute(
+                    "UPDATE stock_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? "
+                    "WHERE idempotency_key = ?",
+                    (status, attempts, next_attempt_at, result.get('error'), key)
+                )
+        return failed
+
+    async def flush(self):
+        """
+        Send every due stock addition to Grocy, batch by batch.
+
+        Returns:
+            int: The number of additions sent successfully.
+        """
+        if self.flush_lock is None:
+            self.flush_lock = asyncio.Lock()
+
+        sent = 0
+        async with self.flush_lock:
+            while True:
+                batch = self.due(self.batch_size)
+                if not batch:
+                    break
+
+                pipeline = StockUpdatePipeline(self.grocy_service, self.concurrency, self.rate_limit)
+                pipeline.start()
+                for key, product_id, amount, location_id, price, _ in batch:
+                    pipeline.submit(key, product_id, amount, location_id, price)
+                failed = self.record_results(batch, await pipeline.finish())
+                sent += len(batch) - failed
+
+                if failed == len(batch):
+                    break  # Grocy is most likely unreachable, wait for the retries to become due
+
+        self.logger.info(f"Stock outbox flushed: {sent} additions sent, {self.depth()} pending.")
+        return sent
+
+    def notify(self):
+        """Wake the flusher up so that newly queued additions are sent without waiting for the interval."""
+        if self.wake_event is not None:
+            self.wake_event.set()
+
+    async def run(self, interval):
+        """
+        Flush the outbox every interval seconds, or sooner when notified, until cancelled.
+
+        Parameters:
+            interval (float): Number of seconds between two flushes.
+        """
+        self.wake_event = asyncio.Event()
+        while True:
+            try:
+                await self.flush()
+            except Exception as e:
+                self.logger.error(f"An error occurred while flushing the stock outbox: {e}")
+
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wake_event.clear()
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+
+
+class StockUpdatePipeline:
+    def __init__(self, grocy_service, concurrency=4, rate_limit=0):
+        """
+        Initialize a pipeline pushing stock additions to Grocy with a bounded number of
+        requests in flight and an optional rate limit.
+
+        Parameters:
+            grocy_service (GrocyService): The Grocy client used to add products to the stock.
+            concurrency (int): Maximum number of stock additions in flight.
+            rate_limit (float): Maximum number of stock additions started per second (0 for no limit).
+        """
+        self.grocy_service = grocy_service
+        self.concurrency = max(1, concurrency)
+        self.min_interval = 1 / rate_limit if rate_limit > 0 else 0
+        self.logger = logging.getLogger(__name__)
+
+        self.queue = None
+        self.workers = []
+        self.results = {}  # key -> per-line outcome
+        self.next_start = 0.0  # Earliest monotonic time at which the next request may start
+        self.rate_lock = None
+
+    def start(self):
+        """Start the worker tasks consuming the queue."""
+        self.queue = asyncio.Queue()
+        self.rate_lock = asyncio.Lock()
+        self.results = {}
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+
+    def submit(self, key, product_id, amount, location_id, price):
+        """
+        Queue a stock addition.
+
+        Parameters:
+            key (str): Identifier of the line the result is reported under (e.g. the order product name).
+            product_id (int): The ID of the product to add to the stock.
+            amount (float): The quantity to add to the stock.
+            location_id (int): The location ID where the product is stored.
+            price (float): The price of the product.
+        """
+        self.queue.put_nowait((key, product_id, amount, location_id, price))
+
+    async def finish(self):
+        """
+        Wait for every queued stock addition and stop the workers.
+
+        Returns:
+            dict: Map of key -> {'status': 'success' | 'failed', ...} for every submitted line.
+        """
+        await self.queue.join()
+        await self.stop()
+
+        failed = sum(1 for result in self.results.values() if result['status'] == 'failed')
+        self.logger.info(f"Stock updates completed: {len(self.results) - failed} succeeded, {failed} failed.")
+        return self.results
+
+    async def stop(self):
+        """
+        Cancel the worker tasks and wait for them to exit. Stock additions still queued are
+        dropped, so finish() must be awaited to push them all.
+        """
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def wait_for_rate_limit(self):
+        """Sleep until the rate limit allows another request to start."""
+        if not self.min_interval:
+            return
+        async with self.rate_lock:
+            now = time.monotonic()
+            delay = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.min_interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def worker(self):
+        """Consume queued stock additions until cancelled."""
+        while True:
+            key, product_id, amount, location_id, price = await self.queue.get()
+            try:
+                await self.wait_for_rate_limit()
+                response = await self.grocy_service.add_to_stock(product_id, amount, location_id, price)
+                if response is None:
+                    self.logger.error(f"Failed to add product {product_id} to stock.")
+                    self.results[key] = {'status': 'failed', 'error': 'Grocy API request failed'}
+                else:
+                    self.results[key] = {'status': 'success'}
+            except Exception as e:
+                self.logger.error(f"Failed to add product {product_id} to stock: {e}")
+                self.results[key] = {'status': 'failed', 'error': str(e)}
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,185 @@
+"""
+Benchmark of the extraction of the order history and order details tables: one browser
+round trip per cell (the former strategy) against one $$eval per table, and, for the order
+details, parsing the static HTML without a browser (DETAIL_FETCH_MODE=http).
+
+Runs offline in a headless Chromium on saved HTML pages: by default the anonymized order
+history and order details pages of benchmarks/fixtures, or pages given with --history-page
+and --details-page. --synthetic generates tables of any size instead:
+
+    python -m benchmarks.extraction_benchmark --output extraction_results.json
+    python -m benchmarks.extraction_benchmark --details-page saved_order.html --repeat 10
+    python -m benchmarks.extraction_benchmark --synthetic --order-lines 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from playwright.async_api import async_playwright
+from app.helpers.order_page_extraction import OrderPageExtraction, ORDER_PRODUCTS_SELECTOR, ORDER_ROWS_SELECTOR
+from app.helpers.utils import Utils
+from benchmarks.reporting import report_meta, write_report
+from benchmarks.synthetic_data import (
+    generate_catalog, generate_order, render_order_details_page, render_order_history_page
+)
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(__file__), 'fixtures')
+DEFAULT_HISTORY_PAGE = os.path.join(FIXTURES_DIRECTORY, 'order_history.html')
+DEFAULT_DETAILS_PAGE = os.path.join(FIXTURES_DIRECTORY, 'order_details.html')
+DEFAULT_HISTORY_ORDERS = 50
+DEFAULT_ORDER_LINES = 100
+
+
+async def extract_orders_per_element(page):
+    """Extract the order history table with one round trip per cell, like the former scraper."""
+    orders = []
+    for row in await page.query_selector_all(ORDER_ROWS_SELECTOR):
+        elements = [await row.query_selector(selector) for selector in (
+            "td:nth-child(1)", "th[scope='row']", "td:nth-child(3)", "td:nth-child(4)", "td:nth-child(5)",
+            "td:nth-child(6)", "td:nth-child(7) span"
+        )]
+        link_element = await row.query_selector("a[data-link-action='view-order-details']")
+        texts = [await element.text_content() if element else None for element in elements]
+        details_link = await link_element.get_attribute("href") if link_element else None
+        order_number, reference, date, total_price, pickup_point, payment_method, status = texts
+        if order_number and order_number.isnumeric() and status:
+            orders.append({
+                "order_number": order_number,
+                "reference": reference,
+                "date": Utils.clean_dates(date),
+                "total_price": Utils.clean_price(total_price),
+                "pickup_point": pickup_point,
+                "payment_method": payment_method,
+                "status": Utils.clean_string(status),
+                "details_link": details_link
+            })
+    return orders
+
+
+async def extract_order_details_per_element(page):
+    """Extract the order details table with one round trip per cell, like the former scraper."""
+    rows = []
+    for product in await page.query_selector_all(ORDER_PRODUCTS_SELECTOR):
+        category_element = await product.query_selector("td > span")
+        if category_element:
+            rows.append({"category": await category_element.text_content()})
+            continue
+        row = {}
+        for field, selector in (
+                ("name", ".manufacturer-name"), ("description", "strong > a"), ("quantity", "td:nth-child(2)"),
+                ("unit_price", "td:nth-child(3)"), ("total_price", "td:nth-child(4)"),
+                ("discount", ".ri-block.product-line-discount span"),
+                ("cagnotte", ".cagnotte-block.product-line-discount span")):
+            element = await product.query_selector(selector)
+            row[field] = await element.text_content() if element else ""
+        rows.append(row)
+    return OrderPageExtraction.build_order_details(rows)
+
+
+async def extract_order_details_html(page):
+    """Parse the order details table from the HTML of the page, without querying the browser."""
+    return OrderPageExtraction.parse_order_details_html(await page.content())
+
+
+async def timed(function, repeat):
+    """
+    Time an asynchronous function.
+
+    Parameters:
+        function (callable): Coroutine function to benchmark.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        tuple: The result of the last run and the mean and min duration in seconds.
+    """
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await function()
+        durations.append(time.perf_counter() - start)
+    return result, {"mean_s": statistics.mean(durations), "min_s": min(durations), "repeat": repeat}
+
+
+async def benchmark_page(page, content, table, strategies, repeat):
+    """
+    Benchmark every extraction strategy on one page and check that they extract the same data.
+
+    Returns:
+        list: The result records.
+    """
+    await page.set_content(content)
+    results = []
+    extracted = {}
+    for strategy, function in strategies.items():
+        extracted[strategy], timing = await timed(lambda: function(page), repeat)
+        results.append({"benchmark": table, "strategy": strategy, "rows": len(extracted[strategy]), **timing})
+    for strategy, result in extracted.items():
+        if result != extracted["per_element"]:
+            raise AssertionError(f"The {strategy} extraction of the {table} table differs from the per-element "
+                                 f"extraction.")
+    return results
+
+
+def read_page(path):
+    """Read a saved HTML page."""
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+async def run(args):
+    if args.synthetic:
+        products = generate_catalog(1000)
+        orders = [generate_order(products, 5, order_number=1000 + i) for i in range(args.history_orders)]
+        history_page = render_order_history_page(orders)
+        details_page = render_order_details_page(generate_order(products, args.order_lines, order_number=1))
+    else:
+        history_page = read_page(args.history_page)
+        details_page = read_page(args.details_page)
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        page = await browser.new_page()
+        results = await benchmark_page(page, history_page, "order_history", {
+            "per_element": extract_orders_per_element, "bulk": OrderPageExtraction.extract_orders
+        }, args.repeat)
+        results += await benchmark_page(page, details_page, "order_details", {
+            "per_element": extract_order_details_per_element, "bulk": OrderPageExtraction.extract_order_details,
+            "html_parser": extract_order_details_html
+        }, args.repeat)
+        await browser.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extraction of the Auchan Drive order tables.')
+    parser.add_argument('--history-page', type=str, default=DEFAULT_HISTORY_PAGE,
+                        help='Saved order history page (HTML); the anonymized fixture by default.')
+    parser.add_argument('--details-page', type=str, default=DEFAULT_DETAILS_PAGE,
+                        help='Saved order details page (HTML); the anonymized fixture by default.')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='Benchmark generated pages of the sizes below instead of saved pages.')
+    parser.add_argument('--history-orders', type=int, default=DEFAULT_HISTORY_ORDERS,
+                        help='Number of orders of the synthetic order history page.')
+    parser.add_argument('--order-lines', type=int, default=DEFAULT_ORDER_LINES,
+                        help='Number of lines of the synthetic order details page.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs per benchmark.')
+    parser.add_argument('--output', type=str, default='extraction_benchmark.json', help='Results file.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    results = asyncio.run(run(args))
+    for result in results:
+        print(f"{result['benchmark']:<14} {result['strategy']:<12} rows={result['rows']:<5} "
+              f"{result['mean_s'] * 1000:10.1f} ms")
+
+    pages = ({"synthetic": True, "history_orders": args.history_orders, "order_lines": args.order_lines}
+             if args.synthetic else {"history_page": args.history_page, "details_page": args.details_page})
+    write_report(args.output, {"meta": report_meta(**pages), "results": results})
+
+
+if __name__ == '__main__':
+    main()
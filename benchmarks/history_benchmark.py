@@ -0,0 +1,154 @@
+"""
+Benchmark of the order history persistence: load and save time and file size of the JSON
+history for each format and compression, against synthetic histories.
+
+Runs fully offline in a temporary directory and writes machine-readable results:
+
+    python -m benchmarks.history_benchmark --output history_results.json
+    python -m benchmarks.history_benchmark --history-sizes 1000 10000 --order-lines 20
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from app.helpers import history_serializer
+from app.helpers.history_serializer import HistorySerializer
+from app.services.history_store import JsonHistoryStore
+from benchmarks.reporting import report_meta, write_report
+from benchmarks.synthetic_data import generate_catalog, generate_order
+
+DEFAULT_HISTORY_SIZES = [1000, 10000, 50000]
+DEFAULT_ORDER_LINES = 20
+CHANGED_ORDERS = 10  # New and updated orders of a typical scraping run
+
+# (format, compression) pairs benchmarked; zstd is skipped when zstandard is not installed
+VARIANTS = [('indent', 'none'), ('compact', 'none'), ('indent', 'gzip'), ('compact', 'gzip'), ('compact', 'zstd')]
+
+
+def timed(function, repeat):
+    """
+    Time a function.
+
+    Parameters:
+        function (callable): The function to benchmark.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The mean and min duration in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {"mean_s": statistics.mean(durations), "min_s": min(durations), "repeat": repeat}
+
+
+def generate_history(size, order_lines):
+    """Generate a synthetic order history, newest orders first."""
+    products = generate_catalog(1000)
+    return [generate_order(products, order_lines, order_number=size - i) for i in range(size)]
+
+
+def benchmark_legacy(directory, orders, repeat):
+    """
+    Benchmark the former persistence, loading and dumping the whole history with the standard library.
+
+    Returns:
+        list: The result records.
+    """
+    history_file = os.path.join(directory, "legacy.json")
+
+    def save():
+        with open(history_file, 'w', encoding='utf-8') as file:
+            json.dump(orders, file, ensure_ascii=False, indent=4)
+
+    def load():
+        with open(history_file, 'r', encoding='utf-8') as file:
+            json.load(file)
+
+    common = {"variant": "legacy json.dump", "history_size": len(orders)}
+    results = [{"benchmark": "save_full", **common, **timed(save, repeat)}]
+    results.append({"benchmark": "load", **common, **timed(load, repeat), "file_bytes": os.path.getsize(history_file)})
+    return results
+
+
+def benchmark_variant(directory, orders, history_format, compression, repeat):
+    """
+    Benchmark one format and compression of the JSON history store: writing the whole
+    history, loading its index, reading an order and saving the changes of a run.
+
+    Returns:
+        list: The result records.
+    """
+    serializer = HistorySerializer(history_format, compression)
+    history_file = os.path.join(directory, f"history_{history_format}_{compression}.json")
+    common = {"variant": f"{history_format}/{compression}", "history_size": len(orders)}
+
+    def save_full():
+        if os.path.exists(history_file):
+            os.remove(history_file)
+        JsonHistoryStore(history_file, serializer).save(orders)
+
+    results = [{"benchmark": "save_full", **common, **timed(save_full, repeat)}]
+
+    store = JsonHistoryStore(history_file, serializer)
+    results.append({"benchmark": "load", **common, **timed(store.load_index, repeat),
+                    "file_bytes": os.path.getsize(history_file)})
+
+    oldest = orders[-1]['order_number']
+    results.append({"benchmark": "get_oldest_order", **common, **timed(lambda: store.get_order(oldest), repeat)})
+
+    # A scraping run: a few new orders and a few status updates; every save adds new order numbers
+    runs = iter(range(repeat))
+
+    def save_delta():
+        run = next(runs)
+        new_orders = [dict(orders[0], order_number=f"new-{run}-{i}") for i in range(CHANGED_ORDERS // 2)]
+        updates = [{'order_number': order['order_number'], 'status': "annulé"}
+                   for order in orders[run * CHANGED_ORDERS:run * CHANGED_ORDERS + CHANGED_ORDERS // 2]]
+        store.save(new_orders + updates)
+
+    results.append({"benchmark": "save_delta", **common, **timed(save_delta, repeat)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the order history persistence against synthetic data.')
+    parser.add_argument('--history-sizes', type=int, nargs='+', default=DEFAULT_HISTORY_SIZES,
+                        help='Number of orders of the benchmarked histories.')
+    parser.add_argument('--order-lines', type=int, default=DEFAULT_ORDER_LINES, help='Number of lines per order.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs per benchmark.')
+    parser.add_argument('--output', type=str, default='history_benchmark.json', help='Results file.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    variants = [(history_format, compression) for history_format, compression in VARIANTS
+                if compression != 'zstd' or history_serializer.zstandard is not None]
+    results = []
+    for history_size in args.history_sizes:
+        print(f"Benchmarking history of {history_size} orders...")
+        orders = generate_history(history_size, args.order_lines)
+        with tempfile.TemporaryDirectory() as directory:
+            results.extend(benchmark_legacy(directory, orders, args.repeat))
+            for history_format, compression in variants:
+                results.extend(benchmark_variant(directory, orders, history_format, compression, args.repeat))
+
+    for result in results:
+        size = f"{result['file_bytes'] / 2 ** 20:.1f} MiB" if "file_bytes" in result else ""
+        print(f"{result['benchmark']:<18} {result['variant']:<18} orders={result['history_size']:<7} "
+              f"{result['mean_s'] * 1000:10.1f} ms {size}")
+
+    report = {
+        "meta": report_meta(orjson=history_serializer.orjson is not None, order_lines=args.order_lines),
+        "results": results
+    }
+    write_report(args.output, report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark of the product matching against synthetic catalogs and orders.
+
+Runs fully offline with a stubbed GrocyService and writes machine-readable results that can
+be compared between commits:
+
+    python -m benchmarks.matching_benchmark --output results.json
+    python -m benchmarks.matching_benchmark --output new.json --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from app.config.config import Config
+from app.helpers.matching_utils import MatchingUtils, CatalogIndex
+from app.services.inventory_service import InventoryService
+from benchmarks.reporting import report_meta, write_report
+from benchmarks.synthetic_data import generate_catalog, generate_order, StubGrocyService
+
+DEFAULT_CATALOG_SIZES = [1000, 10000, 100000]
+DEFAULT_ORDER_SIZES = [10, 100, 500]
+
+# Event loop driving the asynchronous InventoryService, reused by every benchmark
+_loop = asyncio.new_event_loop()
+
+
+def measure(function, repeat):
+    """
+    Time a function and record its peak memory allocation. The memory peak is taken from a
+    separate traced run, since tracing allocations slows the timed runs down.
+
+    Parameters:
+        function (callable): The function to benchmark.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The mean, min and max duration in seconds and the peak traced memory in bytes.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mean_s": statistics.mean(durations),
+        "min_s": min(durations),
+        "max_s": max(durations),
+        "peak_bytes": peak,
+        "repeat": repeat
+    }
+
+
+def build_inventory_service(products):
+    """Create an InventoryService wired to a stub Grocy service, with stock updates and the match cache disabled."""
+    config = Config()
+    config.live_stock_update = False
+    config.match_cache_file = None
+    inventory_service = InventoryService()
+    inventory_service.grocy_service = StubGrocyService(products)
+    return inventory_service
+
+
+def benchmark_catalog(catalog_size, order_sizes, repeat):
+    """
+    Run every benchmark against one catalog size.
+
+    Returns:
+        list: The result records.
+    """
+    products = generate_catalog(catalog_size)
+    queries = list(generate_order(products, 50, order_number=0)['details'].keys())
+    results = []
+
+    # Legacy one-shot API, rebuilding the index on every call; only a few calls on large catalogs
+    one_shot_queries = queries[:max(1, 50_000 // catalog_size)]
+    result = measure(lambda: [MatchingUtils.get_best_match(query, products) for query in one_shot_queries], 1)
+    results.append({"benchmark": "get_best_match_one_shot", "catalog_size": catalog_size,
+                    "queries": len(one_shot_queries), **per_query(result, len(one_shot_queries))})
+
+    result = measure(lambda: CatalogIndex(products), 1)
+    results.append({"benchmark": "catalog_index_build", "catalog_size": catalog_size, **result})
+
+    catalog_index = CatalogIndex(products)
+    result = measure(lambda: [catalog_index.get_best_match(query) for query in queries], repeat)
+    results.append({"benchmark": "catalog_index_get_best_match", "catalog_size": catalog_size,
+                    "queries": len(queries), **per_query(result, len(queries))})
+
+    for order_size in order_sizes:
+        order = generate_order(products, order_size, order_number=order_size)
+
+        # Cold run: includes building the catalog index and the matcher pipeline
+        result = measure(lambda: _loop.run_until_complete(build_inventory_service(products).process_order(order)), 1)
+        results.append({"benchmark": "process_order_cold", "catalog_size": catalog_size,
+                        "order_lines": order_size, **result})
+
+        inventory_service = build_inventory_service(products)
+        _loop.run_until_complete(inventory_service.process_order(order))
+        result = measure(lambda: _loop.run_until_complete(inventory_service.process_order(order)), repeat)
+        results.append({"benchmark": "process_order_warm", "catalog_size": catalog_size,
+                        "order_lines": order_size, **result})
+
+    return results
+
+
+def per_query(result, queries):
+    """Add the mean duration per query to a result."""
+    return {**result, "mean_per_query_s": result["mean_s"] / queries}
+
+
+def result_key(result):
+    """Identify a benchmark record independently of its measurements."""
+    return (result["benchmark"], result["catalog_size"], result.get("order_lines"))
+
+
+def compare(results, baseline_file):
+    """
+    Print the ratio of every mean duration and memory peak to a baseline results file.
+
+    Returns:
+        list: The comparison records.
+    """
+    with open(baseline_file, 'r', encoding='utf-8') as file:
+        baseline = {result_key(result): result for result in json.load(file)["results"]}
+
+    comparisons = []
+    for result in results:
+        reference = baseline.get(result_key(result))
+        if not reference:
+            continue
+        comparison = {
+            "benchmark": result["benchmark"],
+            "catalog_size": result["catalog_size"],
+            "order_lines": result.get("order_lines"),
+            "time_ratio": result["mean_s"] / reference["mean_s"] if reference["mean_s"] else None,
+            "memory_ratio": result["peak_bytes"] / reference["peak_bytes"] if reference["peak_bytes"] else None
+        }
+        comparisons.append(comparison)
+        print(f"{comparison['benchmark']:<32} catalog={comparison['catalog_size']:<7} "
+              f"lines={comparison['order_lines'] or '-':<4} time x{comparison['time_ratio'] or 0:.2f} "
+              f"memory x{comparison['memory_ratio'] or 0:.2f}")
+    return comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the product matching against synthetic data.')
+    parser.add_argument('--catalog-sizes', type=int, nargs='+', default=DEFAULT_CATALOG_SIZES,
+                        help='Catalog sizes to benchmark.')
+    parser.add_argument('--order-sizes', type=int, nargs='+', default=DEFAULT_ORDER_SIZES,
+                        help='Order sizes (number of lines) to benchmark.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs per warm benchmark.')
+    parser.add_argument('--output', type=str, default='matching_benchmark.json', help='Results file.')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline results file to compare with.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    results = []
+    for catalog_size in args.catalog_sizes:
+        print(f"Benchmarking catalog of {catalog_size} products...")
+        results.extend(benchmark_catalog(catalog_size, args.order_sizes, args.repeat))
+
+    report = {
+        "meta": report_meta(),
+        "results": results
+    }
+    if args.compare:
+        report["comparison"] = compare(results, args.compare)
+
+    write_report(args.output, report)
+
+
+if __name__ == '__main__':
+    main()
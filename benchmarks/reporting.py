@@ -0,0 +1,47 @@
+"""Results reports shared by the benchmarks, so that runs on two commits can be compared."""
+import json
+import platform
+import subprocess
+import time
+
+
+def git_revision():
+    """Return the current git commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_meta(**extra):
+    """
+    Describe the environment of a benchmark run.
+
+    Parameters:
+        extra: Benchmark-specific settings recorded with the run.
+
+    Returns:
+        dict: The git revision, Python version, machine, the extra settings and a timestamp.
+    """
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        **extra,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+
+def write_report(output_file, report):
+    """
+    Write a benchmark report as JSON.
+
+    Parameters:
+        output_file (str): Path of the results file.
+        report (dict): The report, with its 'meta' and 'results'.
+    """
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=4)
+    print(f"Results written to {output_file}")
@@ -0,0 +1,215 @@
+import html
+import random
+
+# Vocabulary used to generate French-grocery-style product names
+PRODUCT_TYPES = [
+    "Lait demi-écrémé", "Lait entier", "Yaourt nature", "Yaourt aux fruits", "Fromage blanc", "Beurre doux",
+    "Beurre demi-sel", "Crème fraîche épaisse", "Emmental râpé", "Comté AOP", "Camembert", "Jambon blanc",
+    "Jambon cru", "Saucisson sec", "Poulet fermier", "Steak haché", "Filet de saumon", "Pâtes penne",
+    "Spaghetti", "Riz basmati", "Riz long grain", "Farine de blé", "Sucre en poudre", "Huile d'olive vierge extra",
+    "Vinaigre balsamique", "Moutarde de Dijon", "Mayonnaise", "Ketchup", "Café moulu", "Café en grains",
+    "Thé vert", "Chocolat noir", "Chocolat au lait", "Biscuits sablés", "Céréales muesli", "Confiture de fraises",
+    "Miel de fleurs", "Eau minérale", "Eau gazeuse", "Jus d'orange", "Soda cola", "Bière blonde", "Vin rouge",
+    "Pommes Golden", "Bananes", "Tomates cerises", "Carottes", "Pommes de terre", "Oignons jaunes", "Salade iceberg",
+    "Courgettes", "Lessive liquide", "Liquide vaisselle", "Papier toilette", "Essuie-tout", "Shampooing",
+    "Gel douche", "Dentifrice", "Croquettes chat", "Pâtée chien",
+]
+VARIANTS = [
+    "bio", "allégé", "sans sucres ajoutés", "extra", "premium", "nature", "fumé", "tradition", "bio équitable",
+    "à l'ancienne", "label rouge", "sans gluten", "familial", "classique", "fraise", "vanille", "citron",
+]
+BRANDS = [
+    "AUCHAN", "PÂTURAGES", "LACTEL", "PRÉSIDENT", "DANONE", "BARILLA", "PANZANI", "TAUREAU AILÉ", "LUSTUCRU",
+    "CARTE NOIRE", "LAVAZZA", "LU", "BONNE MAMAN", "EVIAN", "COCA-COLA", "HEINEKEN", "PERSIL", "LOTUS",
+]
+SIZES = ["125g", "250g", "500g", "1kg", "1L", "1,5L", "6x1L", "33cl", "4x125g", "75cl", "200g", "2kg", "x6", "x12"]
+CATEGORIES = ["Crèmerie", "Boucherie", "Épicerie salée", "Épicerie sucrée", "Boissons", "Fruits et légumes",
+              "Entretien", "Hygiène", "Animaux", "Surgelés"]
+
+
+def generate_catalog(size, seed=42):
+    """
+    Generate a synthetic Grocy product catalog.
+
+    Parameters:
+        size (int): Number of products.
+        seed (int): Random seed, for reproducible catalogs.
+
+    Returns:
+        list: Products with 'id', 'name' and 'location_id' fields, like the Grocy products API.
+    """
+    generator = random.Random(seed)
+    products = []
+    names = set()
+    while len(products) < size:
+        parts = [generator.choice(PRODUCT_TYPES)]
+        if generator.random() < 0.6:
+            parts.append(generator.choice(VARIANTS))
+        if generator.random() < 0.7:
+            parts.append(generator.choice(BRANDS))
+        parts.append(generator.choice(SIZES))
+        name = " ".join(parts)
+        if name in names:
+            name = f"{name} {len(products)}"
+        names.add(name)
+        products.append({'id': len(products) + 1, 'name': name, 'location_id': generator.randint(1, 5)})
+    return products
+
+
+def generate_order(products, lines, order_number=1, seed=42, unknown_ratio=0.1):
+    """
+    Generate a synthetic order whose lines mostly refer to catalog products, with the kind of
+    differences found between Auchan and Grocy names (case, brands, sizes, missing words).
+
+    Parameters:
+        products (list): The catalog the order lines are drawn from.
+        lines (int): Number of order lines.
+        order_number (int): The order number.
+        seed (int): Random seed, for reproducible orders.
+        unknown_ratio (float): Fraction of lines referring to products absent from the catalog.
+
+    Returns:
+        dict: An order with the structure produced by AuchanOrderService.
+    """
+    generator = random.Random(seed + order_number)
+    details = {}
+    while len(details) < lines:
+        if generator.random() < unknown_ratio:
+            name = f"{generator.choice(BRANDS)} Produit inconnu {generator.randint(1, 10 ** 6)}"
+        else:
+            name = generator.choice(products)['name']
+            mutation = generator.random()
+            if mutation < 0.3:
+                name = name.upper()
+            elif mutation < 0.5:
+                name = f"{generator.choice(BRANDS)} {name}"
+            elif mutation < 0.6:
+                name = " ".join(name.split()[:-1])
+        if name in details:
+            continue
+        unit_price = generator.uniform(0.5, 20)
+        quantity = generator.randint(1, 4)
+        details[name] = {
+            "name": name.split()[0],
+            "description": name,
+            "category": generator.choice(CATEGORIES),
+            "quantity": str(quantity),
+            "unit_price": f"{unit_price:.2f}",
+            "total_price": f"{unit_price * quantity:.2f}",
+            "discount": "",
+            "cagnotte": ""
+        }
+    return {
+        "order_number": str(order_number),
+        "reference": f"REF{order_number:08d}",
+        "date": f"2024-{generator.randint(1, 12):02d}-{generator.randint(1, 28):02d}",
+        "total_price": f"{sum(float(line['total_price']) for line in details.values()):.2f}",
+        "pickup_point": "Drive",
+        "payment_method": "Carte bancaire",
+        "status": "livré",
+        "details_link": f"https://auchandrive.lu/commande?id_order={order_number}",
+        "details": details
+    }
+
+
+def format_price(value):
+    """Format an amount like the Auchan Drive pages, e.g. '3,45 €'."""
+    return f"{float(value):.2f}".replace(".", ",") + " €"
+
+
+def render_order_history_page(orders):
+    """
+    Render an order history page with the structure of the Auchan Drive order history table.
+
+    Parameters:
+        orders (list): Orders as generated by generate_order.
+
+    Returns:
+        str: The HTML page.
+    """
+    rows = []
+    for order in orders:
+        year, month, day = order['date'].split("-")
+        rows.append(
+            f"<tr><td>{order['order_number']}</td><th scope=\"row\">{html.escape(order['reference'])}</th>"
+            f"<td>{day}/{month}/{year}</td><td>{format_price(order['total_price'])}</td>"
+            f"<td>{html.escape(order['pickup_point'])}</td><td>{html.escape(order['payment_method'])}</td>"
+            f"<td><span class=\"label\">\n    {html.escape(order['status'])}\n</span></td>"
+            f"<td><a href=\"{html.escape(order['details_link'])}\" data-link-action=\"view-order-details\">Détails</a></td></tr>"
+        )
+    return (
+        "<html><body><table class=\"table\"><thead><tr><th>Commande</th><th>Référence</th><th>Date</th>"
+        "<th>Prix total</th><th>Retrait</th><th>Paiement</th><th>État</th><th></th></tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table></body></html>"
+    )
+
+
+def render_order_details_page(order):
+    """
+    Render an order details page with the structure of the Auchan Drive products table:
+    a category row followed by the product rows of that category.
+
+    Parameters:
+        order (dict): An order as generated by generate_order.
+
+    Returns:
+        str: The HTML page.
+    """
+    rows = []
+    category = None
+    for line in sorted(order['details'].values(), key=lambda line: line['category']):
+        if line['category'] != category:
+            category = line['category']
+            rows.append(f"<tr><td colspan=\"4\"><span>{html.escape(category)}</span></td></tr>")
+        discount = (f"<div class=\"ri-block product-line-discount\"><span>-{format_price(line['discount'])}</span></div>"
+                    if line['discount'] else "")
+        rows.append(
+            f"<tr><td><div class=\"product-line\"><div class=\"manufacturer-name\">{html.escape(line['name'])}</div>"
+            f"<strong><a href=\"#\">{html.escape(line['description'])}</a></strong>{discount}</div></td>"
+            f"<td>\n    {line['quantity']}\n</td><td>{format_price(line['unit_price'])}</td>"
+            f"<td>{format_price(line['total_price'])}</td></tr>"
+        )
+    return (
+        "<html><body><table id=\"order-products\"><thead><tr><th>Produit</th><th>Quantité</th>"
+        "<th>Prix unitaire</th><th>Prix total</th></tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table></body></html>"
+    )
+
+
+def generate_locations():
+    """
+    Returns:
+        list: Synthetic Grocy locations, including the 'Parking' location.
+    """
+    return [
+        {'id': 1, 'name': 'Parking'},
+        {'id': 2, 'name': 'Frigo'},
+        {'id': 3, 'name': 'Congélateur'},
+        {'id': 4, 'name': 'Placard'},
+        {'id': 5, 'name': 'Cave'},
+    ]
+
+
+class StubGrocyService:
+    """Offline stand-in for GrocyService serving a synthetic catalog and accepting stock additions."""
+
+    def __init__(self, products, locations=None):
+        self.products = products
+        self.locations = locations or generate_locations()
+        self.stock_additions = 0
+
+    async def fetch_products(self):
+        return self.products
+
+    async def fetch_locations(self):
+        return self.locations
+
+    async def add_to_stock(self, product_id, amount, location_id, total_price):
+        self.stock_additions += 1
+        return {'product_id': product_id, 'amount': amount}
+
+    def cache_stats(self):
+        return {}
+
+    async def close(self):
+        pass
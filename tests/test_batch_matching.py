@@ -0,0 +1,67 @@
+import pytest
+from app.helpers.batch_matching import BatchMatcher
+from app.helpers.matching_utils import CatalogIndex
+from benchmarks.synthetic_data import generate_catalog, generate_order
+
+
+@pytest.fixture(scope="module")
+def catalog_index():
+    return CatalogIndex(generate_catalog(300))
+
+
+def test_match_many_equals_one_query_at_a_time(catalog_index):
+    queries = list(generate_order(catalog_index.products, 80, seed=11)['details'])
+    matcher = BatchMatcher(catalog_index)
+    for query, match in zip(queries, matcher.match_many(queries)):
+        expected = catalog_index.get_best_match(query)
+        assert match['product'] is expected['product']
+        assert match['similarity_percentage'] == pytest.approx(expected['similarity_percentage'])
+
+
+def test_ties_and_unmatched_queries_follow_catalog_order():
+    products = [{'id': 1, 'name': 'Lait entier'}, {'id': 2, 'name': 'Lait demi'}, {'id': 3, 'name': 'Café moulu'}]
+    tie, unmatched = BatchMatcher(CatalogIndex(products)).match_many(["lait", "chocolat"])
+    assert tie['product']['id'] == 1
+    assert unmatched['product']['id'] == 1
+    assert unmatched['similarity_percentage'] == 0.0
+
+
+def test_runner_ups_are_ranked_best_first_then_by_catalog_order():
+    products = [
+        {'id': 1, 'name': 'Yaourt nature bio'},
+        {'id': 2, 'name': 'Yaourt fraise'},
+        {'id': 3, 'name': 'Yaourt vanille'},
+        {'id': 4, 'name': 'Yaourt nature'},
+        {'id': 5, 'name': 'Beurre doux'},
+    ]
+    match = BatchMatcher(CatalogIndex(products)).match_many(["yaourt nature doux"], k=4)[0]
+    assert match['product']['id'] == 4
+    assert [runner_up['product']['id'] for runner_up in match['runner_ups']] == [1, 2, 3]
+    scores = [runner_up['similarity_percentage'] for runner_up in match['runner_ups']]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_exact_matches_have_no_runner_ups():
+    products = [{'id': 1, 'name': 'Lait entier'}, {'id': 2, 'name': 'Lait entier bio'}]
+    match = BatchMatcher(CatalogIndex(products)).match_many(["Lait entier"], k=3)[0]
+    assert match['product']['id'] == 1
+    assert match['runner_ups'] == []
+
+
+def test_empty_inputs():
+    assert BatchMatcher(CatalogIndex([{'id': 1, 'name': 'Lait'}])).match_many([]) == []
+    assert BatchMatcher(CatalogIndex([])).match_many(["lait"]) == [None]
+
+
+def test_runner_ups_come_from_the_computed_similarities(catalog_index, monkeypatch):
+    queries = list(generate_order(catalog_index.products, 80, seed=12)['details'])
+    expected = {query: catalog_index.top_k_matches(query, 5) for query in queries}
+    monkeypatch.setattr(catalog_index, 'top_k_matches', lambda query, k: pytest.fail("The catalog was scanned again"))
+
+    for query, match in zip(queries, BatchMatcher(catalog_index).match_many(queries, k=5)):
+        if not match['runner_ups']:
+            continue
+        ranked = [m for m in expected[query] if m['product'] is not match['product']][:4]
+        assert [m['product'] for m in match['runner_ups']] == [m['product'] for m in ranked]
+        assert [m['similarity_percentage'] for m in match['runner_ups']] == \
+            pytest.approx([m['similarity_percentage'] for m in ranked])
@@ -0,0 +1,108 @@
+import pytest
+from app.helpers.matching_utils import CatalogIndex, MatchingUtils
+from benchmarks.synthetic_data import generate_catalog, generate_order
+
+
+def brute_force_best_match(query, products):
+    """The former scan: a vocabulary of the whole catalog and one dense cosine per product, first product among ties."""
+    vocabulary = sorted({word for product in products for word in MatchingUtils.tokenize(product['name'])})
+    query_vector = MatchingUtils.vectorize(query, vocabulary)
+    best_match, highest_similarity = products[0], 0.0
+    for product in products:
+        similarity = MatchingUtils.cosine_similarity(query_vector, MatchingUtils.vectorize(product['name'], vocabulary))
+        if similarity > highest_similarity:
+            best_match, highest_similarity = product, similarity
+    return best_match, highest_similarity * 100
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return generate_catalog(300)
+
+
+def test_get_best_match_equals_brute_force_scan(catalog):
+    index = CatalogIndex(catalog)
+    for query in generate_order(catalog, 60, seed=7)['details']:
+        expected_product, expected_similarity = brute_force_best_match(query, catalog)
+        match = index.get_best_match(query)
+        assert match['product'] is expected_product
+        assert match['similarity_percentage'] == pytest.approx(expected_similarity)
+
+
+def test_ties_keep_the_first_product_of_the_catalog():
+    products = [{'id': 1, 'name': 'Lait entier'}, {'id': 2, 'name': 'Lait demi'}, {'id': 3, 'name': 'Lait bio'}]
+    match = CatalogIndex(products).get_best_match("lait")
+    assert match['product']['id'] == 1
+
+
+def test_query_without_shared_token_returns_first_product_with_zero():
+    products = [{'id': 1, 'name': 'Beurre doux'}, {'id': 2, 'name': 'Café moulu'}]
+    match = CatalogIndex(products).get_best_match("chocolat noir")
+    assert match['product']['id'] == 1
+    assert match['similarity_percentage'] == 0.0
+
+
+def test_empty_catalog_has_no_match():
+    assert CatalogIndex([]).get_best_match("lait") is None
+
+
+def test_get_product_by_id(catalog):
+    index = CatalogIndex(catalog)
+    assert index.get_product(catalog[10]['id']) is catalog[10]
+    assert index.get_product(-1) is None
+
+
+def test_fingerprint_changes_with_the_catalog(catalog):
+    renamed = [dict(product) for product in catalog]
+    renamed[0]['name'] += " bis"
+    assert CatalogIndex(catalog).fingerprint == CatalogIndex(list(catalog)).fingerprint
+    assert CatalogIndex(catalog).fingerprint != CatalogIndex(renamed).fingerprint
+
+
+def brute_force_ranking(index, query):
+    """Every product sharing a token with the query, best first and catalog order among ties."""
+    query_vector = index.vectorize(query)
+    query_norm = sum(count ** 2 for count in query_vector.values()) ** 0.5
+    scores = [(index.score(query_vector, query_norm, position), position) for position in range(len(index))]
+    return [(position, score) for score, position in sorted(scores, key=lambda item: (-item[0], item[1])) if score > 0]
+
+
+@pytest.mark.parametrize("k", [1, 3, 8])
+def test_top_k_matches_equal_a_full_ranking(catalog, k):
+    index = CatalogIndex(catalog)
+    positions = {id(product): position for position, product in enumerate(catalog)}
+    for query in generate_order(catalog, 40, seed=3)['details']:
+        matches = index.top_k_matches(query, k)
+        expected = brute_force_ranking(index, query)
+        if matches and matches[0]['similarity_percentage'] >= 100 - 1e-7:
+            continue  # The scan stops at an exact match, see below
+        assert [positions[id(match['product'])] for match in matches] == [position for position, _ in expected[:k]]
+        assert [match['similarity_percentage'] for match in matches] == \
+            pytest.approx([score * 100 for _, score in expected[:k]])
+
+
+def test_top_k_scan_stops_at_the_first_exact_match(monkeypatch):
+    products = [{'id': 1, 'name': 'Lait entier'}] + [
+        {'id': i, 'name': f'Lait entier variante{i}'} for i in range(2, 50)
+    ]
+    index = CatalogIndex(products)
+    scored = []
+    score = index.score
+    monkeypatch.setattr(index, 'score', lambda *args: scored.append(args[2]) or score(*args))
+
+    matches = index.top_k_matches("lait entier", 4)
+    assert [match['product']['id'] for match in matches] == [1]
+    assert matches[0]['similarity_percentage'] == pytest.approx(100)
+    assert scored == [0]
+
+
+def test_top_k_ties_keep_catalog_order():
+    products = [{'id': i, 'name': f'Yaourt parfum{i}'} for i in range(1, 6)]
+    matches = CatalogIndex(products).top_k_matches("yaourt", 3)
+    assert [match['product']['id'] for match in matches] == [1, 2, 3]
+
+
+def test_top_k_without_overlap_or_slots():
+    index = CatalogIndex([{'id': 1, 'name': 'Lait entier'}])
+    assert index.top_k_matches("café", 3) == []
+    assert index.top_k_matches("lait", 0) == []
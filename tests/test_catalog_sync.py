@@ -0,0 +1,47 @@
+import asyncio
+import json
+from app.services.catalog_sync import CatalogSync
+
+
+class FakeGrocy:
+    def __init__(self, products):
+        self.products = products
+        self.changed_time = "2024-03-12 10:00:00"
+        self.fetches = 0
+
+    async def fetch_db_changed_time(self):
+        return self.changed_time
+
+    async def fetch_objects(self, entity):
+        self.fetches += 1
+        return json.loads(json.dumps(self.products))  # A new list, like a download
+
+
+def test_unchanged_database_reuses_the_snapshot(tmp_path):
+    grocy = FakeGrocy([{'id': 1, 'name': "Lait"}])
+    sync = CatalogSync(grocy, str(tmp_path / "snapshot.json"))
+    products = asyncio.run(sync.fetch('products'))
+    assert asyncio.run(sync.fetch('products')) is products
+    assert grocy.fetches == 1
+
+    reloaded = CatalogSync(grocy, sync.snapshot_file)
+    assert asyncio.run(reloaded.fetch('products')) == products
+    assert grocy.fetches == 1
+
+
+def test_unchanged_objects_keep_the_same_list(tmp_path):
+    grocy = FakeGrocy([{'id': 1, 'name': "Lait"}])
+    sync = CatalogSync(grocy, str(tmp_path / "snapshot.json"))
+    products = asyncio.run(sync.fetch('products'))
+
+    grocy.changed_time = "2024-03-12 11:00:00"  # e.g. a stock addition
+    assert asyncio.run(sync.fetch('products')) is products
+    assert grocy.fetches == 2
+    assert asyncio.run(sync.fetch('products')) is products
+    assert grocy.fetches == 2  # The new database time was recorded
+
+    grocy.changed_time = "2024-03-12 12:00:00"
+    grocy.products = [{'id': 1, 'name': "Lait"}, {'id': 2, 'name': "Café"}]
+    changed = asyncio.run(sync.fetch('products'))
+    assert changed is not products
+    assert changed == grocy.products
@@ -0,0 +1,84 @@
+import copy
+import json
+import pytest
+from app.helpers import history_serializer
+from app.helpers.history_serializer import HistorySerializer
+from app.services.history_store import JsonHistoryStore
+from tests.test_history_stores import make_order
+
+COMPRESSIONS = [
+    'none',
+    'gzip',
+    pytest.param('zstd', marks=pytest.mark.skipif(history_serializer.zstandard is None,
+                                                   reason="zstandard is not installed")),
+]
+
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+@pytest.mark.parametrize('format', HistorySerializer.FORMATS)
+def test_round_trip(tmp_path, format, compression):
+    serializer = HistorySerializer(format, compression)
+    store = JsonHistoryStore(str(tmp_path / "history.json"), serializer)
+    orders = [make_order(number) for number in (3, 2, 1)]
+    store.save(copy.deepcopy(orders))
+
+    assert HistorySerializer.detect_compression(store.history_file) == compression
+    reopened = JsonHistoryStore(store.history_file, serializer)
+    assert list(reopened.iter_orders()) == orders
+    assert reopened.load()['2'] == orders[1]
+
+    reopened.save([make_order(4), make_order(2, status="annulé")])
+    assert list(JsonHistoryStore(store.history_file, serializer).iter_orders()) == \
+        [make_order(4), orders[0], make_order(2, status="annulé"), orders[2]]
+
+
+def test_indent_format_matches_json_dump(tmp_path):
+    store = JsonHistoryStore(str(tmp_path / "history.json"))
+    orders = [make_order(2), make_order(1, note="à rappeler")]
+    store.save(copy.deepcopy(orders))
+
+    with open(store.history_file, encoding='utf-8') as file:
+        assert file.read() == json.dumps(orders, ensure_ascii=False, indent=4)
+
+
+def test_compact_format_writes_one_order_per_line(tmp_path):
+    store = JsonHistoryStore(str(tmp_path / "history.json"), HistorySerializer('compact'))
+    orders = [make_order(2), make_order(1)]
+    store.save(copy.deepcopy(orders))
+
+    with open(store.history_file, encoding='utf-8') as file:
+        lines = file.read().split("\n")
+    assert lines[0] == "[" and lines[-1] == "]"
+    assert [json.loads(line.rstrip(",")) for line in lines[1:-1]] == orders
+
+
+@pytest.mark.parametrize('source, target', [
+    (HistorySerializer('indent'), HistorySerializer('compact', 'gzip')),
+    (HistorySerializer('compact', 'gzip'), HistorySerializer('indent')),
+])
+def test_existing_history_is_rewritten_in_the_configured_format(tmp_path, source, target):
+    history_file = str(tmp_path / "history.json")
+    orders = [make_order(number) for number in (3, 2, 1)]
+    JsonHistoryStore(history_file, source).save(copy.deepcopy(orders))
+
+    store = JsonHistoryStore(history_file, target)
+    assert list(store.iter_orders()) == orders  # Read whatever the format of the file
+    store.load()
+    store.save([make_order(4)])
+
+    assert HistorySerializer.detect_compression(history_file) == target.compression
+    assert list(JsonHistoryStore(history_file, target).iter_orders()) == [make_order(4)] + orders
+
+
+def test_dumps_compact_without_orjson(monkeypatch):
+    order = make_order(1, note="à rappeler")
+    encoded = HistorySerializer.dumps_compact(order)
+    monkeypatch.setattr(history_serializer, 'orjson', None)
+    assert HistorySerializer.dumps_compact(order) == encoded
+    assert HistorySerializer.loads(encoded) == order
+
+
+@pytest.mark.parametrize('format, compression', [('pretty', 'none'), ('indent', 'bz2')])
+def test_unknown_format_or_compression(format, compression):
+    with pytest.raises(ValueError):
+        HistorySerializer(format, compression)
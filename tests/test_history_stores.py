@@ -0,0 +1,121 @@
+import copy
+import pytest
+from app.services.history_store import JsonHistoryStore, migrate_json_history
+from app.services.journal_history_store import JournalHistoryStore
+from app.services.sqlite_history_store import SqliteHistoryStore
+
+
+def make_order(order_number, status="livré", lines=2, **fields):
+    order = {
+        'order_number': str(order_number),
+        'reference': f"REF{order_number}",
+        'date': "2024-03-12",
+        'total_price': "12.50",
+        'status': status,
+        'details_link': f"https://www.example.invalid/commande?id_order={order_number}",
+        'previous_status': None,
+        'processing_status': "processed",
+        'details': {
+            f"Produit {order_number}-{line} à 1,5L": {
+                'name': "Produit", 'description': f"Produit {order_number}-{line} à 1,5L", 'category': "Épicerie",
+                'quantity': "2", 'unit_price': "3.10", 'total_price': "6.20", 'discount': "", 'cagnotte': ""
+            }
+            for line in range(lines)
+        }
+    }
+    order.update(fields)
+    return order
+
+
+@pytest.fixture(params=['json', 'sqlite', 'journal'])
+def store(request, tmp_path):
+    if request.param == 'json':
+        store = JsonHistoryStore(str(tmp_path / "history.json"))
+    elif request.param == 'sqlite':
+        store = SqliteHistoryStore(str(tmp_path / "history.db"))
+    else:
+        store = JournalHistoryStore(str(tmp_path / "history.jsonl"))
+    yield store
+    store.close()
+
+
+def test_round_trip(store):
+    orders = [
+        make_order(3),
+        make_order(2, status="annulé", lines=0, note="à rappeler", flags=None),
+        make_order(1, extra_field={'nested': [1, 2]}),
+    ]
+    del orders[1]['details']
+    del orders[2]['previous_status']
+    store.save(copy.deepcopy(orders))
+
+    assert list(store.iter_orders()) == orders
+    assert store.exists()
+    history = store.load()
+    assert list(history) == ['3', '2', '1']
+    assert all(history[order['order_number']] == order for order in orders)
+    assert history.status('2') == "annulé"
+
+
+def test_updated_orders_replace_saved_ones_and_new_orders_come_first(store):
+    store.save([make_order(2), make_order(1, status="en cours")])
+    history = store.load()
+
+    order = history['1']
+    order['status'] = "livré"
+    order['previous_status'] = "en cours"
+    history.mark_dirty('1')
+    history.add(make_order(3))
+    assert history.save() == 2
+    assert not history.has_changes()
+
+    expected = [make_order(3), make_order(2), make_order(1, previous_status="en cours")]
+    assert list(store.iter_orders()) == expected
+    assert [order['order_number'] for order in store.load().values()] == ['3', '2', '1']
+
+
+def test_save_does_not_read_dirty_orders_back(store, monkeypatch):
+    store.save([make_order(2), make_order(1)])
+    history = store.load()
+    history['1']['status'] = "annulé"
+    history.mark_dirty('1')
+
+    monkeypatch.setattr(store, 'get_order', lambda order_number: pytest.fail("The store re-read an order"))
+    history.save()
+    monkeypatch.undo()
+    assert store.get_order('1')['status'] == "annulé"
+
+
+def test_version_changes_when_saved(store):
+    store.save([make_order(1)])
+    version = store.version()
+    store.save([make_order(2)])
+    assert store.version() != version
+
+
+def test_migrate_json_history(store, tmp_path):
+    if isinstance(store, JsonHistoryStore):
+        pytest.skip("The JSON history is the migration source")
+    json_store = JsonHistoryStore(str(tmp_path / "source.json"))
+    orders = [make_order(number) for number in (5, 4, 3)]
+    json_store.save(copy.deepcopy(orders))
+
+    assert migrate_json_history(json_store, store) == 3
+    assert list(store.iter_orders()) == orders
+
+
+def test_sqlite_partial_update_keeps_stored_fields(tmp_path):
+    store = SqliteHistoryStore(str(tmp_path / "history.db"))
+    store.save([make_order(1, note="a", flags=None)])
+    store.save([{'order_number': '1', 'status': "annulé", 'comment': "b"}])
+
+    order = store.get_order('1')
+    assert order == make_order(1, status="annulé", note="a", flags=None, comment="b")
+    store.close()
+
+
+def test_sqlite_absent_fields_stay_absent(tmp_path):
+    store = SqliteHistoryStore(str(tmp_path / "history.db"))
+    store.save([{'order_number': '1', 'status': "livré", 'details': {'A': {'name': "A", 'quantity': "1"}}}])
+    assert store.get_order('1') == {'order_number': '1', 'status': "livré", 'details': {'A': {'name': "A", 'quantity': "1"}}}
+    store.close()
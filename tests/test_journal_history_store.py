@@ -0,0 +1,73 @@
+import os
+from app.services.journal_history_store import JournalHistoryStore
+from tests.test_history_stores import make_order
+
+
+def test_superseded_records_are_counted(tmp_path):
+    store = JournalHistoryStore(str(tmp_path / "history.jsonl"), compaction_ratio=10)
+    store.save([make_order(2), make_order(1)])
+    store.save([make_order(1, status="annulé")])
+    assert store.superseded == 1
+
+    reopened = JournalHistoryStore(store.journal_file)
+    reopened.load_index()
+    assert reopened.superseded == 1
+    assert list(reopened.load()) == ['2', '1']
+
+
+def test_compaction_keeps_the_latest_records(tmp_path):
+    store = JournalHistoryStore(str(tmp_path / "history.jsonl"), compaction_ratio=10)
+    store.save([make_order(3), make_order(2), make_order(1)])
+    store.save([make_order(2, status="annulé"), make_order(1, status="annulé")])
+    orders = list(store.iter_orders())
+    size = os.path.getsize(store.journal_file)
+
+    store.compact()
+    assert store.superseded == 0
+    assert os.path.getsize(store.journal_file) < size
+    assert list(store.iter_orders()) == orders
+
+    reopened = JournalHistoryStore(store.journal_file)
+    assert list(reopened.iter_orders()) == orders
+    assert reopened.superseded == 0
+    with open(store.journal_file, 'rb') as file:
+        assert len(file.readlines()) == 3
+
+
+def test_compaction_starts_once_superseded_records_outnumber_live_ones(tmp_path):
+    store = JournalHistoryStore(str(tmp_path / "history.jsonl"), compaction_ratio=0.5)
+    store.save([make_order(2), make_order(1)])
+    store.save([make_order(2, status="annulé"), make_order(1, status="annulé")])
+    store.close()  # Waits for the background compaction
+
+    assert store.superseded == 0
+    with open(store.journal_file, 'rb') as file:
+        assert len(file.readlines()) == 2
+    assert [order['status'] for order in store.iter_orders()] == ["annulé", "annulé"]
+
+
+def test_incomplete_last_record_is_ignored_and_truncated(tmp_path):
+    store = JournalHistoryStore(str(tmp_path / "history.jsonl"))
+    store.save([make_order(2), make_order(1)])
+    with open(store.journal_file, 'ab') as file:
+        file.write(JournalHistoryStore.encode(make_order(3))[:40])  # Interrupted by a crash
+
+    reopened = JournalHistoryStore(store.journal_file)
+    assert list(reopened.load()) == ['2', '1']
+    assert list(reopened.iter_orders()) == [make_order(2), make_order(1)]
+
+    reopened.save([make_order(4)])
+    reopened.close()
+    assert list(JournalHistoryStore(store.journal_file).iter_orders()) == [make_order(4), make_order(2), make_order(1)]
+    with open(store.journal_file, 'rb') as file:
+        assert len(file.readlines()) == 3
+
+
+def test_records_without_a_leading_header_are_indexed(tmp_path):
+    journal_file = tmp_path / "history.jsonl"
+    journal_file.write_text('{"reference":"R1","order_number":"1","status":"livré"}\n', encoding='utf-8')
+
+    store = JournalHistoryStore(str(journal_file))
+    history = store.load()
+    assert history.status('1') == "livré"
+    assert history['1'] == {'reference': "R1", 'order_number': "1", 'status': "livré"}
@@ -0,0 +1,60 @@
+from app.helpers.match_cache import MatchCache
+
+MILK = {'id': 1, 'name': 'Lait entier'}
+BUTTER = {'id': 2, 'name': 'Beurre doux'}
+COFFEE = {'id': 3, 'name': 'Café moulu'}
+
+
+def test_names_are_normalized(tmp_path):
+    cache = MatchCache(str(tmp_path / "cache.json"))
+    cache.put("  LAIT   Entier ", "v1", MILK, 95.0)
+    assert cache.get("lait entier", "v1")['product_id'] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = MatchCache(str(tmp_path / "cache.json"), max_entries=2)
+    cache.put("lait", "v1", MILK, 90.0)
+    cache.put("beurre", "v1", BUTTER, 90.0)
+    assert cache.get("lait", "v1") is not None  # Now the most recently used
+    cache.put("café", "v1", COFFEE, 90.0)
+    assert len(cache) == 2
+    assert cache.get("beurre", "v1") is None
+    assert cache.get("lait", "v1") is not None
+    assert cache.get("café", "v1") is not None
+
+
+def test_entry_of_another_catalog_is_a_miss_and_dropped(tmp_path):
+    cache = MatchCache(str(tmp_path / "cache.json"))
+    cache.put("lait", "v1", MILK, 90.0)
+    assert cache.get("lait", "v2") is None
+    assert cache.get("lait", "v1") is None
+    assert len(cache) == 0
+
+
+def test_invalidate(tmp_path):
+    cache = MatchCache(str(tmp_path / "cache.json"))
+    cache.put("lait", "v1", MILK, 90.0)
+    assert cache.invalidate("LAIT")
+    assert not cache.invalidate("lait")
+    assert cache.get("lait", "v1") is None
+
+
+def test_saved_entries_are_reloaded_in_lru_order(tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+    cache = MatchCache(cache_file, max_entries=2)
+    cache.put("lait", "v1", MILK, 90.0)
+    cache.put("beurre", "v1", BUTTER, 80.0)
+    cache.get("lait", "v1")
+    cache.save()
+    assert not cache.dirty
+
+    reloaded = MatchCache(cache_file, max_entries=2)
+    assert reloaded.get("beurre", "v1")['similarity_percentage'] == 80.0
+    reloaded.put("café", "v1", COFFEE, 90.0)
+    assert reloaded.get("lait", "v1") is None  # Least recently used when saved
+
+
+def test_corrupt_file_starts_empty(tmp_path):
+    cache_file = tmp_path / "cache.json"
+    cache_file.write_text("{not json", encoding='utf-8')
+    assert len(MatchCache(str(cache_file))) == 0
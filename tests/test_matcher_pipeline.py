@@ -0,0 +1,101 @@
+import pytest
+from app.helpers.batch_matching import BatchMatcher
+from app.helpers.matching_utils import (
+    CatalogIndex, MatcherPipeline, MatcherStage, MatchingUtils, NormalizedNameStage, ScorerStage, TokenOverlapStage
+)
+from benchmarks.synthetic_data import generate_catalog, generate_order
+
+PRODUCTS = [
+    {'id': 1, 'name': 'Lait demi-écrémé 500ml'},
+    {'id': 2, 'name': 'Lait demi-écrémé 1L'},
+    {'id': 3, 'name': 'Pâtes penne 6 x 500 g'},
+    {'id': 4, 'name': 'Café moulu'},
+]
+
+
+@pytest.fixture
+def pipeline():
+    catalog_index = CatalogIndex(PRODUCTS)
+    return MatcherPipeline(catalog_index, [
+        NormalizedNameStage(catalog_index),
+        TokenOverlapStage(catalog_index, shortlist_size=20, accept_threshold=90),
+        ScorerStage(BatchMatcher(catalog_index))
+    ])
+
+
+def test_stage_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        MatcherStage()
+
+
+def test_unit_suffixes_are_canonical():
+    assert MatchingUtils.unit_suffixes("Eau 1,5 L x6") == ("1.5l", "x6")
+    assert MatchingUtils.unit_suffixes("Pâtes 6 x 500 g") == MatchingUtils.unit_suffixes("pates 6x500g")
+    assert MatchingUtils.unit_suffixes("Café moulu") == ()
+
+
+def test_normalized_name_requires_the_same_units():
+    stage = NormalizedNameStage(CatalogIndex(PRODUCTS))
+    assert stage.match("LAIT DEMI ECREME 1 l")['product']['id'] == 2
+    assert stage.match("lait demi-écrémé 500 ML")['product']['id'] == 1
+    assert stage.match("pates penne 6x500g")['product']['id'] == 3
+    assert stage.match("Lait demi-écrémé 2L") is None
+    assert stage.match("Lait demi-écrémé") is None
+
+
+def test_unresolved_queries_fall_through_to_the_next_stages(pipeline):
+    exact, near, scored = pipeline.match_many(["CAFÉ MOULU", "Café moulu arabica", "Lait demi-écrémé 2L"])
+    assert exact == {'product': PRODUCTS[3], 'similarity_percentage': 100.0}
+    assert near['product']['id'] == 4
+    assert scored['product']['id'] in (1, 2)
+    assert scored['similarity_percentage'] < 100
+    assert {name: stats['hits'] for name, stats in pipeline.stats().items()} == {
+        'normalized_name': 1, 'token_overlap': 1, 'cosine': 1
+    }
+    assert [stats['attempts'] for stats in pipeline.stats().values()] == [3, 2, 1]
+
+
+def test_reset_stats(pipeline):
+    pipeline.match_many(["Café moulu"])
+    pipeline.reset_stats()
+    assert all(stats == {'attempts': 0, 'hits': 0, 'hit_rate': 0.0} for stats in pipeline.stats().values())
+
+
+def test_shortlist_is_ranked_by_cosine_bound():
+    catalog_index = CatalogIndex([
+        {'id': 1, 'name': 'Yaourt nature brassé bio'},
+        {'id': 2, 'name': 'Yaourt nature sucré entier'},
+        {'id': 3, 'name': 'Yaourt au lait entier nature'},
+        {'id': 4, 'name': 'Yaourt nature'},
+    ])
+    stage = TokenOverlapStage(catalog_index, shortlist_size=2, accept_threshold=60)
+    match = stage.match("yaourt nature")
+    assert match['product']['id'] == 4
+    assert match['similarity_percentage'] == pytest.approx(100)
+
+
+def test_shortlist_falls_through_when_an_unscored_product_may_score_as_high():
+    catalog_index = CatalogIndex([
+        {'id': 1, 'name': 'Yaourt nature brassé'},
+        {'id': 2, 'name': 'Yaourt nature sucré'},
+    ])
+    stage = TokenOverlapStage(catalog_index, shortlist_size=1, accept_threshold=60)
+    assert stage.match("yaourt nature") is None
+    assert TokenOverlapStage(catalog_index, shortlist_size=2, accept_threshold=60).match("yaourt nature")['product']['id'] == 1
+
+
+def test_pipeline_agrees_with_a_full_scan():
+    products = generate_catalog(2000)
+    queries = list(generate_order(products, 200, unknown_ratio=0.2)['details'])
+    catalog_index = CatalogIndex(products)
+    full_scan = BatchMatcher(catalog_index)
+    pipeline = MatcherPipeline(catalog_index, [
+        TokenOverlapStage(catalog_index, shortlist_size=5, accept_threshold=50),
+        ScorerStage(full_scan)
+    ])
+
+    expected = full_scan.match_many(queries)
+    results = pipeline.match_many(queries)
+    assert [result and result['product']['id'] for result in results] == \
+        [result and result['product']['id'] for result in expected]
+    assert pipeline.stats()['token_overlap']['hits'] > 0
@@ -0,0 +1,74 @@
+import asyncio
+from pathlib import Path
+import pytest
+from app.helpers.order_page_extraction import (
+    ORDER_PRODUCTS_SCRIPT, ORDER_PRODUCTS_SELECTOR, OrderPageExtraction, OrderProductsParser
+)
+from benchmarks.synthetic_data import generate_catalog, generate_order, render_order_details_page
+
+DETAILS_PAGE = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures" / "order_details.html"
+
+
+def test_synthetic_page_round_trip():
+    order = generate_order(generate_catalog(200), 60)
+    details = OrderPageExtraction.parse_order_details_html(render_order_details_page(order))
+    assert details == order['details']
+
+
+def test_fixture_page():
+    details = OrderPageExtraction.parse_order_details_html(DETAILS_PAGE.read_text(encoding='utf-8'))
+    assert len(details) == 100
+    assert sum(1 for line in details.values() if line['discount']) == 13
+    assert sum(1 for line in details.values() if line['cagnotte']) == 7
+    assert all(line['category'] for line in details.values())
+
+
+def test_rows_match_the_script():
+    html = """
+    <table id="order-products">
+      <thead><tr><th><span>Produit</span></th><th>Quantité</th></tr></thead>
+      <tbody>
+        <tr><td colspan="4"><span>Crémerie &amp; œufs</span></td>
+        <tr><td><div class="manufacturer-name">Marque</div><strong><a href="#">Yaourt&nbsp;nature<br>x4</a></strong>
+              <div class="ri-block product-line-discount"><span>-0,50 €</span></div>
+              <div class="cagnotte-block product-line-discount"><span>0,20 €</span></div>
+            <td>2<td>1,20 €<td>2,40 €
+        <tr><td><strong><a href="#">Sans marque</a></strong><img src="x.png"></td><td>1</td><td>3,00 €</td><td>3,00 €</td></tr>
+      </tbody>
+      <tfoot><tr><td><span>Total</span></td></tr></tfoot>
+    </table>
+    <table><tbody><tr><td><span>Ailleurs</span></td></tr></tbody></table>
+    """
+    assert OrderProductsParser.parse(html) == [
+        {'category': "Crémerie & œufs"},
+        {'name': "Marque", 'description': "Yaourt\xa0naturex4", 'quantity': "2",
+         'unit_price': "1,20 €", 'total_price': "2,40 €\n        ", 'discount': "-0,50 €", 'cagnotte': "0,20 €"},
+        {'name': "", 'description': "Sans marque", 'quantity': "1",
+         'unit_price': "3,00 €", 'total_price': "3,00 €", 'discount': "", 'cagnotte': ""},
+    ]
+
+
+def test_page_without_products_table():
+    with pytest.raises(ValueError):
+        OrderProductsParser.parse("<html><body><p>Veuillez vous connecter.</p></body></html>")
+    assert OrderProductsParser.parse('<table id="order-products"><tbody></tbody></table>') == []
+
+
+def test_parser_matches_the_browser():
+    playwright_api = pytest.importorskip("playwright.async_api")
+    html = DETAILS_PAGE.read_text(encoding='utf-8')
+
+    async def evaluate():
+        async with playwright_api.async_playwright() as playwright:
+            try:
+                browser = await playwright.chromium.launch()
+            except Exception as e:
+                pytest.skip(f"Chromium is not available: {e}")
+            try:
+                page = await browser.new_page()
+                await page.set_content(html)
+                return await page.eval_on_selector_all(ORDER_PRODUCTS_SELECTOR, ORDER_PRODUCTS_SCRIPT)
+            finally:
+                await browser.close()
+
+    assert OrderProductsParser.parse(html) == asyncio.run(evaluate())
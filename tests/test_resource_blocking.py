@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.helpers.resource_blocking import DEFAULT_ALLOWED_TYPES, ResourceBlockingPolicy
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+def config(**settings):
+    values = {
+        'resource_blocking': 'block',
+        'resource_allowed_types': "",
+        'resource_allowed_domains': "",
+        'resource_blocked_domains': "",
+        'target_url': "https://www.auchandrive.lu/historique-commandes",
+    }
+    values.update(settings)
+    return SimpleNamespace(**values)
+
+
+@pytest.fixture
+def policy():
+    return ResourceBlockingPolicy(allowed_domains=["auchandrive.lu"], blocked_domains=["tracker.example"])
+
+
+@pytest.mark.parametrize('url, resource_type, reason', [
+    ("https://www.auchandrive.lu/commande?id_order=1", 'document', None),
+    ("https://login.example.com/authorize", 'document', None),  # Navigations are never blocked
+    ("https://tracker.example/login", 'document', 'domain'),
+    ("https://cdn.tracker.example/pixel.js", 'script', 'domain'),
+    ("https://www.auchandrive.lu/app.js", 'script', None),
+    ("https://api.auchandrive.lu/cart", 'fetch', None),
+    ("https://auchandrive.lu/logo.png", 'image', 'type'),
+    ("https://www.auchandrive.lu/font.woff2", 'font', 'type'),
+    ("https://cdn.example.com/app.js", 'script', 'domain'),
+    ("https://notauchandrive.lu/app.js", 'script', 'domain'),
+    ("data:text/javascript,1", 'script', None),
+])
+def test_block_reason(policy, url, resource_type, reason):
+    assert policy.block_reason(FakeRequest(url, resource_type)) == reason
+
+
+def test_all_domains_are_allowed_without_allowed_domains():
+    policy = ResourceBlockingPolicy(allowed_types=['script', 'image'])
+    assert policy.block_reason(FakeRequest("https://cdn.example.com/logo.png", 'image')) is None
+    assert policy.block_reason(FakeRequest("https://cdn.example.com/style.css", 'stylesheet')) == 'type'
+
+
+def test_from_config_defaults_to_the_target_domain():
+    policy = ResourceBlockingPolicy.from_config(config())
+    assert policy.mode == 'block'
+    assert policy.allowed_types == frozenset(DEFAULT_ALLOWED_TYPES)
+    assert policy.allowed_domains == ("auchandrive.lu",)
+    assert policy.blocked_domains == ()
+
+
+def test_from_config_lists():
+    policy = ResourceBlockingPolicy.from_config(config(
+        resource_blocking='measure',
+        resource_allowed_types="document, script,,image",
+        resource_allowed_domains="auchandrive.lu, .Static.Example.com",
+        resource_blocked_domains="tracker.example",
+    ))
+    assert policy.mode == 'measure'
+    assert policy.allowed_types == {'document', 'script', 'image'}
+    assert policy.allowed_domains == ("auchandrive.lu", "static.example.com")
+    assert policy.blocked_domains == ("tracker.example",)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        ResourceBlockingPolicy.from_config(config(resource_blocking='strict'))
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.outcome = None
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+    async def abort(self, error_code):
+        self.outcome = error_code
+
+
+@pytest.mark.parametrize('mode, outcome', [('block', 'blockedbyclient'), ('measure', 'continued')])
+def test_handle_counts_blocked_requests(mode, outcome):
+    policy = ResourceBlockingPolicy(mode=mode, allowed_domains=["auchandrive.lu"])
+    blocked = FakeRoute("https://cdn.example.com/logo.png", 'image')
+    allowed = FakeRoute("https://www.auchandrive.lu/app.js", 'script')
+    asyncio.run(policy.handle(blocked))
+    asyncio.run(policy.handle(allowed))
+
+    assert (blocked.outcome, allowed.outcome) == (outcome, 'continued')
+    stats = policy.stats()
+    assert stats['blocked_requests'] == 1
+    assert stats['blocked_by_type'] == {'image': 1}
+    assert stats['blocked_by_domain'] == {'cdn.example.com': 1}
+    policy.reset_stats()
+    assert policy.stats()['blocked_requests'] == 0
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from app.services import stock_outbox
+from app.services.stock_outbox import StockOutbox
+
+
+class FakeGrocy:
+    """Grocy client recording the stock additions, failing while `down` is set."""
+
+    def __init__(self):
+        self.down = False
+        self.added = []
+
+    async def add_to_stock(self, product_id, amount, location_id, price):
+        if self.down:
+            return None
+        self.added.append(product_id)
+        return {'product_id': product_id}
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = {'now': 1_000_000.0}
+    monkeypatch.setattr(stock_outbox.time, 'time', lambda: clock['now'])
+    return clock
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = StockOutbox(FakeGrocy(), str(tmp_path / "outbox.db"), batch_size=2, max_attempts=3,
+                         retry_delay=10, max_retry_delay=15)
+    yield outbox
+    outbox.close()
+
+
+def addition(order_number, line, product_id):
+    return StockOutbox.idempotency_key(order_number, line), product_id, 1, 1, 2.5
+
+
+def status(outbox, key):
+    return outbox.connect().execute(
+        "SELECT status, attempts, next_attempt_at FROM stock_outbox WHERE idempotency_key = ?", (key,)
+    ).fetchone()
+
+
+def test_enqueue_is_idempotent(outbox, now):
+    assert outbox.enqueue([addition("1", "Lait", 10), addition("1", "Beurre", 11)]) == 2
+    assert outbox.enqueue([addition("1", "Lait", 10), addition("2", "Lait", 10)]) == 1
+    assert outbox.depth() == 3
+
+
+def test_flush_sends_every_due_addition_once(outbox, now):
+    outbox.enqueue([addition("1", line, product_id) for product_id, line in enumerate("ABCDE")])
+    assert asyncio.run(outbox.flush()) == 5
+    assert sorted(outbox.grocy_service.added) == [0, 1, 2, 3, 4]
+    assert outbox.depth() == 0
+
+    # Replaying the order neither queues nor sends its lines again
+    assert outbox.enqueue([addition("1", "A", 0)]) == 0
+    assert asyncio.run(outbox.flush()) == 0
+    assert len(outbox.grocy_service.added) == 5
+
+
+def test_failed_additions_back_off_then_give_up(outbox, now):
+    key = addition("1", "Lait", 10)[0]
+    outbox.enqueue([addition("1", "Lait", 10)])
+    outbox.grocy_service.down = True
+
+    assert asyncio.run(outbox.flush()) == 0
+    assert status(outbox, key) == ('pending', 1, now['now'] + 10)
+
+    # Not due yet: nothing is sent
+    now['now'] += 9
+    assert outbox.due(10) == []
+
+    now['now'] += 1
+    asyncio.run(outbox.flush())
+    assert status(outbox, key) == ('pending', 2, now['now'] + 15)  # 20s capped by max_retry_delay
+
+    now['now'] += 15
+    asyncio.run(outbox.flush())
+    assert status(outbox, key)[:2] == ('failed', 3)
+    assert outbox.depth() == 0
+
+
+def test_pending_additions_are_sent_once_grocy_is_back(outbox, now):
+    outbox.enqueue([addition("1", "Lait", 10)])
+    outbox.grocy_service.down = True
+    asyncio.run(outbox.flush())
+
+    outbox.grocy_service.down = False
+    now['now'] += 10
+    assert asyncio.run(outbox.flush()) == 1
+    assert outbox.grocy_service.added == [10]
+    assert status(outbox, addition("1", "Lait", 10)[0])[:2] == ('done', 2)
+
+
+def test_additions_survive_a_restart(tmp_path, now):
+    db_file = str(tmp_path / "outbox.db")
+    first = StockOutbox(FakeGrocy(), db_file)
+    first.enqueue([addition("1", "Lait", 10)])
+    first.close()
+
+    second = StockOutbox(FakeGrocy(), db_file)
+    assert asyncio.run(second.flush()) == 1
+    assert second.grocy_service.added == [10]
+    second.close()
@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from app.helpers import swr_cache
+from app.helpers.swr_cache import StaleWhileRevalidateCache
+
+
+class Clock:
+    """Monotonic clock advanced by the tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(swr_cache.time, 'monotonic', clock)
+    return clock
+
+
+class Loader:
+    """Loader returning the next value once released, counting its calls."""
+
+    def __init__(self, values):
+        self.values = iter(values)
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        value = next(self.values)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def test_concurrent_cold_misses_share_one_load(clock):
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl=60)
+        loader = Loader(["products"])
+        gets = [asyncio.ensure_future(cache.get("products", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        assert await asyncio.gather(*gets) == ["products"] * 5
+        assert loader.calls == 1
+        assert cache.stats()['misses'] == 5
+        assert cache.stats()['refreshes'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_fresh_values_are_hits(clock):
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl=60)
+        loader = Loader(["v1"])
+        loader.release.set()
+        await cache.get("key", loader)
+        clock.now += 59
+        assert await cache.get("key", loader) == "v1"
+        assert loader.calls == 1
+        assert cache.stats()['hits'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_stale_value_is_served_while_one_refresh_runs(clock):
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl=60)
+        loader = Loader(["v1", "v2"])
+        loader.release.set()
+        await cache.get("key", loader)
+
+        loader.release.clear()
+        clock.now += 61
+        assert [await cache.get("key", loader) for _ in range(3)] == ["v1"] * 3
+        assert len(cache.refreshes) == 1
+        await asyncio.sleep(0)
+        assert loader.calls == 2  # One background refresh for the three stale reads
+        assert cache.stats()['stale_served'] == 3
+
+        loader.release.set()
+        await asyncio.gather(*cache.refreshes.values())
+        assert await cache.get("key", loader) == "v2"
+        assert cache.stats()['hits'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_refresh_keeps_the_last_good_value(clock):
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl=60)
+        loader = Loader(["v1", RuntimeError("Grocy is down"), None])
+        loader.release.set()
+        await cache.get("key", loader)
+
+        for _ in range(2):
+            clock.now += 61
+            assert await cache.get("key", loader) == "v1"
+            await asyncio.gather(*cache.refreshes.values())
+        assert await cache.get("key", loader) == "v1"
+        assert cache.stats()['refresh_failures'] == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_cold_load_returns_none(clock):
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl=60)
+        loader = Loader([RuntimeError("Grocy is down")])
+        loader.release.set()
+        assert await cache.get("key", loader) is None
+        assert "key" not in cache.entries
+
+    asyncio.run(scenario())
+
+
+def test_close_cancels_refreshes_in_flight(clock):
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl=60)
+        loader = Loader(["v1"])
+        cache.start_refresh("key", loader)
+        await asyncio.sleep(0)
+        await cache.close()
+        await asyncio.sleep(0)
+        assert cache.refreshes == {}
+
+    asyncio.run(scenario())